@@ -0,0 +1,105 @@
+"""Stats updates: slotted counters vs. the former RLock-guarded dataclass.
+
+python -m benchmarks.bench_counters --updates 1000000
+"""
+
+import threading
+from dataclasses import fields
+
+from spidey.controller import Controller, CrawlCounters, CrawlStats
+
+from .common import arguments, measure, report
+
+
+class LockedStats:
+    """Stats updates as they were before `Counters`: a dataclass behind an RLock."""
+
+    def __init__(self):
+        self._stats = CrawlStats()
+        self._stats_lock = threading.RLock()
+
+    def get_stats(self) -> CrawlStats:
+        with self._stats_lock:
+            return CrawlStats(
+                **{
+                    field.name: getattr(self._stats, field.name)
+                    for field in fields(CrawlStats)
+                }
+            )
+
+    def increment_stats(self, **kwargs):
+        with self._stats_lock:
+            for key, value in kwargs.items():
+                if hasattr(self._stats, key):
+                    current = getattr(self._stats, key)
+                    setattr(self._stats, key, current + value)
+
+
+def locked_increments(stats: LockedStats, updates: int):
+    for _ in range(updates):
+        stats.increment_stats(pages_visited=1, bytes_downloaded=512)
+
+
+def controller_increments(controller: Controller, updates: int):
+    for _ in range(updates):
+        controller.increment_stats(pages_visited=1, bytes_downloaded=512)
+
+
+def attribute_increments(counters: CrawlCounters, updates: int):
+    for _ in range(updates):
+        counters.pages_visited += 1
+        counters.bytes_downloaded += 512
+
+
+def main():
+    parser = arguments(__doc__)
+    parser.add_argument("--updates", type=int, default=500_000)
+    parser.add_argument("--reads", type=int, default=50_000)
+    args = parser.parse_args()
+
+    updates, reads = args.updates, args.reads
+    locked, controller, counters = LockedStats(), Controller(), CrawlCounters()
+    print(f"{updates:,} updates of two stats each, {reads:,} get_stats calls")
+
+    report(
+        "locked increment_stats",
+        measure(lambda: locked_increments(locked, updates), args.repeat),
+        updates,
+        "updates",
+    )
+    report(
+        "Controller.increment_stats",
+        measure(lambda: controller_increments(controller, updates), args.repeat),
+        updates,
+        "updates",
+    )
+    report(
+        "CrawlCounters attribute +=",
+        measure(lambda: attribute_increments(counters, updates), args.repeat),
+        updates,
+        "updates",
+    )
+    report(
+        "locked get_stats",
+        measure(lambda: [locked.get_stats() for _ in range(reads)], args.repeat),
+        reads,
+        "reads",
+    )
+    report(
+        "Controller.get_stats",
+        measure(lambda: [controller.get_stats() for _ in range(reads)], args.repeat),
+        reads,
+        "reads",
+    )
+    report(
+        "MetricsRegistry.snapshot",
+        measure(
+            lambda: [controller.metrics.snapshot() for _ in range(reads)], args.repeat
+        ),
+        reads,
+        "reads",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Link extraction: single tokenizer pass vs. the former two BeautifulSoup parses.
+
+    python -m benchmarks.bench_parser --links 5000
+"""
+
+from typing import Set
+from urllib.parse import urljoin
+
+from bs4 import BeautifulSoup
+import validators
+
+from spidey.parser import Parser
+
+from .common import arguments, measure, report
+
+
+BASE_URL = "https://example.com/section/index.html"
+
+
+def make_page(links: int) -> str:
+    parts = ["<html><head><title>Benchmark</title>"]
+    parts.append('<link rel="stylesheet" href="/static/site.css">')
+    parts.append("</head><body>")
+    for i in range(links):
+        parts.append(f'<div class="item"><a href="/page/{i}.html">Page {i}</a>')
+        if i % 5 == 0:
+            parts.append(
+                f'<img src="/img/{i}.png" srcset="/img/{i}@2x.png 2x, /img/{i}@3x.png 3x">'
+            )
+        if i % 50 == 0:
+            parts.append(f'<script src="/js/{i}.js"></script>')
+        parts.append("<p>" + "lorem ipsum dolor sit amet " * 4 + "</p></div>")
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def beautifulsoup_page_urls(html: str, base_url: str) -> Set[str]:
+    """Page link extraction as it was before the tokenizer."""
+    soup = BeautifulSoup(html, "html.parser")
+    urls = set()
+    for link in soup.find_all("a", href=True):
+        href = link["href"]
+        if href and not href.startswith("#"):
+            absolute_url = urljoin(base_url, href)
+            if validators.url(absolute_url):
+                urls.add(absolute_url)
+    return urls
+
+
+def beautifulsoup_file_urls(html: str, base_url: str) -> Set[str]:
+    """File link extraction as it was before the tokenizer."""
+    soup = BeautifulSoup(html, "html.parser")
+    urls = set()
+    for tag in soup.find_all(["img", "link", "script", "video", "source"]):
+        for attr in ("href", "src"):
+            if tag.has_attr(attr) and tag[attr]:
+                urls.add(urljoin(base_url, tag[attr]))
+    return urls
+
+
+def main():
+    parser = arguments(__doc__)
+    parser.add_argument("--links", type=int, default=2000, help="anchors per page")
+    args = parser.parse_args()
+
+    html = make_page(args.links)
+    print(f"page size: {len(html) / 1024:.0f} KiB, {args.links} anchors")
+
+    tokenizer = measure(lambda: Parser.extract_links(html, BASE_URL), args.repeat)
+    soup = measure(
+        lambda: (
+            beautifulsoup_page_urls(html, BASE_URL),
+            beautifulsoup_file_urls(html, BASE_URL),
+        ),
+        args.repeat,
+    )
+    report("tokenizer (extract_links)", tokenizer, len(html) // 1024, "KiB")
+    report("BeautifulSoup, two parses", soup, len(html) // 1024, "KiB")
+    print(f"speedup: {soup / tokenizer:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""URL frontier throughput: enqueue with dedupe, drain, and async workers.
+
+python -m benchmarks.bench_queue --urls 200000 --domains 5000
+"""
+
+import asyncio
+from typing import List
+
+from spidey.queue import URLQueue
+
+from .common import arguments, measure, report
+
+
+def make_urls(count: int, domains: int) -> List[str]:
+    return [f"https://host{i % domains}.example.com/page/{i}" for i in range(count)]
+
+
+def enqueue(urls: List[str]) -> URLQueue:
+    queue = URLQueue()
+    for start in range(0, len(urls), 100):
+        queue.add_batch(urls[start : start + 100])
+    return queue
+
+
+def enqueue_duplicates(queue: URLQueue, urls: List[str]):
+    for start in range(0, len(urls), 100):
+        queue.add_batch(urls[start : start + 100])
+
+
+def drain(queue: URLQueue, batch_size: int = 50):
+    while queue.get_batch(batch_size):
+        pass
+
+
+async def run_workers(urls: List[str], workers: int, batch_size: int = 10):
+    queue = enqueue(urls)
+
+    async def worker():
+        while True:
+            batch = await queue.next_batch(batch_size)
+            if not batch:
+                return
+            await asyncio.sleep(0)
+            queue.task_done(len(batch))
+
+    await asyncio.gather(*(worker() for _ in range(workers)))
+
+
+def main():
+    parser = arguments(__doc__)
+    parser.add_argument("--urls", type=int, default=100_000)
+    parser.add_argument("--domains", type=int, default=2_000)
+    parser.add_argument("--workers", type=int, default=50)
+    args = parser.parse_args()
+
+    urls = make_urls(args.urls, args.domains)
+    print(f"{args.urls:,} URLs across {args.domains:,} domains")
+
+    report(
+        "add_batch (new URLs)",
+        measure(lambda: enqueue(urls), args.repeat),
+        len(urls),
+        "URLs",
+    )
+
+    seen = enqueue(urls)
+    report(
+        "add_batch (all duplicates)",
+        measure(lambda: enqueue_duplicates(seen, urls), args.repeat),
+        len(urls),
+        "URLs",
+    )
+
+    queues = [enqueue(urls) for _ in range(args.repeat)]
+    report(
+        "get_batch drain",
+        measure(lambda: drain(queues.pop()), args.repeat),
+        len(urls),
+        "URLs",
+    )
+
+    report(
+        f"enqueue + {args.workers} async workers",
+        measure(lambda: asyncio.run(run_workers(urls, args.workers)), args.repeat),
+        len(urls),
+        "URLs",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Priority frontier: crawl yield and cost for FIFO vs. each scorer.
+
+Yield: a synthetic site tree is crawled under a page budget, with scores,
+`record` and `rescore` wired as the crawler does, and the files found per
+page fetched are reported. A few top-level sections hold most files, and
+pages in a section yield alike, so a scorer that learns from yield should
+find them sooner than FIFO.
+
+Cost: URLs are enqueued in batches of 20 links per referring page, as a
+crawl would add them, then drained.
+
+    python -m benchmarks.bench_scoring --urls 200000 --budget 2000
+"""
+
+import random
+from typing import Callable, Dict, List, Optional, Tuple
+
+from spidey.queue import URLQueue
+from spidey.scoring import (
+    CompositeScorer,
+    DepthScorer,
+    FileYieldScorer,
+    PathPatternScorer,
+    URLScorer,
+)
+
+from .bench_queue import make_urls
+from .common import arguments, measure, report
+
+LINKS_PER_PAGE = 20
+
+PATH_BOOSTS = {"/page/1*": 5.0, "*/tag/*": -3.0, "/gallery/*": 2.0}
+
+SITE = "https://site.example"
+BRANCHING = 6
+SITE_DEPTH = 5
+RICH_SECTIONS = 1
+
+
+SCORERS: List[Tuple[str, Callable[[], Optional[URLScorer]]]] = [
+    ("FIFO (no scorer)", lambda: None),
+    ("DepthScorer", DepthScorer),
+    ("PathPatternScorer", lambda: PathPatternScorer(PATH_BOOSTS)),
+    ("FileYieldScorer", FileYieldScorer),
+    (
+        "CompositeScorer (all three)",
+        lambda: CompositeScorer(
+            [
+                (DepthScorer(), 1.0),
+                (PathPatternScorer(PATH_BOOSTS), 1.0),
+                (FileYieldScorer(), 1.0),
+            ]
+        ),
+    ),
+]
+
+
+def crawl_order(urls: List[str], scorer: Optional[URLScorer]):
+    queue = URLQueue(scorer=scorer)
+    for start in range(0, len(urls), LINKS_PER_PAGE):
+        referrer = urls[start - 1] if start else None
+        queue.add_batch(urls[start : start + LINKS_PER_PAGE], referrer, start // 1000)
+    while True:
+        batch = queue.get_batch(50)
+        if not batch:
+            break
+        for url in batch:
+            depth, referrer = queue.pop_context(url)
+            if scorer is not None:
+                scorer.record(url, referrer, len(url) % 3)
+
+
+def make_site(seed: int = 7) -> Tuple[Dict[str, List[str]], Dict[str, int]]:
+    """Links and file counts of a site tree `SITE_DEPTH` levels deep.
+
+    Pages in the first `RICH_SECTIONS` top-level sections usually hold
+    files; elsewhere pages rarely do.
+    """
+    rng = random.Random(seed)
+    links: Dict[str, List[str]] = {}
+    files: Dict[str, int] = {SITE + "/": 0}
+    level = [(SITE + "/", -1)]
+    for _ in range(SITE_DEPTH):
+        next_level = []
+        for page, section in level:
+            children = []
+            for index in range(BRANCHING):
+                child = f"{page}{index}/"
+                child_section = index if section < 0 else section
+                rich = child_section < RICH_SECTIONS
+                found = rng.random() < (0.8 if rich else 0.05)
+                files[child] = rng.randint(1, 5) if found else 0
+                children.append(child)
+                next_level.append((child, child_section))
+            links[page] = children
+        level = next_level
+    return links, files
+
+
+def crawl_yield(
+    site: Tuple[Dict[str, List[str]], Dict[str, int]],
+    scorer: Optional[URLScorer],
+    budget: int,
+) -> int:
+    """Files found in the first `budget` pages, crawling as `Spidey` does."""
+    links, files = site
+    queue = URLQueue(scorer=scorer)
+    queue.add_batch([SITE + "/"])
+    found = 0
+    for _ in range(budget):
+        batch = queue.get_batch(1)
+        if not batch:
+            break
+        url = batch[0]
+        depth, referrer = queue.pop_context(url)
+        found += files[url]
+        if scorer is not None:
+            scorer.record(url, referrer, files[url])
+            if scorer.adaptive and referrer is not None:
+                queue.rescore(referrer)
+        queue.add_batch(links.get(url, []), url, depth + 1)
+    return found
+
+
+def main():
+    parser = arguments(__doc__)
+    parser.add_argument("--urls", type=int, default=100_000)
+    parser.add_argument("--domains", type=int, default=200)
+    parser.add_argument("--budget", type=int, default=1000)
+    args = parser.parse_args()
+
+    site = make_site()
+    pages = len(site[1])
+    print(f"Crawl yield: {args.budget:,} of {pages:,} pages")
+    for name, build in SCORERS:
+        found = crawl_yield(site, build(), args.budget)
+        print(f"{name:<40} {found / args.budget:10.2f} files/page")
+    print()
+
+    urls = make_urls(args.urls, args.domains)
+    print(f"{args.urls:,} URLs across {args.domains:,} domains")
+    for name, build in SCORERS:
+        seconds = measure(lambda: crawl_order(urls, build()), args.repeat)
+        report(name, seconds, len(urls), "URLs")
+
+
+if __name__ == "__main__":
+    main()
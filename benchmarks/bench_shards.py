@@ -0,0 +1,139 @@
+"""Sharded crawl scaling: pages per second with 1..N shard processes.
+
+Crawls a generated multi-host site served from a separate process on
+127.0.0.x addresses, so each shard owns a share of the hosts. Every page
+links to pages on other hosts, which exercises cross-shard routing. The
+request rate limit is raised well above what the local server needs; note
+that it applies per shard process.
+
+Besides wall time, the server records when it served the first and the
+last page of each crawl. Pages over that span is the crawl rate with
+process start-up and shutdown taken out; the rest of the wall time is
+reported as overhead. Speed-up is that rate over the single-shard one.
+Shards cannot beat one process on fewer cores than shards (the server needs
+one too), so the core count is printed alongside.
+
+    python -m benchmarks.bench_shards --shards 1 2 4 --pages 400
+"""
+
+import logging
+import multiprocessing
+import os
+import tempfile
+import time
+import urllib.request
+from typing import List, Tuple
+
+from aiohttp import web
+
+from spidey import Spidey
+
+from .common import arguments, report
+
+PORT = 8799
+HOSTS = [f"127.0.0.{i}" for i in range(1, 9)]
+PAGES_PER_HOST = 200
+
+# When the server process handled each page request since the last `/timing`.
+_served: List[float] = []
+
+
+async def page(request: web.Request) -> web.Response:
+    _served.append(time.time())
+    host = request.host.split(":")[0]
+    index = int(request.match_info.get("n", 0))
+    offset = HOSTS.index(host) if host in HOSTS else 0
+    links = "".join(
+        f'<a href="http://{HOSTS[(offset + k) % len(HOSTS)]}:{PORT}/p{(index * 3 + k) % PAGES_PER_HOST}">'
+        f"page</a>"
+        for k in range(1, 6)
+    )
+    body = f"<html><body>{links}<img src='/img/{index % 10}.png'>{'text ' * 200}</body></html>"
+    return web.Response(text=body, content_type="text/html")
+
+
+async def image(request: web.Request) -> web.Response:
+    return web.Response(body=request.path.encode() * 100, content_type="image/png")
+
+
+async def timing(request: web.Request) -> web.Response:
+    span = _served[-1] - _served[0] if _served else 0.0
+    _served.clear()
+    return web.Response(text=str(span))
+
+
+def serve(port: int):
+    app = web.Application()
+    app.router.add_get("/timing", timing)
+    app.router.add_get("/", page)
+    app.router.add_get("/p{n}", page)
+    app.router.add_get("/img/{name}", image)
+    web.run_app(app, host="0.0.0.0", port=port, print=None, access_log=None)
+
+
+def crawl(shards: int, pages: int, workers: int) -> Tuple[float, float]:
+    """Wall time of one crawl and the time between its first and last page."""
+    with tempfile.TemporaryDirectory() as folder:
+        crawler = Spidey.from_args(
+            urls=[f"http://{host}:{PORT}/" for host in HOSTS],
+            extensions=[".png"],
+            max_pages=pages,
+            folder=folder,
+            num_workers=workers,
+            max_concurrent_requests=workers * 500,
+            min_delay_between_requests=0.0,
+            sleep_time=0.0,
+            respect_robots_txt=False,
+            shards=shards,
+        )
+        start = time.perf_counter()
+        crawler.crawl()
+        elapsed = time.perf_counter() - start
+        visited = crawler.stats.pages_visited
+    if visited != pages:
+        print(f"warning: {shards} shard(s) visited {visited} of {pages} pages")
+    with urllib.request.urlopen(f"http://127.0.0.1:{PORT}/timing") as response:
+        span = float(response.read())
+    return elapsed, span
+
+
+def main():
+    parser = arguments(__doc__)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--pages", type=int, default=400)
+    parser.add_argument("--workers", type=int, default=10, help="workers per shard")
+    args = parser.parse_args()
+
+    logging.getLogger().setLevel(logging.WARNING)
+    server = multiprocessing.get_context("spawn").Process(
+        target=serve, args=(PORT,), daemon=True
+    )
+    server.start()
+    time.sleep(1.0)
+    try:
+        print(
+            f"{args.pages} pages over {len(HOSTS)} hosts, {args.workers} workers "
+            f"per shard, {os.cpu_count()} CPU core(s)"
+        )
+        baseline = None
+        for shards in args.shards:
+            elapsed, span = min(
+                crawl(shards, args.pages, args.workers) for _ in range(args.repeat)
+            )
+            rate = args.pages / max(span, 1e-9)
+            baseline = baseline or rate
+            report(f"{shards} shard(s)", elapsed, args.pages, "pages")
+            print(
+                f"{'':<40} crawling {rate:,.0f} pages/s ({rate / baseline:.2f}x), "
+                f"start-up and shutdown {(elapsed - span) * 1000:.0f} ms"
+            )
+            if shards > 1 and (os.cpu_count() or 1) <= shards:
+                print(
+                    f"{'':<40} fewer cores than shards + server: no speed-up expected"
+                )
+    finally:
+        server.terminate()
+
+
+if __name__ == "__main__":
+    main()
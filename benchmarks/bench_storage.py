@@ -0,0 +1,78 @@
+"""Storage write path: files per second for each backend and fsync policy.
+
+Every file has distinct content, so nothing is deduplicated away. Each case
+writes into a fresh temporary folder.
+
+    python -m benchmarks.bench_storage --files 5000 --size 16384
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from spidey.config import Config
+from spidey.fetcher import DownloadedFile
+from spidey.storage import create_storage
+
+from .common import arguments, report
+
+CASES: List[Tuple[str, Dict[str, object]]] = [
+    ("files", {}),
+    ("files, shard depth 2", {"storage_shard_depth": 2}),
+    ("files, fsync batch", {"storage_fsync": "batch"}),
+    ("files, fsync always", {"storage_fsync": "always"}),
+    ("pack", {"storage_backend": "pack"}),
+    ("warc", {"storage_backend": "warc"}),
+]
+
+
+async def write_files(
+    options: Dict[str, object], downloads: List[DownloadedFile], concurrency: int
+) -> float:
+    with tempfile.TemporaryDirectory() as folder:
+        config = Config(urls=[], extensions=[], folder=folder, **options)
+        storage = create_storage(config)
+        pending = iter(downloads)
+
+        async def worker():
+            for download in pending:
+                await storage.save_download(download)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        await storage.close()
+        return time.perf_counter() - start
+
+
+def main():
+    parser = arguments(__doc__)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=16 * 1024, help="bytes per file")
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+
+    filler = os.urandom(args.size)
+    bodies = [i.to_bytes(8, "big") + filler[8:] for i in range(args.files)]
+    downloads = [
+        DownloadedFile(
+            url=f"https://example.com/files/{i}.bin",
+            checksum=hashlib.sha256(body).hexdigest(),
+            size=len(body),
+            content=body,
+        )
+        for i, body in enumerate(bodies)
+    ]
+    print(f"{args.files:,} files of {args.size:,} bytes, {args.concurrency} concurrent")
+    for name, options in CASES:
+        seconds = min(
+            asyncio.run(write_files(options, downloads, args.concurrency))
+            for _ in range(args.repeat)
+        )
+        report(name, seconds, args.files, "files")
+
+
+if __name__ == "__main__":
+    main()
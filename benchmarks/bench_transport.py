@@ -0,0 +1,269 @@
+"""Transport and content-coding throughput against a local server.
+
+Serves one generated HTML page, pre-compressed with every coding that can
+be produced here, and fetches it repeatedly through each transport with
+each coding it accepts. Client and server share one event loop, so
+absolute numbers understate a real crawl; compare rows against each other.
+
+HTTP/2 is negotiated through TLS ALPN, so the `http2` transport is run
+against a small `h2` server on TLS with a throwaway self-signed
+certificate (made with the `openssl` command) that the client is told to
+trust. That server offers only `h2`, and every row is labelled with the
+HTTP version its responses actually used. Its rows include TLS costs that
+the plain-HTTP `aiohttp` rows do not.
+
+    python -m benchmarks.bench_transport --requests 2000
+"""
+
+import asyncio
+import gzip
+import logging
+import os
+import ssl
+import subprocess
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from aiohttp import web
+
+from spidey.config import Config
+from spidey.transport import TRANSPORTS, create_transport
+
+from .bench_parser import make_page
+from .common import arguments, report
+
+
+def compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    codecs: Dict[str, Callable[[bytes], bytes]] = {
+        "identity": lambda data: data,
+        "gzip": gzip.compress,
+        "deflate": zlib.compress,
+    }
+    try:
+        import brotli
+
+        codecs["br"] = brotli.compress
+    except ImportError:
+        pass
+    try:
+        import zstandard
+
+        codecs["zstd"] = zstandard.ZstdCompressor().compress
+    except ImportError:
+        pass
+    return codecs
+
+
+async def serve(bodies: Dict[str, bytes]) -> web.AppRunner:
+    async def page(request: web.Request) -> web.Response:
+        coding = request.query.get("coding", "identity")
+        headers = {"Content-Type": "text/html; charset=utf-8"}
+        if coding != "identity":
+            headers["Content-Encoding"] = coding
+        return web.Response(body=bodies[coding], headers=headers)
+
+    app = web.Application()
+    app.router.add_get("/", page)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", 0).start()
+    return runner
+
+
+class H2Server(asyncio.Protocol):
+    """Minimal HTTP/2 server answering every GET with the page in `?coding=`."""
+
+    def __init__(self, bodies: Dict[str, bytes]):
+        import h2.config
+        import h2.connection
+
+        self._bodies = bodies
+        self._conn = h2.connection.H2Connection(
+            h2.config.H2Configuration(client_side=False, header_encoding="utf-8")
+        )
+        self._pending: Dict[int, bytes] = {}
+        self._transport: Optional[asyncio.Transport] = None
+
+    def connection_made(self, transport):
+        self._transport = transport
+        self._conn.initiate_connection()
+        transport.write(self._conn.data_to_send())
+
+    def data_received(self, data: bytes):
+        import h2.events
+
+        assert self._transport is not None
+        for event in self._conn.receive_data(data):
+            if isinstance(event, h2.events.RequestReceived):
+                self._respond(event.stream_id, dict(event.headers))
+            elif isinstance(event, h2.events.WindowUpdated):
+                self._send_pending()
+            elif isinstance(event, h2.events.StreamReset):
+                self._pending.pop(event.stream_id, None)
+            elif isinstance(event, h2.events.ConnectionTerminated):
+                self._transport.close()
+        self._transport.write(self._conn.data_to_send())
+
+    def _respond(self, stream_id: int, headers: Dict[str, str]):
+        query = parse_qs(urlsplit(headers[":path"]).query)
+        coding = query.get("coding", ["identity"])[0]
+        body = self._bodies[coding]
+        response = [
+            (":status", "200"),
+            ("content-type", "text/html; charset=utf-8"),
+            ("content-length", str(len(body))),
+        ]
+        if coding != "identity":
+            response.append(("content-encoding", coding))
+        self._conn.send_headers(stream_id, response)
+        self._pending[stream_id] = body
+        self._send_pending()
+
+    def _send_pending(self):
+        """Send as much of each pending body as the flow-control windows allow."""
+        for stream_id, body in list(self._pending.items()):
+            window = self._conn.local_flow_control_window(stream_id)
+            while body and window > 0:
+                size = min(window, self._conn.max_outbound_frame_size, len(body))
+                self._conn.send_data(stream_id, body[:size])
+                body, window = body[size:], window - size
+            if body:
+                self._pending[stream_id] = body
+            else:
+                self._conn.end_stream(stream_id)
+                del self._pending[stream_id]
+
+
+def make_certificate(folder: str) -> Optional[Tuple[str, str]]:
+    """Self-signed certificate and key for 127.0.0.1, or None without `openssl`."""
+    cert, key = os.path.join(folder, "cert.pem"), os.path.join(folder, "key.pem")
+    try:
+        subprocess.run(
+            ["openssl", "req", "-x509", "-newkey", "rsa:2048", "-nodes"]
+            + ["-keyout", key, "-out", cert, "-days", "1", "-subj", "/CN=127.0.0.1"]
+            + ["-addext", "subjectAltName=IP:127.0.0.1"],
+            check=True,
+            capture_output=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return cert, key
+
+
+async def serve_h2(bodies: Dict[str, bytes], cert: str, key: str) -> asyncio.Server:
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(cert, key)
+    context.set_alpn_protocols(["h2"])
+    loop = asyncio.get_running_loop()
+    return await loop.create_server(
+        lambda: H2Server(bodies), "127.0.0.1", 0, ssl=context
+    )
+
+
+@contextmanager
+def trusting(cert: Optional[str]) -> Iterator[None]:
+    """Let httpx clients created inside the block trust `cert`."""
+    previous = os.environ.get("SSL_CERT_FILE")
+    if cert:
+        os.environ["SSL_CERT_FILE"] = cert
+    try:
+        yield
+    finally:
+        if previous is None:
+            os.environ.pop("SSL_CERT_FILE", None)
+        else:
+            os.environ["SSL_CERT_FILE"] = previous
+
+
+async def fetch_all(
+    transport_name: str, url: str, coding: str, requests: int, concurrency: int
+) -> Tuple[float, Set[str]]:
+    """Elapsed seconds and the HTTP versions the responses came back with."""
+    config = Config(urls=[url], extensions=[], transport=transport_name)
+    transport = create_transport(config, {"User-Agent": "spidey-benchmark"})
+    headers = {"Accept-Encoding": coding}
+    await transport.open()
+    remaining = iter(range(requests))
+    versions: Set[str] = set()
+
+    async def worker():
+        for _ in remaining:
+            async with transport.get(f"{url}?coding={coding}", headers) as response:
+                await response.read()
+                versions.add(response.http_version)
+
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return time.perf_counter() - start, versions
+    finally:
+        await transport.close()
+
+
+async def run(requests: int, concurrency: int, repeat: int):
+    page = make_page(500).encode("utf-8")
+    bodies = {coding: compress(page) for coding, compress in compressors().items()}
+    print(
+        f"page: {len(page) / 1024:.0f} KiB, {requests} requests, {concurrency} concurrent"
+    )
+    for coding, body in bodies.items():
+        print(f"  {coding:<8} {len(body) / 1024:8.1f} KiB on the wire")
+
+    runner = await serve(bodies)
+    urls = {name: f"http://127.0.0.1:{runner.addresses[0][1]}/" for name in TRANSPORTS}
+    certificates = tempfile.TemporaryDirectory()
+    h2_server: Optional[asyncio.Server] = None
+    cert: Optional[str] = None
+    pair = make_certificate(certificates.name)
+    if pair:
+        cert = pair[0]
+        h2_server = await serve_h2(bodies, *pair)
+        urls["http2"] = f"https://127.0.0.1:{h2_server.sockets[0].getsockname()[1]}/"
+    else:
+        print("openssl not found: http2 rows run over plain HTTP/1.1")
+    try:
+        for name, transport_cls in TRANSPORTS.items():
+            try:
+                supported = ["identity"] + transport_cls.content_encodings()
+            except ImportError:
+                continue
+            for coding in supported:
+                if coding not in bodies:
+                    continue
+                try:
+                    with trusting(cert if name == "http2" else None):
+                        runs: List[Tuple[float, Set[str]]] = [
+                            await fetch_all(
+                                name, urls[name], coding, requests, concurrency
+                            )
+                            for _ in range(repeat)
+                        ]
+                except Exception as e:
+                    print(f"{name} / {coding}: skipped ({e})")
+                    break
+                best = min(elapsed for elapsed, _ in runs)
+                versions = ", ".join(sorted(set().union(*(v for _, v in runs))))
+                report(f"{name} / {coding} ({versions})", best, requests, "req")
+    finally:
+        if h2_server:
+            h2_server.close()
+            await h2_server.wait_closed()
+        certificates.cleanup()
+        await runner.cleanup()
+
+
+def main():
+    parser = arguments(__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    asyncio.run(run(args.requests, args.concurrency, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import argparse
+import time
+from typing import Callable, Optional
+
+
+def measure(func: Callable[[], object], repeat: int = 5) -> float:
+    """Best wall-clock time of `repeat` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def report(name: str, seconds: float, items: Optional[int] = None, unit: str = "items"):
+    line = f"{name:<40} {seconds * 1000:10.2f} ms"
+    if items:
+        line += f"  {items / seconds:14,.0f} {unit}/s"
+    print(line)
+
+
+def arguments(description: str) -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="runs per case; the best is kept"
+    )
+    return parser
@@ -0,0 +1,54 @@
+import asyncio
+from collections import deque
+from typing import Deque
+
+from .queue import _wait, _wake_all
+
+
+class PageBudget:
+    """Caps the pages a crawl fetches, counting fetches in progress against it.
+
+    Workers `reserve` a slot before requesting a page and `release` it when
+    done, saying whether a page was fetched. A failed fetch gives its slot
+    back, so errors do not end the crawl early; while the last slots are in
+    flight, further workers wait instead of overshooting the limit.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.fetched = 0
+        self.reserved = 0
+        self._closed = False
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def exhausted(self) -> bool:
+        return self._closed or self.fetched >= self.limit
+
+    async def reserve(self) -> bool:
+        """Claim a slot for one fetch. Returns False once the budget is spent."""
+        while not self.exhausted():
+            if self.fetched + self.reserved < self.limit:
+                self.reserved += 1
+                return True
+            self._request_more()
+            await _wait(self._waiters)
+        return False
+
+    def release(self, fetched: bool):
+        """Return a reserved slot, consuming it if a page was fetched."""
+        self.reserved -= 1
+        if fetched:
+            self.fetched += 1
+        _wake_all(self._waiters)
+
+    def restore(self, fetched: int):
+        """Count pages fetched by an earlier run of a resumed crawl."""
+        self.fetched += fetched
+
+    def close(self):
+        """Refuse further reservations and release waiting workers."""
+        self._closed = True
+        _wake_all(self._waiters)
+
+    def _request_more(self):
+        """Hook for budgets that can grow while workers wait."""
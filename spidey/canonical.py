@@ -0,0 +1,116 @@
+import re
+from fnmatch import fnmatchcase
+from typing import List, Optional, Sequence
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+
+DEFAULT_DROP_QUERY_PARAMS = [
+    "utm_*",
+    "fbclid",
+    "gclid",
+    "dclid",
+    "msclkid",
+    "yclid",
+    "mc_cid",
+    "mc_eid",
+    "_ga",
+    "_gl",
+    "sessionid",
+    "session_id",
+    "jsessionid",
+    "phpsessid",
+    "sid",
+]
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+UNRESERVED = frozenset(
+    "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789-._~"
+)
+
+_PERCENT_ESCAPE = re.compile(r"%([0-9A-Fa-f]{2})")
+_SESSION_PATH_PARAM = re.compile(r";(?:jsessionid|phpsessid|sid)=[^/?#]*", re.I)
+
+
+def _normalize_escape(match) -> str:
+    char = chr(int(match.group(1), 16))
+    if char in UNRESERVED:
+        return char
+    return "%" + match.group(1).upper()
+
+
+class URLCanonicalizer:
+    """Rewrites URLs to one canonical spelling so variants dedupe to a single fetch.
+
+    Lowercases scheme and host, drops default ports and fragments, normalizes
+    percent-encoding, strips session path parameters and configured query
+    parameters (shell-style patterns such as `utm_*`), and optionally sorts
+    the remaining query and strips trailing slashes.
+    """
+
+    def __init__(
+        self,
+        drop_query_params: Optional[Sequence[str]] = None,
+        sort_query_params: bool = True,
+        strip_trailing_slash: bool = False,
+    ):
+        patterns = (
+            DEFAULT_DROP_QUERY_PARAMS
+            if drop_query_params is None
+            else drop_query_params
+        )
+        self._exact_drops = frozenset(p.lower() for p in patterns if "*" not in p)
+        self._pattern_drops = [p.lower() for p in patterns if "*" in p]
+        self._sort_query_params = sort_query_params
+        self._strip_trailing_slash = strip_trailing_slash
+
+    def _drop_param(self, name: str) -> bool:
+        name = unquote_plus(name).lower()
+        if name in self._exact_drops:
+            return True
+        return any(fnmatchcase(name, pattern) for pattern in self._pattern_drops)
+
+    def _canonical_query(self, query: str) -> str:
+        if not query:
+            return ""
+        pairs: List[str] = []
+        for pair in query.split("&"):
+            if not pair:
+                continue
+            if self._drop_param(pair.split("=", 1)[0]):
+                continue
+            pairs.append(_PERCENT_ESCAPE.sub(_normalize_escape, pair))
+        if self._sort_query_params:
+            pairs.sort()
+        return "&".join(pairs)
+
+    def canonicalize(self, url: str) -> str:
+        try:
+            parts = urlsplit(url.strip())
+        except ValueError:
+            return url
+
+        scheme = parts.scheme.lower()
+        netloc = parts.netloc
+        host = parts.hostname
+        if host:
+            try:
+                port = parts.port
+            except ValueError:
+                port = None
+            userinfo = netloc.rpartition("@")[0]
+            netloc = host.lower().rstrip(".")
+            if ":" in netloc:
+                netloc = f"[{netloc}]"
+            if port is not None and DEFAULT_PORTS.get(scheme) != port:
+                netloc = f"{netloc}:{port}"
+            if userinfo:
+                netloc = f"{userinfo}@{netloc}"
+
+        path = _SESSION_PATH_PARAM.sub("", parts.path)
+        path = _PERCENT_ESCAPE.sub(_normalize_escape, path) or "/"
+        if self._strip_trailing_slash and len(path) > 1:
+            path = path.rstrip("/") or "/"
+
+        query = self._canonical_query(parts.query)
+        return urlunsplit((scheme, netloc, path, query, ""))
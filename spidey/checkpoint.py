@@ -0,0 +1,185 @@
+import json
+import logging
+import os
+import sqlite3
+from dataclasses import asdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import Config
+
+
+logger = logging.getLogger(__name__)
+
+
+URL_QUEUED = 0
+# Visited without a page to show for it: failed, blocked by robots.txt, skipped.
+URL_DONE = 1
+# Visited and fetched, so charged to `max_pages`.
+URL_FETCHED = 2
+
+
+class CrawlJournal:
+    """Append-style SQLite journal of crawl state for crash-safe resume.
+
+    Frontier URLs, pending file downloads and stored checksums are buffered
+    in memory and written in a single transaction every `flush_every`
+    operations (and whenever `flush` is called), so a crash loses at most one
+    buffer while the per-operation cost stays a list append.
+
+    State left in `path` by an earlier run is kept only with `resume=True`;
+    otherwise it is cleared, so a new crawl reusing the path starts over.
+    """
+
+    def __init__(self, path: str, flush_every: int = 1000, resume: bool = False):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._path = path
+        self._flush_every = flush_every
+        self._pending_ops = 0
+        self._queued: List[Tuple[str, int, Optional[str]]] = []
+        self._done: List[Tuple[str, int]] = []
+        self._files_added: List[Tuple[str, str]] = []
+        self._files_done: List[Tuple[str, str]] = []
+        self._checksums: List[Tuple[str]] = []
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS frontier "
+                "(url TEXT PRIMARY KEY, status INTEGER NOT NULL, "
+                "depth INTEGER NOT NULL DEFAULT 0, referrer TEXT) WITHOUT ROWID"
+            )
+            columns = {
+                row[1] for row in self._db.execute("PRAGMA table_info(frontier)")
+            }
+            if "depth" not in columns:
+                # Journals written before depth and referrer were recorded.
+                self._db.execute(
+                    "ALTER TABLE frontier ADD COLUMN depth INTEGER NOT NULL DEFAULT 0"
+                )
+                self._db.execute("ALTER TABLE frontier ADD COLUMN referrer TEXT")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS file_tasks "
+                "(url TEXT, referrer TEXT, PRIMARY KEY (url, referrer)) WITHOUT ROWID"
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS checksums "
+                "(checksum TEXT PRIMARY KEY) WITHOUT ROWID"
+            )
+            if not resume:
+                for table in ("frontier", "file_tasks", "checksums"):
+                    self._db.execute(f"DELETE FROM {table}")
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def save_config(self, config: Config):
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('config', ?)",
+                (json.dumps(asdict(config)),),
+            )
+
+    def load_config(self) -> Optional[Dict[str, Any]]:
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'config'").fetchone()
+        return json.loads(row[0]) if row else None
+
+    def has_state(self) -> bool:
+        return self._db.execute("SELECT 1 FROM frontier LIMIT 1").fetchone() is not None
+
+    def _record(self):
+        self._pending_ops += 1
+        if self._pending_ops >= self._flush_every:
+            self.flush()
+
+    def urls_queued(
+        self, urls: List[str], referrer: Optional[str] = None, depth: int = 0
+    ):
+        self._queued.extend((url, depth, referrer) for url in urls)
+        self._record()
+
+    def urls_done(self, urls: List[str], fetched: bool = False):
+        status = URL_FETCHED if fetched else URL_DONE
+        self._done.extend((url, status) for url in urls)
+        self._record()
+
+    def file_added(self, url: str, referrer: str):
+        self._files_added.append((url, referrer))
+        self._record()
+
+    def file_done(self, url: str, referrer: str):
+        self._files_done.append((url, referrer))
+        self._record()
+
+    def checksum_stored(self, checksum: str):
+        self._checksums.append((checksum,))
+        self._record()
+
+    def flush(self):
+        """Write all buffered operations in one transaction."""
+        if not self._pending_ops:
+            return
+        with self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO frontier (url, status, depth, referrer) "
+                f"VALUES (?, {URL_QUEUED}, ?, ?)",
+                self._queued,
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO frontier (url, status) VALUES (?, ?)",
+                self._done,
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO file_tasks (url, referrer) VALUES (?, ?)",
+                self._files_added,
+            )
+            self._db.executemany(
+                "DELETE FROM file_tasks WHERE url = ? AND referrer = ?",
+                self._files_done,
+            )
+            self._db.executemany(
+                "INSERT OR IGNORE INTO checksums (checksum) VALUES (?)",
+                self._checksums,
+            )
+        self._queued.clear()
+        self._done.clear()
+        self._files_added.clear()
+        self._files_done.clear()
+        self._checksums.clear()
+        self._pending_ops = 0
+
+    def iter_urls(self, *statuses: int) -> Iterator[str]:
+        placeholders = ", ".join("?" * len(statuses))
+        for (url,) in self._db.execute(
+            f"SELECT url FROM frontier WHERE status IN ({placeholders})", statuses
+        ):
+            yield url
+
+    def count_urls(self, status: int) -> int:
+        (count,) = self._db.execute(
+            "SELECT COUNT(*) FROM frontier WHERE status = ?", (status,)
+        ).fetchone()
+        return count
+
+    def iter_queued(self) -> Iterator[Tuple[str, Optional[str], int]]:
+        """Queued URLs with the referrer and depth they were found at."""
+        yield from self._db.execute(
+            "SELECT url, referrer, depth FROM frontier WHERE status = ?", (URL_QUEUED,)
+        )
+
+    def iter_file_tasks(self) -> Iterator[Tuple[str, str]]:
+        yield from self._db.execute("SELECT url, referrer FROM file_tasks")
+
+    def iter_checksums(self) -> Iterator[str]:
+        for (checksum,) in self._db.execute("SELECT checksum FROM checksums"):
+            yield checksum
+
+    def close(self):
+        self.flush()
+        self._db.close()
@@ -1,7 +1,9 @@
 from dataclasses import dataclass, field
-from typing import List, Optional
+from typing import Dict, List, Optional
 import random
 
+from .canonical import DEFAULT_DROP_QUERY_PARAMS
+from .sitemap import parse_lastmod
 
 USER_AGENTS = [
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/123.0.0.0 Safari/537.36",
@@ -36,8 +38,100 @@ class Config:
     respect_robots_txt: bool = True
     user_agent: Optional[str] = None
     min_delay_between_requests: float = 1.0
+    parse_workers: int = 0
+    parse_executor: str = "process"
+    max_pending_parses: int = 0
+    max_queued_urls: int = 0
+    max_queued_files: int = 1000
+    seen_backend: str = "exact"
+    seen_capacity: int = 1_000_000
+    seen_error_rate: float = 0.001
+    seen_path: Optional[str] = None
+    canonicalize_urls: bool = True
+    drop_query_params: List[str] = field(
+        default_factory=lambda: list(DEFAULT_DROP_QUERY_PARAMS)
+    )
+    sort_query_params: bool = True
+    strip_trailing_slash: bool = False
+    max_file_size: Optional[int] = None
+    max_page_size: Optional[int] = None
+    checkpoint_path: Optional[str] = None
+    http_cache_path: Optional[str] = None
+    transport: str = "aiohttp"
+    dns_cache_ttl: float = 300.0
+    dns_negative_ttl: float = 30.0
+    pre_resolve_dns: bool = True
+    keepalive_timeout: float = 15.0
+    pool_size: Optional[int] = None
+    pool_size_per_host: Optional[int] = None
+    robots_cache_ttl: float = 86400.0
+    robots_cache_size: int = 10_000
+    use_sitemaps: bool = False
+    sitemap_follow_links: bool = True
+    sitemap_changed_since: Optional[str] = None
+    max_sitemaps: int = 1000
+    frontier: str = "fifo"
+    score_depth_weight: float = 1.0
+    score_path_boosts: Dict[str, float] = field(default_factory=dict)
+    score_file_yield_weight: float = 1.0
+    storage_shard_depth: int = 0
+    storage_io_workers: int = 4
+    storage_buffer_size: int = 1024 * 1024
+    storage_fsync: str = "none"
+    storage_fsync_batch: int = 100
+    storage_backend: str = "files"
+    pack_max_size: int = 1024 * 1024 * 1024
+    dedup_index_path: Optional[str] = None
+    dedup_file_urls: bool = True
+    file_probe: str = "none"
+    shards: int = 1
+    metrics_port: Optional[int] = None
+    metrics_host: str = "127.0.0.1"
 
     def __post_init__(self):
+        if self.parse_executor not in ("process", "thread"):
+            raise ValueError(
+                f"parse_executor must be 'process' or 'thread', got {self.parse_executor!r}"
+            )
+        if self.seen_backend not in ("exact", "bloom", "disk"):
+            raise ValueError(
+                f"seen_backend must be 'exact', 'bloom' or 'disk', got {self.seen_backend!r}"
+            )
+        if self.transport not in ("aiohttp", "http2"):
+            raise ValueError(
+                f"transport must be 'aiohttp' or 'http2', got {self.transport!r}"
+            )
+        if self.frontier not in ("fifo", "priority"):
+            raise ValueError(
+                f"frontier must be 'fifo' or 'priority', got {self.frontier!r}"
+            )
+        if self.file_probe not in ("none", "head"):
+            raise ValueError(
+                f"file_probe must be 'none' or 'head', got {self.file_probe!r}"
+            )
+        if self.storage_backend not in ("files", "pack", "warc"):
+            raise ValueError(
+                f"storage_backend must be 'files', 'pack' or 'warc', got {self.storage_backend!r}"
+            )
+        if self.shards < 1:
+            raise ValueError(f"shards must be at least 1, got {self.shards}")
+        if self.shards > 1 and self.storage_backend != "files":
+            raise ValueError("pack storage backends cannot be shared by several shards")
+        if self.metrics_port is not None and not 0 <= self.metrics_port <= 65535:
+            raise ValueError(
+                f"metrics_port must be between 0 and 65535, got {self.metrics_port}"
+            )
+        if self.storage_fsync not in ("none", "batch", "always"):
+            raise ValueError(
+                f"storage_fsync must be 'none', 'batch' or 'always', got {self.storage_fsync!r}"
+            )
+        if (
+            self.sitemap_changed_since
+            and parse_lastmod(self.sitemap_changed_since) is None
+        ):
+            raise ValueError(
+                f"sitemap_changed_since must be an ISO 8601 date, got {self.sitemap_changed_since!r}"
+            )
         self.extensions = [
             ext.lower() if ext.startswith(".") else f".{ext.lower()}"
             for ext in self.extensions
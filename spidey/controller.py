@@ -1,11 +1,13 @@
 import asyncio
 import logging
 import threading
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields
 from enum import Enum
 from typing import Callable, Dict, List, Optional, Any
 from datetime import datetime
 
+from .metrics import Counters, MetricsRegistry
+
 
 logger = logging.getLogger(__name__)
 
@@ -31,6 +33,13 @@ class CrawlStats:
     requests_total: int = 0
     requests_successful: int = 0
     requests_failed: int = 0
+    seen_urls: int = 0
+    seen_memory_bytes: int = 0
+    duplicates_avoided: int = 0
+    not_modified: int = 0
+    bytes_saved: int = 0
+    file_urls_seen: int = 0
+    file_urls_deduplicated: int = 0
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
 
@@ -40,6 +49,18 @@ class CrawlStats:
             return (self.end_time - self.start_time).total_seconds()
         return None
 
+    @property
+    def memory_per_url(self) -> float:
+        if self.seen_urls > 0:
+            return self.seen_memory_bytes / self.seen_urls
+        return 0.0
+
+    @property
+    def file_dedup_rate(self) -> float:
+        if self.file_urls_seen > 0:
+            return self.file_urls_deduplicated / self.file_urls_seen * 100
+        return 0.0
+
     @property
     def success_rate(self) -> float:
         if self.requests_total > 0:
@@ -47,6 +68,38 @@ class CrawlStats:
         return 0.0
 
 
+STAT_COUNTERS = tuple(
+    f.name for f in fields(CrawlStats) if f.name not in ("start_time", "end_time")
+)
+
+# Stats read from the fetcher's counters of the same meaning, keyed by
+# stat name, rather than counted twice.
+REQUEST_STATS = {
+    "requests_total": "total_requests",
+    "requests_successful": "successful_requests",
+    "requests_failed": "failed_requests",
+}
+
+
+class CrawlCounters(Counters):
+    __slots__ = tuple(name for name in STAT_COUNTERS if name not in REQUEST_STATS)
+    GAUGES = ("urls_queued", "seen_memory_bytes")
+
+    pages_visited: int
+    urls_discovered: int
+    urls_queued: int
+    files_saved: int
+    files_skipped: int
+    bytes_downloaded: int
+    seen_urls: int
+    seen_memory_bytes: int
+    duplicates_avoided: int
+    not_modified: int
+    bytes_saved: int
+    file_urls_seen: int
+    file_urls_deduplicated: int
+
+
 @dataclass
 class CrawlEvent:
     """Event emitted during crawling."""
@@ -87,13 +140,23 @@ class EventEmitter:
 
 
 class Controller:
-    """Controls and monitors the crawler."""
+    """Controls and monitors the crawler.
+
+    Crawl counters live in a lock-free `CrawlCounters` updated from the event
+    loop. `metrics` is the registry where other components add their own
+    counters and histograms for one merged snapshot. Request stats come from
+    the counters passed to `track_requests`.
+    """
 
     def __init__(self):
         self._state = CrawlerState.IDLE
         self._state_lock = threading.RLock()
-        self._stats = CrawlStats()
-        self._stats_lock = threading.RLock()
+        self._counters = CrawlCounters()
+        self._requests: Optional[Counters] = None
+        self._start_time: Optional[datetime] = None
+        self._end_time: Optional[datetime] = None
+        self.metrics = MetricsRegistry()
+        self.metrics.add_counters("crawl", self._counters)
         self._events = EventEmitter()
         self._pause_event = asyncio.Event()
         self._pause_event.set()
@@ -119,7 +182,7 @@ class Controller:
 
     def start(self):
         """Mark crawler as started."""
-        self._stats.start_time = datetime.now()
+        self._start_time = datetime.now()
         self.set_state(CrawlerState.RUNNING)
         self._pause_event.set()
         self._stop_event.clear()
@@ -147,48 +210,44 @@ class Controller:
         with self._state_lock:
             if self._state in (CrawlerState.RUNNING, CrawlerState.PAUSED):
                 self.set_state(CrawlerState.STOPPED)
-                self._stats.end_time = datetime.now()
+                self._end_time = datetime.now()
 
     def complete(self):
         """Mark crawl as completed."""
-        self._stats.end_time = datetime.now()
+        self._end_time = datetime.now()
         self.set_state(CrawlerState.COMPLETED)
 
     async def wait_if_paused(self):
         """Wait if crawler is paused."""
         await self._pause_event.wait()
 
+    async def wait_until_stopped(self):
+        """Wait until `stop` is called."""
+        await self._stop_event.wait()
+
     def is_stopped(self) -> bool:
         return self._stop_event.is_set()
 
     def get_stats(self) -> CrawlStats:
-        with self._stats_lock:
-            return CrawlStats(
-                pages_visited=self._stats.pages_visited,
-                urls_discovered=self._stats.urls_discovered,
-                urls_queued=self._stats.urls_queued,
-                files_saved=self._stats.files_saved,
-                files_skipped=self._stats.files_skipped,
-                bytes_downloaded=self._stats.bytes_downloaded,
-                requests_total=self._stats.requests_total,
-                requests_successful=self._stats.requests_successful,
-                requests_failed=self._stats.requests_failed,
-                start_time=self._stats.start_time,
-                end_time=self._stats.end_time,
-            )
+        stats = CrawlStats(
+            **self._counters.snapshot(),
+            start_time=self._start_time,
+            end_time=self._end_time,
+        )
+        if self._requests is not None:
+            for stat, name in REQUEST_STATS.items():
+                setattr(stats, stat, getattr(self._requests, name))
+        return stats
+
+    def track_requests(self, counters: Counters):
+        """Report request stats from `counters`, normally the fetcher's."""
+        self._requests = counters
 
     def update_stats(self, **kwargs):
-        with self._stats_lock:
-            for key, value in kwargs.items():
-                if hasattr(self._stats, key):
-                    setattr(self._stats, key, value)
+        self._counters.set(**kwargs)
 
     def increment_stats(self, **kwargs):
-        with self._stats_lock:
-            for key, value in kwargs.items():
-                if hasattr(self._stats, key):
-                    current = getattr(self._stats, key)
-                    setattr(self._stats, key, current + value)
+        self._counters.add(**kwargs)
 
     def on(self, event_type: str, callback: Callable[[CrawlEvent], None]):
         self._events.on(event_type, callback)
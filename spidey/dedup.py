@@ -0,0 +1,232 @@
+import logging
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional, Set
+
+
+logger = logging.getLogger(__name__)
+
+
+INDEX_FILENAME = ".index.db"
+
+_CHECKSUM_NAME = re.compile(r"^[0-9a-f]{64}$")
+# `pack#offset` locations name a file plus a position inside it.
+_PACK_OFFSET = re.compile(r"#\d+$")
+
+# A claim still not confirmed after this long is taken to be from a writer
+# that crashed mid-write.
+STALE_CLAIM_SECONDS = 600.0
+
+
+@dataclass
+class IndexEntry:
+    """What the index knows about one stored checksum."""
+
+    checksum: str
+    path: Optional[str]
+    size: int
+    url: Optional[str]
+    content_type: Optional[str]
+
+
+class ChecksumIndex:
+    """Persistent content-addressed index: checksum -> path, size, first URL, type.
+
+    Backed by SQLite in WAL mode, so several crawler processes writing to the
+    same folder share it. Checksums seen by this process are also kept in a
+    set, making the common "already have it" check a set lookup; a miss falls
+    back to a primary-key lookup that picks up other processes' writes.
+
+    `claim` is the only way to add an entry. It inserts and commits at once,
+    so of two processes racing to store the same content exactly one wins.
+    The entry stays pending until `confirm` is called after the write; a
+    pending entry older than `STALE_CLAIM_SECONDS`, or a confirmed one whose
+    file has since been deleted, is dropped the first time this process
+    looks it up. A new index over an existing output folder is built by
+    scanning it for files named `<checksum><ext>`.
+    """
+
+    def __init__(self, path: str, scan_folder: Optional[str] = None):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._path = path
+        self._db = sqlite3.connect(
+            path, timeout=30.0, isolation_level=None, check_same_thread=False
+        )
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS objects ("
+            "checksum TEXT PRIMARY KEY, path TEXT, size INTEGER, url TEXT, "
+            "content_type TEXT, stored_at REAL, "
+            "confirmed INTEGER NOT NULL DEFAULT 1) WITHOUT ROWID"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(objects)")}
+        if "confirmed" not in columns:
+            # Indexes written before claims were confirmed after the write.
+            self._db.execute(
+                "ALTER TABLE objects ADD COLUMN confirmed INTEGER NOT NULL DEFAULT 1"
+            )
+        # Checksums this process has claimed or verified against the disk.
+        self._known: Set[str] = set()
+        self._stats = {"hits": 0, "misses": 0, "lost_races": 0, "stale": 0}
+
+        empty = self._db.execute("SELECT 1 FROM objects LIMIT 1").fetchone() is None
+        if empty and scan_folder:
+            self.scan(scan_folder)
+        (self._indexed,) = self._db.execute("SELECT COUNT(*) FROM objects").fetchone()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def scan(self, folder: str) -> int:
+        """Index files named `<checksum><ext>` under `folder`. Returns how many were added."""
+        rows = []
+        for root, dirs, files in os.walk(folder):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for name in files:
+                stem = os.path.splitext(name)[0]
+                if not _CHECKSUM_NAME.match(stem):
+                    continue
+                filepath = os.path.join(root, name)
+                try:
+                    size = os.path.getsize(filepath)
+                except OSError:
+                    continue
+                rows.append((stem, filepath, size, time.time()))
+        if rows:
+            with _Transaction(self._db):
+                self._db.executemany(
+                    "INSERT OR IGNORE INTO objects (checksum, path, size, stored_at) "
+                    "VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+            logger.info(f"Indexed {len(rows)} existing files in {folder}")
+        return len(rows)
+
+    def __contains__(self, checksum: str) -> bool:
+        if checksum in self._known or self._verify(checksum):
+            self._known.add(checksum)
+            self._stats["hits"] += 1
+            return True
+        self._stats["misses"] += 1
+        return False
+
+    def _verify(self, checksum: str) -> bool:
+        """True if an entry from another run or process is still valid.
+
+        Stale entries are deleted so the content can be stored again.
+        """
+        row = self._db.execute(
+            "SELECT path, confirmed, stored_at FROM objects WHERE checksum = ?",
+            (checksum,),
+        ).fetchone()
+        if row is None:
+            return False
+        path, confirmed, stored_at = row
+        if confirmed:
+            if path is None or os.path.exists(_PACK_OFFSET.sub("", path)):
+                return True
+        elif time.time() - (stored_at or 0) < STALE_CLAIM_SECONDS:
+            return True
+        cursor = self._db.execute(
+            "DELETE FROM objects WHERE checksum = ? AND stored_at IS ?",
+            (checksum, stored_at),
+        )
+        self._indexed -= cursor.rowcount
+        self._stats["stale"] += 1
+        logger.debug(f"Dropped stale index entry {checksum[:16]}...")
+        return False
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM objects").fetchone()[0]
+
+    def get(self, checksum: str) -> Optional[IndexEntry]:
+        row = self._db.execute(
+            "SELECT path, size, url, content_type FROM objects WHERE checksum = ?",
+            (checksum,),
+        ).fetchone()
+        if row is None:
+            return None
+        return IndexEntry(checksum, row[0], row[1] or 0, row[2], row[3])
+
+    def claim(
+        self,
+        checksum: str,
+        path: Optional[str],
+        size: int,
+        url: Optional[str] = None,
+        content_type: Optional[str] = None,
+    ) -> bool:
+        """Record `checksum` as being stored. Returns False if it was already indexed.
+
+        Call before writing; once the write is done `confirm` the claim, and
+        if it fails, `release` it.
+        """
+        if checksum in self._known:
+            self._stats["hits"] += 1
+            return False
+        if self._verify(checksum):
+            self._known.add(checksum)
+            self._stats["hits"] += 1
+            return False
+        cursor = self._db.execute(
+            "INSERT OR IGNORE INTO objects "
+            "(checksum, path, size, url, content_type, stored_at, confirmed) "
+            "VALUES (?, ?, ?, ?, ?, ?, 0)",
+            (checksum, path, size, url, content_type, time.time()),
+        )
+        self._known.add(checksum)
+        if cursor.rowcount == 0:
+            self._stats["hits"] += 1
+            self._stats["lost_races"] += 1
+            return False
+        self._indexed += 1
+        self._stats["misses"] += 1
+        return True
+
+    def confirm(self, checksum: str, path: Optional[str] = None):
+        """Mark a claimed entry as written, filling in `path` if it was not known."""
+        self._db.execute(
+            "UPDATE objects SET confirmed = 1, path = COALESCE(?, path) "
+            "WHERE checksum = ?",
+            (path, checksum),
+        )
+
+    def release(self, checksum: str):
+        """Drop a claim whose write failed, so the content can be stored later."""
+        cursor = self._db.execute("DELETE FROM objects WHERE checksum = ?", (checksum,))
+        self._indexed -= cursor.rowcount
+        self._known.discard(checksum)
+
+    def mark(self, checksums: Iterable[str]):
+        """Treat checksums as present without recording them (e.g. from a journal)."""
+        self._known.update(checksums)
+
+    def close(self):
+        self._db.close()
+
+    def get_stats(self) -> Dict[str, float]:
+        stats: Dict[str, float] = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["indexed"] = self._indexed
+        stats["hit_rate"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+class _Transaction:
+    """`with` block that wraps statements in BEGIN/COMMIT on an autocommit connection."""
+
+    def __init__(self, db: sqlite3.Connection):
+        self._db = db
+
+    def __enter__(self):
+        self._db.execute("BEGIN IMMEDIATE")
+
+    def __exit__(self, exc_type, exc, tb):
+        self._db.execute("ROLLBACK" if exc_type else "COMMIT")
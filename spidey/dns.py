@@ -0,0 +1,127 @@
+import asyncio
+import logging
+import socket
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+
+from aiohttp.abc import AbstractResolver
+from aiohttp.resolver import DefaultResolver
+
+from .metrics import Histogram, Timer
+
+if TYPE_CHECKING:
+    from aiohttp.abc import ResolveResult
+
+
+logger = logging.getLogger(__name__)
+
+
+_Key = Tuple[str, int, int]
+_Cached = Union[List["ResolveResult"], OSError]
+
+
+class CachingResolver(AbstractResolver):
+    """DNS resolver with a TTL cache, negative caching and single-flight lookups.
+
+    Successful lookups are kept for `ttl` seconds and failures for
+    `negative_ttl` seconds, so a dead host costs one lookup per window instead
+    of one per request. Concurrent lookups of the same host share a single
+    query. The cache holds at most `max_size` hosts, evicting the least
+    recently used.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 300.0,
+        negative_ttl: float = 30.0,
+        max_size: int = 10_000,
+        resolver: Optional[AbstractResolver] = None,
+    ):
+        self._ttl = ttl
+        self._negative_ttl = negative_ttl
+        self._max_size = max_size
+        self._resolver = resolver or DefaultResolver()
+        self._cache: "OrderedDict[_Key, Tuple[float, _Cached]]" = OrderedDict()
+        self._pending: Dict[_Key, asyncio.Future] = {}
+        self.latency = Histogram()
+        self._stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "negative_hits": 0,
+            "failures": 0,
+        }
+
+    async def resolve(
+        self, host: str, port: int = 0, family: socket.AddressFamily = socket.AF_INET
+    ) -> List["ResolveResult"]:
+        key = (host, port, int(family))
+        cached = self._cache.get(key)
+        if cached is not None:
+            expires_at, entry = cached
+            if expires_at > time.monotonic():
+                self._cache.move_to_end(key)
+                if isinstance(entry, OSError):
+                    self._stats["negative_hits"] += 1
+                    raise OSError(entry.errno, entry.strerror or str(entry))
+                self._stats["hits"] += 1
+                return entry
+            del self._cache[key]
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self._stats["hits"] += 1
+            return await asyncio.shield(pending)
+
+        self._stats["misses"] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            with Timer(self.latency):
+                result = await self._resolver.resolve(host, port, family)
+        except OSError as e:
+            self._stats["failures"] += 1
+            logger.debug(f"DNS lookup failed for {host}: {e}")
+            self._store(key, e, self._negative_ttl)
+            self._fail(future, e)
+            raise
+        except BaseException:
+            self._fail(future, OSError(f"DNS lookup for {host} was interrupted"))
+            raise
+        else:
+            self._store(key, result, self._ttl)
+            future.set_result(result)
+            return result
+        finally:
+            del self._pending[key]
+
+    @staticmethod
+    def _fail(future: asyncio.Future, error: OSError):
+        future.set_exception(error)
+        # Retrieve it so a future nobody else awaited does not log a warning.
+        future.exception()
+
+    def _store(self, key: _Key, result: _Cached, ttl: float):
+        if ttl <= 0:
+            return
+        self._cache[key] = (time.monotonic() + ttl, result)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self._max_size:
+            self._cache.popitem(last=False)
+
+    def clear(self):
+        self._cache.clear()
+
+    async def close(self):
+        await self._resolver.close()
+
+    def get_stats(self) -> Dict[str, float]:
+        lookups = self._stats["hits"] + self._stats["negative_hits"] + self._stats["misses"]
+        stats: Dict[str, float] = dict(self._stats)
+        stats["cached_hosts"] = len(self._cache)
+        stats["hit_rate"] = (
+            (self._stats["hits"] + self._stats["negative_hits"]) / lookups
+            if lookups
+            else 0.0
+        )
+        return stats
@@ -0,0 +1,250 @@
+import asyncio
+import json
+import logging
+import math
+import re
+from dataclasses import asdict
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .controller import Controller
+from .metrics import MetricsSnapshot
+
+
+logger = logging.getLogger(__name__)
+
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Largest per-domain queue depths exported, to bound label cardinality.
+MAX_DOMAIN_SERIES = 50
+
+# Minimum age of the snapshot that /status rates are computed against.
+RATE_WINDOW = 5.0
+
+READ_TIMEOUT = 10.0
+
+# Per-second rates reported by /status, keyed by the counters they derive from.
+STATUS_RATES = {
+    "pages_per_second": "crawl.pages_visited",
+    "bytes_per_second": "crawl.bytes_downloaded",
+    "requests_per_second": "fetcher.total_requests",
+    "retries_per_second": "fetcher.retries",
+    "rate_limited_per_second": "fetcher.rate_limited",
+    "robots_blocked_per_second": "fetcher.robots_blocked",
+}
+
+_INVALID_NAME_CHARS = re.compile(r"[^a-zA-Z0-9_]")
+
+_REASONS = {
+    200: "OK",
+    404: "Not Found",
+    405: "Method Not Allowed",
+}
+
+
+def _metric_name(name: str) -> str:
+    return "spidey_" + _INVALID_NAME_CHARS.sub("_", name)
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, float):
+        if math.isinf(value):
+            return "+Inf" if value > 0 else "-Inf"
+        if math.isnan(value):
+            return "NaN"
+    return repr(value)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_openmetrics(
+    snapshot: MetricsSnapshot, domain_sizes: Optional[List[Tuple[str, int]]] = None
+) -> str:
+    """Render a metrics snapshot in the OpenMetrics text format."""
+    lines = []
+    for key in sorted(snapshot.values):
+        name = _metric_name(key)
+        kind = snapshot.kinds.get(key, "unknown")
+        sample = name
+        if kind == "counter":
+            # Counter families are named without the `_total` of their sample.
+            if name.endswith("_total"):
+                name = name[: -len("_total")]
+            sample = f"{name}_total"
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{sample} {_format_value(snapshot.values[key])}")
+
+    for key in sorted(snapshot.histograms):
+        histogram = snapshot.histograms[key]
+        name = _metric_name(key)
+        lines.append(f"# TYPE {name} histogram")
+        if name.endswith("_seconds"):
+            lines.append(f"# UNIT {name} seconds")
+        for bound, count in histogram.buckets.items():
+            lines.append(f'{name}_bucket{{le="{_format_value(float(bound))}"}} {count}')
+        lines.append(f"{name}_count {histogram.count}")
+        lines.append(f"{name}_sum {_format_value(float(histogram.sum))}")
+
+    if domain_sizes is not None:
+        name = _metric_name("queue.domain_urls")
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"# HELP {name} URLs waiting per domain, largest {MAX_DOMAIN_SERIES} only.")
+        for domain, size in domain_sizes:
+            lines.append(f'{name}{{domain="{_escape_label(domain)}"}} {size}')
+
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """Live metrics and control endpoint, served from the crawler's event loop.
+
+    - `GET /metrics`: every metric in the controller's registry in
+      OpenMetrics format, plus per-domain queue depths.
+    - `GET /status`: JSON with state, stats, recent rates and latency
+      quantiles.
+    - `POST /pause`, `POST /resume`, `POST /stop`: drive the controller and
+      return the new status.
+
+    Requests are answered by a minimal HTTP/1.1 handler with one request
+    per connection; it is meant for scrapers and operators, not the open
+    internet. There is no authentication, so keep it bound to localhost or
+    a private interface.
+    """
+
+    def __init__(
+        self,
+        controller: Controller,
+        host: str = "127.0.0.1",
+        port: int = 9464,
+        domain_sizes: Optional[Callable[[int], List[Tuple[str, int]]]] = None,
+    ):
+        self._controller = controller
+        self._host = host
+        self._port = port
+        self._domain_sizes = domain_sizes
+        self._server: Optional[asyncio.base_events.Server] = None
+        self._window: Optional[MetricsSnapshot] = None
+
+    @property
+    def port(self) -> int:
+        """The bound port; differs from the configured one when that was 0."""
+        if self._server is not None and self._server.sockets:
+            return self._server.sockets[0].getsockname()[1]
+        return self._port
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self._host, self._port)
+        self._window = self._controller.metrics.snapshot()
+        logger.info(f"Serving metrics on http://{self._host}:{self.port}/metrics")
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.close()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+            parts = request_line.decode("latin-1").split()
+            if len(parts) < 2:
+                return
+            method, target = parts[0].upper(), parts[1]
+            while True:
+                line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+
+            status, content_type, body = self._respond(method, urlsplit(target).path)
+            head = (
+                f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Cache-Control: no-store\r\n"
+                "Connection: close\r\n\r\n"
+            )
+            writer.write(head.encode("latin-1") + (body if method != "HEAD" else b""))
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError) as e:
+            logger.debug(f"Metrics client error: {e}")
+        except Exception as e:
+            logger.warning(f"Metrics request failed: {e}")
+        finally:
+            writer.close()
+
+    def _respond(self, method: str, path: str) -> Tuple[int, str, bytes]:
+        path = path.rstrip("/") or "/"
+        actions = {
+            "/pause": self._controller.pause,
+            "/resume": self._controller.resume,
+            "/stop": self._controller.stop,
+        }
+        if path == "/metrics":
+            if method not in ("GET", "HEAD"):
+                return self._error(405, "use GET")
+            text = render_openmetrics(
+                self._controller.metrics.snapshot(),
+                self._domain_sizes(MAX_DOMAIN_SERIES) if self._domain_sizes else None,
+            )
+            return 200, OPENMETRICS_CONTENT_TYPE, text.encode("utf-8")
+        if path in ("/", "/status"):
+            if method not in ("GET", "HEAD"):
+                return self._error(405, "use GET")
+            return 200, "application/json", self._json(self.status())
+        if path in actions:
+            if method != "POST":
+                return self._error(405, "use POST")
+            actions[path]()
+            return 200, "application/json", self._json(self.status())
+        return self._error(404, f"no such endpoint: {path}")
+
+    def _error(self, status: int, message: str) -> Tuple[int, str, bytes]:
+        return status, "application/json", self._json({"error": message})
+
+    @staticmethod
+    def _json(data: Dict[str, object]) -> bytes:
+        return json.dumps(data, default=str).encode("utf-8")
+
+    def status(self) -> Dict[str, object]:
+        """Crawl state, stats, per-second rates over the last few seconds and latencies."""
+        stats = self._controller.get_stats()
+        snapshot = self._controller.metrics.snapshot()
+        window = self._window or snapshot
+        recent = snapshot.delta(window)
+        if recent.interval >= RATE_WINDOW:
+            self._window = snapshot
+
+        rates = {
+            rate: recent.values.get(key, 0) / recent.interval if recent.interval else 0.0
+            for rate, key in STATUS_RATES.items()
+        }
+        elapsed = None
+        if stats.start_time:
+            elapsed = ((stats.end_time or datetime.now()) - stats.start_time).total_seconds()
+
+        status: Dict[str, object] = {
+            "state": self._controller.state.value,
+            "elapsed": elapsed,
+            "stats": asdict(stats),
+            "rates": rates,
+            "in_flight_requests": snapshot.values.get("fetcher.in_flight", 0),
+            "latency": {
+                name: histogram.snapshot()
+                for name, histogram in snapshot.histograms.items()
+            },
+        }
+        if self._domain_sizes:
+            status["busiest_domains"] = dict(self._domain_sizes(10))
+        return status
@@ -1,172 +1,528 @@
 import asyncio
+import hashlib
 import logging
-import random
-from typing import Optional, Dict
-
-import aiohttp
-from aiohttp import ClientTimeout
-
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import (
+    Awaitable,
+    Callable,
+    Deque,
+    Dict,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from urllib.parse import urlsplit
 
 from .config import Config, get_random_user_agent
-from .robots import RobotsManager
+from .http_cache import CacheEntry, HTTPCache, NotModified
+from .metrics import Counters, Histogram
+from .robots import MAX_ROBOTS_SIZE, RobotsManager
+from .sitemap import MAX_SITEMAP_SIZE, SitemapParser
+from .transport import Transport, TransportError, TransportResponse, create_transport
+from .writer import StorageWriter
 
 
 logger = logging.getLogger(__name__)
 
 
-class RateLimiter:
-    """Token bucket rate limiter."""
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+HTML_CONTENT_TYPES = frozenset(["text/html", "application/xhtml+xml"])
+HTML_EXTENSIONS = (".html", ".htm", ".xhtml")
+# Generic types servers send for downloads without naming what they are.
+BINARY_CONTENT_TYPES = frozenset(["application/octet-stream", "binary/octet-stream"])
 
-    def __init__(self, rate: float, burst: int = 1):
-        self._rate = rate
-        self._burst = burst
-        self._tokens = float(burst)
-        self._last_update = 0.0
-        self._lock = asyncio.Lock()
+T = TypeVar("T")
 
-    async def acquire(self):
-        while True:
-            async with self._lock:
-                if self._last_update == 0.0:
-                    self._last_update = asyncio.get_running_loop().time()
 
-                now = asyncio.get_running_loop().time()
-                elapsed = now - self._last_update
-                self._tokens = min(self._burst, self._tokens + elapsed * self._rate)
-                self._last_update = now
+@dataclass
+class DownloadedFile:
+    """A downloaded response body, hashed on the way in.
 
-                if self._tokens >= 1:
-                    self._tokens -= 1
-                    return
+    Small bodies stay in memory as `content`; larger ones are spilled to
+    `temp_path`. Exactly one of the two is set.
+    """
 
-            await asyncio.sleep(0.05)
+    url: str
+    checksum: str
+    size: int
+    temp_path: Optional[Path] = None
+    content: Optional[bytes] = None
+    content_type: Optional[str] = None
+    headers: Dict[str, str] = field(default_factory=dict)
+    status: int = 200
+    reason: str = "OK"
+    http_version: str = "HTTP/1.1"
+    request_headers: Dict[str, str] = field(default_factory=dict)
 
 
-class DomainRateLimiter:
-    """Rate limiter per domain."""
+@dataclass
+class Page:
+    """An HTML response body, left undecoded for the parse pool to decode."""
 
-    def __init__(self, delay: float = 1.0):
-        self._delay = delay
-        self._last_request: Dict[str, float] = {}
-        self._lock = asyncio.Lock()
+    body: bytes
+    encoding: Optional[str] = None
 
-    async def acquire(self, domain: str):
-        async with self._lock:
-            last = self._last_request.get(domain, 0)
-            now = asyncio.get_running_loop().time()
-            wait_time = self._delay - (now - last)
-            if wait_time > 0:
-                await asyncio.sleep(wait_time)
-            self._last_request[domain] = asyncio.get_running_loop().time()
 
+@dataclass
+class NotHTML:
+    """A page URL that answered with another content type; its body is not read."""
 
-class Fetcher:
-    """Handles HTTP requests with retry logic and rate limiting."""
+    content_type: str
+
+
+class ResponseSkipped(Exception):
+    """Raised by a body reader to drop a response without reading its body."""
+
+
+def _is_html_path(url: str) -> bool:
+    return urlsplit(url).path.lower().endswith(HTML_EXTENSIONS)
+
+
+class _Bucket:
+    __slots__ = ("rate", "burst", "tokens", "updated")
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = now
+
+    def refill(self, now: float):
+        elapsed = now - self.updated
+        if elapsed > 0:
+            self.tokens = min(self.burst, self.tokens + elapsed * self.rate)
+            self.updated = now
+
+    def time_until_token(self) -> float:
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class LoopClock:
+    """Time source and timers for `RateLimiter`, backed by the running event loop.
+
+    Tests substitute an object with the same `now` and `call_later` methods
+    to drive the limiter without sleeping.
+    """
+
+    def now(self) -> float:
+        return time.monotonic()
+
+    def call_later(
+        self, delay: float, callback: Callable[[], None]
+    ) -> asyncio.TimerHandle:
+        return asyncio.get_running_loop().call_later(delay, callback)
+
+
+class RateLimiter:
+    """Token bucket rate limiter.
+
+    Instead of polling, waiters park on futures and a single timer fires at
+    the exact moment the next token becomes available. Waiters are served
+    FIFO within a key and round-robin across keys, so one busy host cannot
+    take the whole global budget. With `per_key_rate` each key additionally
+    gets its own bucket.
+
+    Both the token clock and the wake-up timer come from `clock`, which
+    defaults to a `LoopClock`.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        per_key_rate: Optional[float] = None,
+        per_key_burst: int = 1,
+        clock: Optional[LoopClock] = None,
+    ):
+        self._clock = clock or LoopClock()
+        self._rate = rate
+        self._burst = burst
+        self._bucket = _Bucket(rate, burst, self._clock.now())
+        self._per_key_rate = per_key_rate
+        self._per_key_burst = per_key_burst
+        self._key_buckets: Dict[str, _Bucket] = {}
+        self._waiters: Dict[str, Deque[Tuple[asyncio.Future, float]]] = {}
+        self._rotation: Deque[str] = deque()
+        self._depth = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._timer_at = 0.0
+        self.wait_times = Histogram()
+        self.queue_depths = Histogram(QUEUE_DEPTH_BUCKETS)
+
+    def _key_bucket(self, key: str, now: float) -> Optional[_Bucket]:
+        if not self._per_key_rate:
+            return None
+        bucket = self._key_buckets.get(key)
+        if bucket is None:
+            bucket = self._key_buckets[key] = _Bucket(
+                self._per_key_rate, self._per_key_burst, now
+            )
+        else:
+            bucket.refill(now)
+        return bucket
+
+    def _try_take(self, key: str, now: float) -> float:
+        """Take a token for `key` if possible. Returns 0 on success, else seconds to wait."""
+        key_bucket = self._key_bucket(key, now)
+        wait = self._bucket.time_until_token()
+        if key_bucket is not None:
+            wait = max(wait, key_bucket.time_until_token())
+        if wait > 0:
+            return wait
+        self._bucket.tokens -= 1
+        if key_bucket is not None:
+            key_bucket.tokens -= 1
+        return 0.0
+
+    async def acquire(self, key: str = ""):
+        now = self._clock.now()
+        self._bucket.refill(now)
+        self.queue_depths.observe(self._depth)
+
+        if self._depth == 0 and self._try_take(key, now) == 0:
+            self.wait_times.observe(0.0)
+            return
 
-    def __init__(self, config: Config):
+        waiter = asyncio.get_running_loop().create_future()
+        queue = self._waiters.get(key)
+        if queue is None:
+            queue = self._waiters[key] = deque()
+            self._rotation.append(key)
+        queue.append((waiter, now))
+        self._depth += 1
+        self._dispatch()
+
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.cancelled():
+                self._remove(key, waiter)
+            raise
+
+    def _remove(self, key: str, waiter: asyncio.Future):
+        queue = self._waiters.get(key)
+        if not queue:
+            return
+        for entry in queue:
+            if entry[0] is waiter:
+                queue.remove(entry)
+                self._depth -= 1
+                break
+        if not queue:
+            del self._waiters[key]
+            self._rotation.remove(key)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant tokens to waiting keys in round-robin order and re-arm the timer."""
+        now = self._clock.now()
+        self._bucket.refill(now)
+        next_wait: Optional[float] = None
+
+        idle_rounds = 0
+        while self._rotation and idle_rounds < len(self._rotation):
+            key = self._rotation[0]
+            self._rotation.rotate(-1)
+            queue = self._waiters[key]
+            wait = self._try_take(key, now)
+            if wait > 0:
+                idle_rounds += 1
+                next_wait = wait if next_wait is None else min(next_wait, wait)
+                continue
+
+            idle_rounds = 0
+            waiter, enqueued = queue.popleft()
+            self._depth -= 1
+            if not queue:
+                del self._waiters[key]
+                self._rotation.pop()
+            waiter.set_result(None)
+            self.wait_times.observe(now - enqueued)
+
+        if next_wait is not None:
+            self._arm_timer(now + next_wait)
+
+    def _arm_timer(self, when: float):
+        if self._timer is not None and not self._timer.cancelled():
+            if self._timer_at <= when:
+                return
+            self._timer.cancel()
+        self._timer_at = when
+        self._timer = self._clock.call_later(
+            max(0.0, when - self._clock.now()), self._on_timer
+        )
+
+    def _on_timer(self):
+        self._timer = None
+        self._dispatch()
+
+    def queue_depth(self) -> int:
+        """Number of callers currently waiting for a token."""
+        return self._depth
+
+    def get_stats(self) -> Dict[str, object]:
+        return {
+            "waiting": self._depth,
+            "wait_time": self.wait_times.snapshot(),
+            "queue_depth": self.queue_depths.snapshot(),
+        }
+
+
+class FetchCounters(Counters):
+    __slots__ = (
+        "total_requests",
+        "successful_requests",
+        "failed_requests",
+        "retries",
+        "robots_blocked",
+        "not_modified",
+        "bytes_saved",
+        "skipped_responses",
+        "rate_limited",
+        "in_flight",
+    )
+    GAUGES = ("in_flight",)
+
+    total_requests: int
+    successful_requests: int
+    failed_requests: int
+    retries: int
+    robots_blocked: int
+    not_modified: int
+    bytes_saved: int
+    skipped_responses: int
+    rate_limited: int
+    in_flight: int
+
+
+class Fetcher:
+    """Handles HTTP requests with retry logic and rate limiting.
+
+    Per-host politeness belongs to the URL queue, which only hands out pages
+    whose host may be requested now. Requests it does not schedule (file
+    downloads, probes, sitemaps) book a slot on the same per-host clock
+    through `reserve_slot`, which returns how long to wait first.
+
+    `is_stopped` is checked after the rate limiters and before every attempt,
+    so a stopped crawl sends no request that was still waiting for a slot.
+    """
+
+    def __init__(
+        self,
+        config: Config,
+        http_cache: Optional[HTTPCache] = None,
+        is_stopped: Optional[Callable[[], bool]] = None,
+        reserve_slot: Optional[Callable[[str], float]] = None,
+    ):
         self._config = config
-        self._session: Optional[aiohttp.ClientSession] = None
+        self._http_cache = http_cache
+        self._is_stopped = is_stopped or (lambda: False)
+        self._reserve_slot = reserve_slot
+        self._transport: Optional[Transport] = None
+        self._background_tasks: Set[asyncio.Task] = set()
+        self._robots_loads: Dict[str, "asyncio.Future[None]"] = {}
+        # Global pacing only: per-host spacing is left to the URL queue,
+        # which honours robots.txt Crawl-delay. Per-key buckets here would
+        # add a second, unconfigurable per-host rate on top of it.
         self._rate_limiter = RateLimiter(
             rate=config.max_concurrent_requests / 10,
             burst=config.max_concurrent_requests // 5,
         )
-        self._domain_limiter = DomainRateLimiter(
-            delay=config.min_delay_between_requests
+        self._robots_manager = RobotsManager(
+            ttl=config.robots_cache_ttl, max_hosts=config.robots_cache_size
         )
-        self._robots_manager = RobotsManager()
-        self._robots_fetched: set = set()
-        self._in_robots_fetch = False
-        self._stats: Dict[str, int] = {
-            "total_requests": 0,
-            "successful_requests": 0,
-            "failed_requests": 0,
-            "retries": 0,
-            "robots_blocked": 0,
-        }
+        self.counters = FetchCounters()
+        self.fetch_latency = Histogram()
         self._user_agent = config.user_agent or get_random_user_agent()
 
     async def __aenter__(self):
-        connector = aiohttp.TCPConnector(
-            limit=self._config.max_concurrent_requests,
-            limit_per_host=min(5, self._config.num_workers),
-        )
-        timeout = ClientTimeout(total=self._config.request_timeout)
-        self._session = aiohttp.ClientSession(
-            connector=connector,
-            timeout=timeout,
-            headers={
+        self._transport = create_transport(
+            self._config,
+            {
                 "User-Agent": self._user_agent,
                 "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8",
                 "Accept-Language": "en-US,en;q=0.5",
-                "Accept-Encoding": "gzip, deflate",
                 "Connection": "keep-alive",
                 "Upgrade-Insecure-Requests": "1",
             },
         )
+        await self._transport.open()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self._session:
-            await self._session.close()
+        tasks = list(self._background_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._transport:
+            await self._transport.close()
+
+    def _spawn(self, coro: Awaitable[None]) -> asyncio.Task:
+        task = asyncio.ensure_future(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    def prefetch(self, url: str):
+        """Start per-host setup for `url` in the background.
+
+        Resolves the host and loads its robots.txt, so the first page of a new
+        host does not wait for either.
+        """
+        if self._transport is None:
+            return
+        parsed = urlsplit(url)
+        try:
+            port = parsed.port or (443 if parsed.scheme == "https" else 80)
+        except ValueError:
+            return
+        if not parsed.hostname:
+            return
+        if self._config.pre_resolve_dns:
+            self._spawn(self._transport.prefetch(parsed.hostname, port))
+        if self._config.respect_robots_txt:
+            self._spawn(self._ensure_robots_loaded(url))
 
     async def _ensure_robots_loaded(self, url: str):
-        from urllib.parse import urlparse
-
-        parsed = urlparse(url)
-        domain = f"{parsed.scheme}://{parsed.netloc}"
+        """Load robots.txt for the URL's host once, however many callers ask.
 
-        if domain in self._robots_fetched:
+        Concurrent callers for the same host await one shared load.
+        """
+        if not self._config.respect_robots_txt:
+            return
+        if self._robots_manager.get(url) is not None:
             return
 
-        if self._config.respect_robots_txt:
-            self._in_robots_fetch = True
-            robots = self._robots_manager.get_robots(domain)
-            await robots.fetch(domain, self.fetch)
-            self._in_robots_fetch = False
-            self._robots_fetched.add(domain)
+        parsed = urlsplit(url)
+        origin = f"{parsed.scheme}://{parsed.netloc}"
+        load = self._robots_loads.get(origin)
+        if load is None:
+            load = self._spawn(self._load_robots(origin))
+            self._robots_loads[origin] = load
+            load.add_done_callback(lambda _: self._robots_loads.pop(origin, None))
+        await asyncio.shield(load)
 
-    def _is_allowed_by_robots(self, url: str) -> bool:
-        from urllib.parse import urlparse
+    async def _load_robots(self, origin: str):
+        await self._robots_manager.load(origin, self._fetch_robots)
+
+    async def _fetch_robots(self, url: str) -> Optional[str]:
+        """Fetch robots.txt outside the page pipeline's robots check and rate limits."""
+
+        async def read_robots(response: TransportResponse) -> str:
+            body = await response.read()
+            return body[:MAX_ROBOTS_SIZE].decode("utf-8", errors="replace")
+
+        result = await self._request(url, None, read_robots, robots_fetch=True)
+        return result if isinstance(result, str) else None
 
-        parsed = urlparse(url)
-        domain = f"{parsed.scheme}://{parsed.netloc}"
+    def get_crawl_delay(self, url: str) -> Optional[float]:
+        """Return the robots.txt Crawl-delay for the URL's host, if known."""
+        if not self._config.respect_robots_txt:
+            return None
+
+        robots = self._robots_manager.get(url)
+        if robots is None:
+            return None
+        return robots.get_crawl_delay(self._user_agent)
 
+    async def get_sitemaps(self, url: str) -> List[str]:
+        """Sitemap URLs for the URL's host: robots.txt `Sitemap:` lines plus `/sitemap.xml`."""
+        parsed = urlsplit(url)
+        sitemaps = []
+        if self._config.respect_robots_txt:
+            await self._ensure_robots_loaded(url)
+            robots = self._robots_manager.get(url)
+            if robots:
+                sitemaps.extend(robots.sitemaps)
+        default = f"{parsed.scheme}://{parsed.netloc}/sitemap.xml"
+        if default not in sitemaps:
+            sitemaps.append(default)
+        return sitemaps
+
+    def _is_allowed_by_robots(self, url: str) -> bool:
         if not self._config.respect_robots_txt:
             return True
 
-        robots = self._robots_manager.get_robots(domain)
+        robots = self._robots_manager.get_robots(url)
         return robots.is_allowed(url, self._user_agent)
 
-    async def fetch(self, url: str, referrer: Optional[str] = None) -> Optional[str]:
-        """Fetch URL with retry logic and rate limiting."""
-        if not self._in_robots_fetch:
+    async def _request(
+        self,
+        url: str,
+        referrer: Optional[str],
+        read_body: Callable[[TransportResponse], Awaitable[T]],
+        robots_fetch: bool = False,
+        method: str = "GET",
+        scheduled: bool = False,
+    ) -> Union[T, NotModified, None]:
+        """Shared response pipeline for every fetch flavour.
+
+        Handles robots.txt, cache validators, rate limiting, retries and status
+        codes once. `read_body` runs only after the status and headers have
+        been checked, so it can inspect `Content-Type`/`Content-Length` and
+        raise `ResponseSkipped` to drop a response without reading its body.
+
+        `scheduled` requests were already spaced by the URL queue and skip
+        `reserve_slot`. `robots_fetch` requests bypass the robots check, the
+        HTTP cache and all pacing.
+        """
+        entry = None
+        if not robots_fetch:
             await self._ensure_robots_loaded(url)
 
             if not self._is_allowed_by_robots(url):
                 logger.info(f"Blocked by robots.txt: {url}")
-                self._stats["robots_blocked"] += 1
+                self.counters.robots_blocked += 1
                 return None
 
-        from urllib.parse import urlparse
+            entry = self._cache_entry(url)
+            if entry is not None and entry.is_fresh():
+                return self._not_modified(url, entry, revalidated=False)
 
-        domain = urlparse(url).netloc
-        await self._domain_limiter.acquire(domain)
-        await self._rate_limiter.acquire()
+            if not scheduled and self._reserve_slot:
+                wait = self._reserve_slot(url)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            await self._rate_limiter.acquire(urlsplit(url).netloc)
+            if self._is_stopped():
+                return None
 
         headers = {}
         if referrer:
             headers["Referer"] = referrer
+        if entry is not None:
+            headers.update(entry.conditional_headers())
 
-        session = self._session
-        assert session is not None, (
-            "Session not initialized. Use async with Fetcher(config):"
-        )
+        transport = self._transport
+        assert (
+            transport is not None
+        ), "Session not initialized. Use async with Fetcher(config):"
 
         for attempt in range(self._config.max_retries):
+            if self._is_stopped():
+                break
             try:
-                self._stats["total_requests"] += 1
-                async with session.get(url, headers=headers) as response:
+                self.counters.total_requests += 1
+                self.counters.in_flight += 1
+                started = time.perf_counter()
+                async with transport.request(method, url, headers) as response:
+                    if response.status == 304 and entry is not None:
+                        # An entry only exists when there is a cache to refresh.
+                        assert self._http_cache is not None
+                        self._http_cache.refresh(url, response.headers)
+                        return self._not_modified(url, entry)
+
                     if response.status == 429:
+                        self.counters.rate_limited += 1
                         retry_after = int(response.headers.get("Retry-After", 5))
                         logger.warning(f"Rate limited, waiting {retry_after}s")
                         await asyncio.sleep(retry_after)
@@ -174,98 +530,219 @@ class Fetcher:
 
                     if response.status == 403:
                         logger.warning(f"Access forbidden (403) for {url}")
-                        self._stats["failed_requests"] += 1
+                        self.counters.failed_requests += 1
                         return None
 
                     response.raise_for_status()
-                    content = await response.text()
-                    self._stats["successful_requests"] += 1
-                    return content
+                    result = await read_body(response)
+                    self.fetch_latency.observe(time.perf_counter() - started)
+                    self.counters.successful_requests += 1
+                    return result
+
+            except ResponseSkipped as e:
+                logger.info(f"Skipping {url}: {e}")
+                self.counters.skipped_responses += 1
+                break
 
-            except aiohttp.ClientError as e:
+            except TransportError as e:
                 logger.debug(f"Attempt {attempt + 1} failed for {url}: {e}")
                 if attempt < self._config.max_retries - 1:
                     delay = self._config.retry_delay * (2**attempt)
                     await asyncio.sleep(delay)
-                    self._stats["retries"] += 1
+                    self.counters.retries += 1
                 else:
-                    self._stats["failed_requests"] += 1
+                    self.counters.failed_requests += 1
                     logger.error(
                         f"Failed to fetch {url} after {self._config.max_retries} attempts"
                     )
 
             except Exception as e:
                 logger.debug(f"Non-retryable error fetching {url}: {e}")
-                self._stats["failed_requests"] += 1
+                self.counters.failed_requests += 1
                 break
 
+            finally:
+                self.counters.in_flight -= 1
+
         return None
 
-    async def fetch_bytes(
+    @staticmethod
+    def _check_size(response: TransportResponse, max_size: Optional[int]):
+        if max_size and (response.content_length or 0) > max_size:
+            raise ResponseSkipped(
+                f"Content-Length {response.content_length} exceeds {max_size} bytes"
+            )
+
+    def _store_validators(
+        self,
+        url: str,
+        response: TransportResponse,
+        size: int,
+        checksum: Optional[str] = None,
+    ):
+        if self._http_cache:
+            self._http_cache.store_response(
+                url, response.headers, size, checksum, response.content_type
+            )
+
+    async def fetch(
         self, url: str, referrer: Optional[str] = None
-    ) -> Optional[bytes]:
-        """Fetch URL and return raw bytes."""
-        if not self._in_robots_fetch:
-            await self._ensure_robots_loaded(url)
-
-            if not self._is_allowed_by_robots(url):
-                logger.info(f"Blocked by robots.txt: {url}")
-                self._stats["robots_blocked"] += 1
-                return None
-
-        from urllib.parse import urlparse
-
-        domain = urlparse(url).netloc
-        await self._domain_limiter.acquire(domain)
-        await self._rate_limiter.acquire()
-
-        headers = {}
-        if referrer:
-            headers["Referer"] = referrer
-
-        session = self._session
-        assert session is not None, (
-            "Session not initialized. Use async with Fetcher(config):"
-        )
-
-        for attempt in range(self._config.max_retries):
+    ) -> Union[Page, NotHTML, NotModified, None]:
+        """Fetch an HTML page and return its body with the declared charset.
+
+        Non-HTML responses return `NotHTML` and pages over `max_page_size`
+        are dropped, both before their body is read. With an HTTP cache, returns `NotModified` when the
+        cached entry is still fresh or the server answers 304.
+        """
+
+        async def read_page(response: TransportResponse) -> Union[Page, NotHTML]:
+            if (
+                "Content-Type" in response.headers
+                and response.content_type not in HTML_CONTENT_TYPES
+            ):
+                return NotHTML(response.content_type)
+            self._check_size(response, self._config.max_page_size)
+
+            body = await response.read()
+            self._store_validators(url, response, len(body))
+            return Page(body, response.charset)
+
+        return await self._request(url, referrer, read_page, scheduled=True)
+
+    async def download(
+        self,
+        url: str,
+        writer: StorageWriter,
+        referrer: Optional[str] = None,
+        max_size: Optional[int] = None,
+    ) -> Union[DownloadedFile, NotModified, None]:
+        """Stream URL into a `writer` spool, hashing chunks as they arrive.
+
+        Bodies up to the writer's buffer size stay in memory; larger ones are
+        written to a temp file in coalesced chunks on the storage pool.
+        Bodies larger than `max_size`, and HTML error pages served in place of
+        a file, are dropped and their temp file removed. Cached files that are
+        fresh or revalidated with a 304 return `NotModified` without
+        downloading the body.
+        """
+
+        async def read_file(response: TransportResponse) -> DownloadedFile:
+            self._check_size(response, max_size)
+            if response.content_type in HTML_CONTENT_TYPES and not _is_html_path(url):
+                raise ResponseSkipped(
+                    f"served {response.content_type} instead of a file"
+                )
+
+            spool = writer.spool()
             try:
-                self._stats["total_requests"] += 1
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 429:
-                        retry_after = int(response.headers.get("Retry-After", 5))
-                        logger.warning(f"Rate limited, waiting {retry_after}s")
-                        await asyncio.sleep(retry_after)
-                        continue
-
-                    if response.status == 403:
-                        logger.warning(f"Access forbidden (403) for {url}")
-                        self._stats["failed_requests"] += 1
-                        return None
+                digest = hashlib.sha256()
+                size = 0
+                async for chunk in response.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    if max_size and size > max_size:
+                        raise ResponseSkipped(f"body exceeds {max_size} bytes")
+                    digest.update(chunk)
+                    await spool.write(chunk)
+                content = await spool.finish()
+            except BaseException:
+                spool.discard()
+                raise
+
+            checksum = digest.hexdigest()
+            self._store_validators(url, response, size, checksum)
+            return DownloadedFile(
+                url=url,
+                checksum=checksum,
+                size=size,
+                temp_path=spool.temp_path,
+                content=content,
+                content_type=response.content_type,
+                headers=dict(response.headers),
+                status=response.status,
+                reason=response.reason,
+                http_version=response.http_version,
+                request_headers=dict(response.request_headers),
+            )
+
+        return await self._request(url, referrer, read_file)
+
+    async def probe(
+        self,
+        url: str,
+        referrer: Optional[str] = None,
+        max_size: Optional[int] = None,
+    ) -> Union[TransportResponse, NotModified, None]:
+        """Send a HEAD request to learn a file's size and type before downloading.
+
+        Returns the headers-only response, `NotModified` if the cached copy is
+        still valid, or None when the file would be rejected anyway (too large,
+        HTML in place of a file, error status).
+        """
+
+        async def read_head(response: TransportResponse) -> TransportResponse:
+            self._check_size(response, max_size)
+            if response.content_type in HTML_CONTENT_TYPES and not _is_html_path(url):
+                raise ResponseSkipped(
+                    f"served {response.content_type} instead of a file"
+                )
+            return response
+
+        return await self._request(url, referrer, read_head, method="HEAD")
+
+    async def fetch_sitemap(self, url: str) -> Optional[SitemapParser]:
+        """Stream-parse a sitemap or sitemap index, gzipped or not.
+
+        Returns None when the sitemap is unavailable, or unchanged since the
+        last run according to the HTTP cache.
+        """
+
+        async def read_sitemap(response: TransportResponse) -> SitemapParser:
+            self._check_size(response, MAX_SITEMAP_SIZE)
+            parser = SitemapParser()
+            size = 0
+            try:
+                async for chunk in response.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                    size += len(chunk)
+                    parser.feed(chunk)
+                parser.close()
+            except ValueError as e:
+                raise ResponseSkipped(f"unreadable sitemap: {e}")
+            self._store_validators(url, response, size)
+            return parser
+
+        result = await self._request(url, None, read_sitemap)
+        return result if isinstance(result, SitemapParser) else None
+
+    def _cache_entry(self, url: str) -> Optional[CacheEntry]:
+        if self._http_cache is None:
+            return None
+        return self._http_cache.get(url)
+
+    def _not_modified(
+        self, url: str, entry: CacheEntry, revalidated: bool = True
+    ) -> NotModified:
+        self.counters.not_modified += 1
+        self.counters.bytes_saved += entry.size
+        if revalidated:
+            self.counters.successful_requests += 1
+        return NotModified(url=url, entry=entry, revalidated=revalidated)
 
-                    response.raise_for_status()
-                    content = await response.read()
-                    self._stats["successful_requests"] += 1
-                    return content
+    def get_stats(self) -> Dict[str, int]:
+        return self.counters.snapshot()
 
-            except aiohttp.ClientError as e:
-                logger.debug(f"Attempt {attempt + 1} failed for {url}: {e}")
-                if attempt < self._config.max_retries - 1:
-                    delay = self._config.retry_delay * (2**attempt)
-                    await asyncio.sleep(delay)
-                    self._stats["retries"] += 1
-                else:
-                    self._stats["failed_requests"] += 1
-                    logger.error(
-                        f"Failed to fetch {url} after {self._config.max_retries} attempts"
-                    )
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        """The global token bucket, for its wait-time and queue-depth histograms."""
+        return self._rate_limiter
 
-            except Exception as e:
-                logger.debug(f"Non-retryable error fetching {url}: {e}")
-                self._stats["failed_requests"] += 1
-                break
+    def get_connection_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-host new/reused connection counts and reuse ratio."""
+        return self._transport.get_connection_stats() if self._transport else {}
 
-        return None
+    def get_dns_latency(self) -> Optional[Histogram]:
+        """Latency of DNS lookups that missed the cache, if the transport caches DNS."""
+        return self._transport.get_dns_latency() if self._transport else None
 
-    def get_stats(self) -> Dict[str, int]:
-        return self._stats.copy()
+    def get_dns_stats(self) -> Dict[str, float]:
+        """Hit, miss and failure counts of the caching DNS resolver."""
+        return self._transport.get_dns_stats() if self._transport else {}
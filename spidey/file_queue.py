@@ -1,55 +1,103 @@
+import asyncio
 import logging
-import threading
-from queue import Queue
-from typing import List, Optional, Tuple, Set
+from collections import deque
+from typing import Deque, List, Optional, Tuple
+
+from .queue import _wait, _wake_all, _wake_one
 
 
 logger = logging.getLogger(__name__)
 
 
 class FileQueue:
-    """Thread-safe queue for files to download."""
+    """Bounded asyncio-native queue for files to download.
+
+    `put` waits while the queue is full so page workers cannot outrun the
+    downloaders, and `get` waits until a task arrives or the queue is closed.
+    """
+
+    def __init__(self, maxsize: int = 0):
+        self._queue: Deque[Tuple[str, str]] = deque()
+        self._maxsize = maxsize
+        self._getters: Deque[asyncio.Future] = deque()
+        self._putters: Deque[asyncio.Future] = deque()
+        self._joiners: Deque[asyncio.Future] = deque()
+        self._unfinished = 0
+        self._closed = False
+
+    def _is_full(self) -> bool:
+        return 0 < self._maxsize <= len(self._queue)
 
-    def __init__(self):
-        self._queue: Queue = Queue()
-        self._lock = threading.Lock()
-        self._processed: Set[str] = set()
+    def put_nowait(self, url: str, referrer: str) -> bool:
+        """Add a file without waiting. Returns False if the queue is full or closed."""
+        if self._closed or self._is_full():
+            return False
+        self._queue.append((url, referrer))
+        self._unfinished += 1
+        _wake_one(self._getters)
+        return True
 
-    def put(self, url: str, referrer: str):
-        """Add a file to the download queue."""
-        self._queue.put((url, referrer))
+    async def put(self, url: str, referrer: str) -> bool:
+        """Add a file to the download queue, waiting for space if needed."""
+        while self._is_full():
+            if self._closed:
+                return False
+            await _wait(self._putters)
+        return self.put_nowait(url, referrer)
 
-    def put_batch(self, items: List[Tuple[str, str]]):
+    async def put_batch(self, items: List[Tuple[str, str]]):
         """Add multiple files to the download queue."""
         for url, referrer in items:
-            self._queue.put((url, referrer))
+            await self.put(url, referrer)
 
-    def get(self) -> Optional[Tuple[str, str]]:
-        """Get next file task. Returns (url, referrer) or None."""
-        if self._queue.empty():
+    def get_nowait(self) -> Optional[Tuple[str, str]]:
+        """Get next file task without waiting. Returns (url, referrer) or None."""
+        if not self._queue:
             return None
-        return self._queue.get()
+        item = self._queue.popleft()
+        _wake_one(self._putters)
+        return item
+
+    async def get(self) -> Optional[Tuple[str, str]]:
+        """Wait for the next file task. Returns None once the queue is closed."""
+        while not self._queue:
+            if self._closed:
+                return None
+            await _wait(self._getters)
+        return self.get_nowait()
 
     def get_batch(self, size: int) -> List[Tuple[str, str]]:
-        """Get up to `size` file tasks."""
-        batch = []
-        for _ in range(min(size, self._queue.qsize())):
-            if not self._queue.empty():
-                batch.append(self._queue.get())
+        """Get up to `size` file tasks without waiting."""
+        batch: List[Tuple[str, str]] = []
+        while self._queue and len(batch) < size:
+            batch.append(self._queue.popleft())
+            _wake_one(self._putters)
         return batch
 
-    def mark_processed(self, checksum: str):
-        """Mark a file as processed by its checksum."""
-        with self._lock:
-            self._processed.add(checksum)
+    def task_done(self):
+        """Mark a task returned by `get` as finished."""
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            _wake_all(self._joiners)
+
+    async def join(self):
+        """Wait until every queued file has been processed or the queue is closed."""
+        while self._unfinished > 0 and not self._closed:
+            await _wait(self._joiners)
 
-    def is_processed(self, checksum: str) -> bool:
-        """Check if file with this checksum was already processed."""
-        with self._lock:
-            return checksum in self._processed
+    def close(self):
+        """Reject new tasks and release every waiting producer and consumer."""
+        self._closed = True
+        _wake_all(self._getters)
+        _wake_all(self._putters)
+        _wake_all(self._joiners)
 
     def is_empty(self) -> bool:
-        return self._queue.empty()
+        return not self._queue
+
+    def unfinished(self) -> int:
+        """Files queued or being downloaded."""
+        return self._unfinished
 
     def size(self) -> int:
-        return self._queue.qsize()
\ No newline at end of file
+        return len(self._queue)
@@ -0,0 +1,174 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Mapping, Optional
+
+
+logger = logging.getLogger(__name__)
+
+
+_MAX_AGE = re.compile(r"(?:^|,)\s*(?:s-maxage|max-age)\s*=\s*\"?(\d+)", re.I)
+
+
+@dataclass
+class CacheEntry:
+    """Validators and metadata remembered for one canonical URL."""
+
+    url: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    expires_at: float = 0.0
+    checksum: Optional[str] = None
+    size: int = 0
+    content_type: Optional[str] = None
+    page_links: List[str] = field(default_factory=list)
+    file_links: List[str] = field(default_factory=list)
+
+    def is_fresh(self, now: Optional[float] = None) -> bool:
+        return self.expires_at > (now if now is not None else time.time())
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+@dataclass
+class NotModified:
+    """Returned by the fetcher when the cached copy is still valid.
+
+    `revalidated` is False when the entry was fresh and no request was sent.
+    """
+
+    url: str
+    entry: CacheEntry
+    revalidated: bool = True
+
+
+def parse_max_age(cache_control: Optional[str]) -> Optional[int]:
+    """Return max-age seconds, 0 for no-cache, or None if not cacheable/unspecified."""
+    if not cache_control:
+        return None
+    lowered = cache_control.lower()
+    if "no-store" in lowered:
+        return None
+    if "no-cache" in lowered:
+        return 0
+    match = _MAX_AGE.search(cache_control)
+    return int(match.group(1)) if match else None
+
+
+class HTTPCache:
+    """SQLite-backed store of HTTP validators keyed by canonical URL."""
+
+    def __init__(self, path: str, commit_every: int = 500):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._commit_every = commit_every
+        self._uncommitted = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS http_cache ("
+            "url TEXT PRIMARY KEY, etag TEXT, last_modified TEXT, "
+            "expires_at REAL, checksum TEXT, size INTEGER, content_type TEXT, "
+            "page_links TEXT, file_links TEXT)"
+        )
+        self._db.commit()
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        row = self._db.execute(
+            "SELECT etag, last_modified, expires_at, checksum, size, content_type, "
+            "page_links, file_links FROM http_cache WHERE url = ?",
+            (url,),
+        ).fetchone()
+        if row is None:
+            return None
+        return CacheEntry(
+            url=url,
+            etag=row[0],
+            last_modified=row[1],
+            expires_at=row[2] or 0.0,
+            checksum=row[3],
+            size=row[4] or 0,
+            content_type=row[5],
+            page_links=json.loads(row[6]) if row[6] else [],
+            file_links=json.loads(row[7]) if row[7] else [],
+        )
+
+    def store_response(
+        self,
+        url: str,
+        headers: Mapping[str, str],
+        size: int,
+        checksum: Optional[str] = None,
+        content_type: Optional[str] = None,
+    ):
+        """Remember validators from a 200 response. Uncacheable responses are dropped."""
+        cache_control = headers.get("Cache-Control")
+        if cache_control and "no-store" in cache_control.lower():
+            self.forget(url)
+            return
+
+        max_age = parse_max_age(cache_control)
+        etag = headers.get("ETag")
+        last_modified = headers.get("Last-Modified")
+        if not (etag or last_modified or max_age):
+            return
+
+        expires_at = time.time() + max_age if max_age else 0.0
+        self._db.execute(
+            "INSERT INTO http_cache (url, etag, last_modified, expires_at, checksum, "
+            "size, content_type) VALUES (?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT(url) DO UPDATE SET etag = excluded.etag, "
+            "last_modified = excluded.last_modified, expires_at = excluded.expires_at, "
+            "checksum = excluded.checksum, size = excluded.size, "
+            "content_type = excluded.content_type",
+            (url, etag, last_modified, expires_at, checksum, size, content_type),
+        )
+        self._maybe_commit()
+
+    def refresh(self, url: str, headers: Mapping[str, str]):
+        """Extend freshness after a 304, which may carry a new Cache-Control."""
+        max_age = parse_max_age(headers.get("Cache-Control"))
+        if max_age:
+            self._db.execute(
+                "UPDATE http_cache SET expires_at = ? WHERE url = ?",
+                (time.time() + max_age, url),
+            )
+            self._maybe_commit()
+
+    def forget(self, url: str):
+        """Drop the entry for `url`, so the next fetch is unconditional."""
+        self._db.execute("DELETE FROM http_cache WHERE url = ?", (url,))
+        self._maybe_commit()
+
+    def store_links(self, url: str, page_links: List[str], file_links: List[str]):
+        """Attach extracted links to a page entry so a 304 can replay them."""
+        self._db.execute(
+            "UPDATE http_cache SET page_links = ?, file_links = ? WHERE url = ?",
+            (json.dumps(page_links), json.dumps(file_links), url),
+        )
+        self._maybe_commit()
+
+    def _maybe_commit(self):
+        self._uncommitted += 1
+        if self._uncommitted >= self._commit_every:
+            self.commit()
+
+    def commit(self):
+        self._db.commit()
+        self._uncommitted = 0
+
+    def close(self):
+        self.commit()
+        self._db.close()
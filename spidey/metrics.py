@@ -0,0 +1,304 @@
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Mapping, Sequence, Tuple
+
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+
+
+class Histogram:
+    """Fixed-bucket histogram for latency-style observations."""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        self._bounds = tuple(sorted(buckets))
+        self._counts: List[int] = [0] * (len(self._bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self._counts[bisect_left(self._bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Approximate quantile as the upper bound of the bucket containing it."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self._bounds, self._counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    @property
+    def buckets(self) -> Dict[float, int]:
+        """Cumulative counts keyed by bucket upper bound, including `inf`."""
+        cumulative = {}
+        seen = 0
+        for bound, count in zip(self._bounds + (float("inf"),), self._counts):
+            seen += count
+            cumulative[bound] = seen
+        return cumulative
+
+    def copy(self) -> "Histogram":
+        clone = Histogram.__new__(Histogram)
+        clone._bounds = self._bounds
+        clone._counts = list(self._counts)
+        clone.count = self.count
+        clone.sum = self.sum
+        return clone
+
+    def __add__(self, other: "Histogram") -> "Histogram":
+        """Observations of both histograms, which must share bucket bounds."""
+        total = self.copy()
+        total._counts = [a + b for a, b in zip(self._counts, other._counts)]
+        total.count += other.count
+        total.sum += other.sum
+        return total
+
+    def __sub__(self, other: "Histogram") -> "Histogram":
+        """Observations made since `other`, an earlier copy of this histogram."""
+        diff = self.copy()
+        diff._counts = [a - b for a, b in zip(self._counts, other._counts)]
+        diff.count -= other.count
+        diff.sum -= other.sum
+        return diff
+
+    def snapshot(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "p50": self.quantile(0.5),
+            "p90": self.quantile(0.9),
+            "p99": self.quantile(0.99),
+        }
+
+
+class Timer:
+    """`with Timer(histogram):` observes the block's wall-clock duration."""
+
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: Histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+_COUNTER_NAMES: Dict[type, Tuple[str, ...]] = {}
+
+
+class Counters:
+    """A fixed set of integer counters stored in `__slots__`.
+
+    Subclasses name their counters in `__slots__`. An update is a plain
+    attribute increment with no lock and no dict lookup, so all updates
+    must come from one thread, normally the event loop. Other threads may
+    read at any time: an int attribute is never torn, at worst a read is a
+    few increments behind.
+
+    Names listed in `GAUGES` hold current levels rather than running totals.
+    """
+
+    __slots__ = ()
+    GAUGES: Tuple[str, ...] = ()
+
+    def __init__(self):
+        for name in self.names():
+            setattr(self, name, 0)
+
+    @classmethod
+    def names(cls) -> Tuple[str, ...]:
+        names = _COUNTER_NAMES.get(cls)
+        if names is None:
+            names = _COUNTER_NAMES[cls] = tuple(
+                name
+                for klass in reversed(cls.__mro__)
+                for name in klass.__dict__.get("__slots__", ())
+            )
+        return names
+
+    def add(self, **amounts: int):
+        """Increment several counters. Unknown names are ignored."""
+        for name, amount in amounts.items():
+            try:
+                setattr(self, name, getattr(self, name) + amount)
+            except AttributeError:
+                pass
+
+    def set(self, **values: int):
+        """Overwrite several counters. Unknown names are ignored."""
+        for name, value in values.items():
+            try:
+                setattr(self, name, value)
+            except AttributeError:
+                pass
+
+    def snapshot(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.names()}
+
+
+@dataclass
+class MetricsSnapshot:
+    """Point-in-time copy of every registered metric.
+
+    `values` maps dotted names (`"fetcher.total_requests"`) to numbers;
+    `kinds` marks each as `"counter"`, `"gauge"` or `"unknown"`;
+    `histograms` holds copies that `delta` can subtract.
+    """
+
+    timestamp: float
+    values: Dict[str, float] = field(default_factory=dict)
+    histograms: Dict[str, Histogram] = field(default_factory=dict)
+    interval: float = 0.0
+    kinds: Dict[str, str] = field(default_factory=dict)
+
+    def delta(self, earlier: "MetricsSnapshot") -> "MetricsSnapshot":
+        """Change since `earlier`. Divide by `interval` for per-second rates.
+
+        Gauges keep their current value.
+        """
+        values = {
+            name: value
+            if self.kinds.get(name) == "gauge"
+            else value - earlier.values.get(name, 0)
+            for name, value in self.values.items()
+        }
+        histograms = {
+            name: histogram - earlier.histograms[name]
+            if name in earlier.histograms
+            else histogram
+            for name, histogram in self.histograms.items()
+        }
+        return MetricsSnapshot(
+            self.timestamp,
+            values,
+            histograms,
+            self.timestamp - earlier.timestamp,
+            self.kinds,
+        )
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "timestamp": self.timestamp,
+            "interval": self.interval,
+            "values": dict(self.values),
+            "histograms": {
+                name: histogram.snapshot() for name, histogram in self.histograms.items()
+            },
+        }
+
+
+def merge_snapshots(snapshots: Iterable[MetricsSnapshot]) -> MetricsSnapshot:
+    """Combine snapshots taken in several processes into one.
+
+    Values and histograms are summed, except ratios (names ending in
+    `_rate`), which are averaged.
+    """
+    values: Dict[str, float] = {}
+    histograms: Dict[str, Histogram] = {}
+    kinds: Dict[str, str] = {}
+    ratios: Dict[str, int] = {}
+    timestamp = 0.0
+    for snapshot in snapshots:
+        timestamp = max(timestamp, snapshot.timestamp)
+        for name, value in snapshot.values.items():
+            values[name] = values.get(name, 0) + value
+            if name.endswith("_rate"):
+                ratios[name] = ratios.get(name, 0) + 1
+        for name, histogram in snapshot.histograms.items():
+            histograms[name] = (
+                histograms[name] + histogram if name in histograms else histogram
+            )
+        kinds.update(snapshot.kinds)
+    for name, count in ratios.items():
+        values[name] /= count
+    return MetricsSnapshot(timestamp, values, histograms, kinds=kinds)
+
+
+def _flatten(prefix: str, stats: Mapping, out: Dict[str, float]):
+    for key, value in stats.items():
+        name = f"{prefix}.{key}"
+        if isinstance(value, Mapping):
+            _flatten(name, value, out)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            out[name] = value
+
+
+class MetricsRegistry:
+    """One merged view over the counters, histograms and stats of many components.
+
+    Components keep owning their metrics; the registry only holds references
+    and reads them when a snapshot is taken. `add_collector` takes any
+    `get_stats`-style callable returning a (possibly nested) dict; its
+    values are all reported as `kind`. `add_remote` takes snapshots made in
+    other processes; they are merged and fill in names not registered here.
+    """
+
+    def __init__(self):
+        self._counters: Dict[str, Counters] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._collectors: Dict[str, Tuple[Callable[[], Mapping], str]] = {}
+        self._remote: List[Callable[[], Iterable[MetricsSnapshot]]] = []
+
+    def add_counters(self, prefix: str, counters: Counters):
+        self._counters[prefix] = counters
+
+    def add_histogram(self, name: str, histogram: Histogram):
+        self._histograms[name] = histogram
+
+    def add_collector(
+        self, prefix: str, collect: Callable[[], Mapping], kind: str = "unknown"
+    ):
+        self._collectors[prefix] = (collect, kind)
+
+    def add_remote(self, collect: Callable[[], Iterable[MetricsSnapshot]]):
+        self._remote.append(collect)
+
+    def snapshot(self) -> MetricsSnapshot:
+        values: Dict[str, float] = {}
+        kinds: Dict[str, str] = {}
+        for prefix, counters in self._counters.items():
+            for name in counters.names():
+                key = f"{prefix}.{name}"
+                values[key] = getattr(counters, name)
+                kinds[key] = "gauge" if name in counters.GAUGES else "counter"
+        for prefix, (collect, kind) in self._collectors.items():
+            collected: Dict[str, float] = {}
+            _flatten(prefix, collect(), collected)
+            values.update(collected)
+            kinds.update(dict.fromkeys(collected, kind))
+        histograms = {
+            name: histogram.copy() for name, histogram in self._histograms.items()
+        }
+        for collect_remote in self._remote:
+            remote = merge_snapshots(collect_remote())
+            for key, value in remote.values.items():
+                if key not in values:
+                    values[key] = value
+                    kinds[key] = remote.kinds.get(key, "unknown")
+            for key, histogram in remote.histograms.items():
+                histograms.setdefault(key, histogram)
+        return MetricsSnapshot(time.monotonic(), values, histograms, kinds=kinds)
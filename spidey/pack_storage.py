@@ -0,0 +1,364 @@
+import asyncio
+import base64
+import logging
+import mmap
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import TYPE_CHECKING, BinaryIO, Dict, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .metrics import Timer
+from .storage import Storage, StorageCounters
+
+if TYPE_CHECKING:
+    from .fetcher import DownloadedFile
+
+logger = logging.getLogger(__name__)
+
+
+# Hop-by-hop and encoding headers no longer describe the stored (decoded) body.
+_DROPPED_HEADERS = frozenset(
+    ["content-encoding", "transfer-encoding", "content-length", "connection"]
+)
+
+
+def _http_block(first_line: str, headers: Mapping[str, str]) -> bytes:
+    lines = [first_line]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8", "replace")
+
+
+def _warc_header(fields: Dict[str, str]) -> bytes:
+    lines = ["WARC/1.1"]
+    lines.extend(f"{name}: {value}" for name, value in fields.items())
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("utf-8", "replace")
+
+
+class PackCounters(StorageCounters):
+    __slots__ = ("packs",)
+
+    packs: int
+
+
+class PackStorage(Storage):
+    """Appends objects to rolling, size-capped pack files instead of one file each.
+
+    `format="pack"` stores raw bodies back to back; `format="warc"` writes a
+    WARC/1.1 request and response record per object, with the HTTP headers.
+    Either way an SQLite index in the pack folder maps checksum and every
+    URL seen with that content to `(pack, offset, length)` of the body, so
+    `read` returns it through an mmap without parsing the pack.
+    Deduplication goes through the shared `ChecksumIndex` like the per-file
+    backend, recording `pack#offset` as the path.
+
+    The index connection, the open pack and the mmap cache are shared by
+    I/O pool jobs and readers, so every use goes through `_io_lock`.
+
+    Bodies are stored decoded, so `Content-Encoding` and `Content-Length`
+    are dropped from archived response headers.
+    """
+
+    counters: PackCounters
+
+    def __init__(
+        self,
+        folder: str,
+        format: str = "warc",
+        max_pack_size: int = 1024 * 1024 * 1024,
+        io_workers: int = 4,
+        buffer_size: int = 1024 * 1024,
+        fsync: str = "none",
+        fsync_batch: int = 100,
+        index_path: Optional[str] = None,
+    ):
+        super().__init__(
+            folder,
+            io_workers=io_workers,
+            buffer_size=buffer_size,
+            fsync=fsync,
+            fsync_batch=fsync_batch,
+            index_path=index_path,
+        )
+        self._format = format
+        self._suffix = ".warc" if format == "warc" else ".pack"
+        self._max_pack_size = max_pack_size
+        self._fsync = fsync
+        self._fsync_batch = fsync_batch
+        self._pack_dir = self._folder / "packs"
+        self._pack_dir.mkdir(parents=True, exist_ok=True)
+        self._append_lock = asyncio.Lock()
+        self._io_lock = threading.Lock()
+        self._pack_file: Optional[BinaryIO] = None
+        self._pack_path: Optional[Path] = None
+        self._pack_size = 0
+        self._uncommitted = 0
+        self._maps: Dict[str, Tuple[mmap.mmap, int]] = {}
+
+        self._db = sqlite3.connect(self._pack_dir / "index.db", check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS objects ("
+                "checksum TEXT PRIMARY KEY, url TEXT, pack TEXT, "
+                "offset INTEGER, length INTEGER, content_type TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS objects_url ON objects (url)")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, checksum TEXT)"
+            )
+            # Indexes written before the urls table existed only know each
+            # object's first URL.
+            self._db.execute(
+                "INSERT OR IGNORE INTO urls (url, checksum) "
+                "SELECT url, checksum FROM objects WHERE url IS NOT NULL"
+            )
+        self.counters = PackCounters()
+
+    def _open_pack(self, needed: int):
+        """Open the newest pack for appending, rolling over when it would overflow."""
+        if self._pack_file is not None:
+            if self._pack_size == 0 or self._pack_size + needed <= self._max_pack_size:
+                return
+            self._close_pack()
+
+        existing = sorted(self._pack_dir.glob(f"pack-*{self._suffix}"))
+        index = 0
+        if existing:
+            last = existing[-1]
+            index = int(last.stem.split("-", 1)[1])
+            if last.stat().st_size + needed > self._max_pack_size and last.stat().st_size:
+                index += 1
+        self._pack_path = self._pack_dir / f"pack-{index:05d}{self._suffix}"
+        self._pack_file = open(self._pack_path, "ab")
+        self._pack_size = self._pack_file.tell()
+        if self._pack_size == 0:
+            self.counters.packs += 1
+
+    def _close_pack(self):
+        if self._pack_file is not None:
+            self._pack_file.flush()
+            if self._fsync != "none":
+                os.fsync(self._pack_file.fileno())
+            self._pack_file.close()
+            self._pack_file = None
+
+    def _warc_records(
+        self, download: "DownloadedFile", body_length: int, digest: bytes
+    ) -> Tuple[bytes, bytes, bytes]:
+        """Return (request record, response record head, response record tail)."""
+        now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        response_id = f"<urn:uuid:{uuid.uuid4()}>"
+        parsed = urlsplit(download.url)
+        target = parsed.path or "/"
+        if parsed.query:
+            target = f"{target}?{parsed.query}"
+
+        request_headers = dict(download.request_headers)
+        if not any(name.lower() == "host" for name in request_headers):
+            request_headers = {"Host": parsed.netloc, **request_headers}
+        request_block = _http_block(
+            f"GET {target} {download.http_version}", request_headers
+        )
+        request = _warc_header(
+            {
+                "WARC-Type": "request",
+                "WARC-Record-ID": f"<urn:uuid:{uuid.uuid4()}>",
+                "WARC-Date": now,
+                "WARC-Target-URI": download.url,
+                "WARC-Concurrent-To": response_id,
+                "Content-Type": "application/http; msgtype=request",
+                "Content-Length": str(len(request_block)),
+            }
+        ) + request_block + b"\r\n\r\n"
+
+        response_headers = {
+            name: value
+            for name, value in download.headers.items()
+            if name.lower() not in _DROPPED_HEADERS
+        }
+        response_headers["Content-Length"] = str(body_length)
+        http_head = _http_block(
+            f"{download.http_version} {download.status} {download.reason}".rstrip(),
+            response_headers,
+        )
+        payload_digest = base64.b32encode(digest).decode("ascii")
+        head = _warc_header(
+            {
+                "WARC-Type": "response",
+                "WARC-Record-ID": response_id,
+                "WARC-Date": now,
+                "WARC-Target-URI": download.url,
+                "WARC-Payload-Digest": f"sha256:{payload_digest}",
+                "Content-Type": "application/http; msgtype=response",
+                "Content-Length": str(len(http_head) + body_length),
+            }
+        ) + http_head
+        return request, head, b"\r\n\r\n"
+
+    def _append(
+        self, download: "DownloadedFile", content: Optional[bytes], temp_path: Optional[Path]
+    ) -> Tuple[str, int, int]:
+        """Append one object on the I/O pool. Returns (pack name, body offset, body length)."""
+        if content is not None:
+            length = len(content)
+        else:
+            assert temp_path is not None
+            length = os.path.getsize(temp_path)
+        if self._format == "warc":
+            request, head, tail = self._warc_records(
+                download, length, bytes.fromhex(download.checksum)
+            )
+        else:
+            request, head, tail = b"", b"", b""
+
+        with self._io_lock:
+            self._open_pack(len(request) + len(head) + length + len(tail))
+            pack, pack_path = self._pack_file, self._pack_path
+            assert pack is not None and pack_path is not None
+            pack.write(request)
+            pack.write(head)
+            offset = self._pack_size + len(request) + len(head)
+            if content is not None:
+                pack.write(content)
+            else:
+                assert temp_path is not None
+                with open(temp_path, "rb") as source:
+                    shutil.copyfileobj(source, pack, self.writer.buffer_size)
+                os.unlink(temp_path)
+            pack.write(tail)
+            self._pack_size = offset + length + len(tail)
+            if self._fsync == "always":
+                pack.flush()
+                os.fsync(pack.fileno())
+            return pack_path.name, offset, length
+
+    def _index(self, download: "DownloadedFile", pack: str, offset: int, length: int):
+        with self._io_lock:
+            self._db.execute(
+                "INSERT OR IGNORE INTO objects "
+                "(checksum, url, pack, offset, length, content_type) VALUES (?, ?, ?, ?, ?, ?)",
+                (download.checksum, download.url, pack, offset, length, download.content_type),
+            )
+            self._add_url(download.url, download.checksum)
+
+    def _index_url(self, url: str, checksum: str):
+        """Record another URL for content that is already stored."""
+        with self._io_lock:
+            self._add_url(url, checksum)
+
+    def _add_url(self, url: str, checksum: str):
+        self._db.execute(
+            "INSERT OR REPLACE INTO urls (url, checksum) VALUES (?, ?)", (url, checksum)
+        )
+        self._uncommitted += 1
+        if self._uncommitted >= self._fsync_batch:
+            self._commit_index()
+
+    def _commit_index(self):
+        # The pack is flushed (and fsynced if configured) before the index
+        # that points into it, so a committed entry never references lost bytes.
+        if self._pack_file is not None:
+            self._pack_file.flush()
+            if self._fsync != "none":
+                os.fsync(self._pack_file.fileno())
+        self._db.commit()
+        self._uncommitted = 0
+
+    async def save_download(self, download: "DownloadedFile") -> Optional[str]:
+        """Append a downloaded body to the current pack. Returns `pack#offset`."""
+        checksum = download.checksum
+        if not self.index.claim(
+            checksum, None, download.size, download.url, download.content_type
+        ):
+            await self.writer.discard(download.temp_path)
+            await self.writer.run(self._index_url, download.url, checksum)
+            self.counters.files_skipped += 1
+            logger.debug(f"Skipping duplicate: {checksum[:16]}...")
+            return None
+
+        try:
+            async with self._append_lock:
+                with Timer(self.write_latency):
+                    pack, offset, length = await self.writer.run(
+                        self._append, download, download.content, download.temp_path
+                    )
+                    await self.writer.run(self._index, download, pack, offset, length)
+        except Exception as e:
+            self.index.release(checksum)
+            await self.writer.discard(download.temp_path)
+            logger.warning(f"Failed to pack {download.url}: {e}")
+            return None
+
+        location = f"{pack}#{offset}"
+        self.index.confirm(checksum, str(self._pack_dir / location))
+        self.counters.files_saved += 1
+        self.counters.bytes_written += length
+        logger.debug(f"Packed: {checksum[:16]}... into {pack} at {offset}")
+        return location
+
+    def locate(self, checksum: Optional[str] = None, url: Optional[str] = None):
+        """Return `(pack, offset, length, content_type)` by checksum or URL."""
+        with self._io_lock:
+            return self._locate(checksum, url)
+
+    def _locate(self, checksum: Optional[str], url: Optional[str]):
+        if checksum is None:
+            row = self._db.execute("SELECT checksum FROM urls WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            checksum = row[0]
+        return self._db.execute(
+            "SELECT pack, offset, length, content_type FROM objects WHERE checksum = ?",
+            (checksum,),
+        ).fetchone()
+
+    def read(self, checksum: Optional[str] = None, url: Optional[str] = None) -> Optional[bytes]:
+        """Read a stored body by checksum or URL through a cached mmap of its pack.
+
+        Safe to call while a crawl is writing; it waits for any append in
+        progress on the I/O pool.
+        """
+        with self._io_lock:
+            location = self._locate(checksum, url)
+            if location is None:
+                return None
+            pack, offset, length, _ = location
+            if length == 0:
+                return b""
+            if self._pack_file is not None and self._pack_path is not None:
+                if self._pack_path.name == pack:
+                    self._pack_file.flush()
+            return self._map(pack, offset + length)[offset : offset + length]
+
+    def _map(self, pack: str, end: int) -> mmap.mmap:
+        """Return a cached mmap of `pack` that covers at least `end` bytes."""
+        mapped = self._maps.get(pack)
+        if mapped is None or mapped[1] < end:
+            if mapped is not None:
+                mapped[0].close()
+            with open(self._pack_dir / pack, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                mapped = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ), size)
+            self._maps[pack] = mapped
+        return mapped[0]
+
+    def _close(self):
+        with self._io_lock:
+            self._commit_index()
+            self._close_pack()
+            for mapped, _ in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            self._db.close()
+
+    async def close(self):
+        """Flush the pack and index, then stop the I/O pool."""
+        async with self._append_lock:
+            await self.writer.run(self._close)
+        await super().close()
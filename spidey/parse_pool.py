@@ -0,0 +1,79 @@
+import asyncio
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Optional, Tuple, Union
+
+from .config import Config
+from .metrics import Histogram, Timer
+from .parser import Parser
+
+
+logger = logging.getLogger(__name__)
+
+
+def _decode(body: bytes, encoding: Optional[str]) -> str:
+    try:
+        return body.decode(encoding or "utf-8", errors="replace")
+    except LookupError:
+        # Unknown charset name in the Content-Type header.
+        return body.decode("utf-8", errors="replace")
+
+
+def _extract_links(
+    html: Union[str, bytes], base_url: str, encoding: Optional[str] = None
+) -> Tuple[List[str], List[str]]:
+    """Worker entry point. Returns compact link lists instead of sets."""
+    if isinstance(html, bytes):
+        html = _decode(html, encoding)
+    page_urls, file_urls = Parser.extract_links(html, base_url)
+    return list(page_urls), list(file_urls)
+
+
+class ParsePool:
+    """Runs link extraction off the event loop on a process or thread pool.
+
+    Pages are handed over as raw bytes and decoded by the worker, so neither
+    decoding nor parsing runs on the loop.
+    """
+
+    def __init__(self, config: Config):
+        self._workers = config.parse_workers
+        self._mode = config.parse_executor
+        self._executor: Optional[Executor] = None
+        self._pending: Optional[asyncio.Semaphore] = None
+        self._max_pending = config.max_pending_parses or self._workers * 2
+        self.latency = Histogram()
+
+    async def __aenter__(self):
+        if self._workers > 0:
+            if self._mode == "process":
+                self._executor = ProcessPoolExecutor(max_workers=self._workers)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self._workers, thread_name_prefix="spidey-parse"
+                )
+            self._pending = asyncio.Semaphore(self._max_pending)
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        if self._executor:
+            executor, self._executor = self._executor, None
+            # Waiting for in-flight parses would block the loop.
+            await asyncio.get_running_loop().run_in_executor(
+                None, executor.shutdown, True
+            )
+
+    async def extract_links(
+        self, html: Union[str, bytes], base_url: str, encoding: Optional[str] = None
+    ) -> Tuple[List[str], List[str]]:
+        """Extract `(page_urls, file_urls)`, waiting for a slot when the pool is saturated."""
+        if self._executor is None or self._pending is None:
+            with Timer(self.latency):
+                return _extract_links(html, base_url, encoding)
+
+        async with self._pending:
+            loop = asyncio.get_running_loop()
+            with Timer(self.latency):
+                return await loop.run_in_executor(
+                    self._executor, _extract_links, html, base_url, encoding
+                )
@@ -1,5 +1,6 @@
 import logging
-from typing import Set, Optional
+from html.parser import HTMLParser
+from typing import List, Optional, Set, Tuple
 from urllib.parse import urljoin
 
 from bs4 import BeautifulSoup
@@ -9,49 +10,96 @@ import validators
 logger = logging.getLogger(__name__)
 
 
+FILE_TAGS = frozenset(["img", "link", "script", "video", "source"])
+FILE_ATTRIBUTES = ("href", "src")
+SRCSET_TAGS = frozenset(["img", "source"])
+
+
+class _LinkExtractor(HTMLParser):
+    """Single-pass tokenizer that collects page and file links without building a DOM."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.base_href: Optional[str] = None
+        self.page_hrefs: List[str] = []
+        self.file_hrefs: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "a":
+            for name, value in attrs:
+                if name == "href" and value:
+                    self.page_hrefs.append(value)
+        elif tag in FILE_TAGS:
+            for name, value in attrs:
+                if not value:
+                    continue
+                if name in FILE_ATTRIBUTES:
+                    self.file_hrefs.append(value)
+                elif name == "srcset" and tag in SRCSET_TAGS:
+                    self.file_hrefs.extend(_parse_srcset(value))
+        elif tag == "base" and self.base_href is None:
+            for name, value in attrs:
+                if name == "href" and value:
+                    self.base_href = value
+
+
+def _parse_srcset(value: str) -> List[str]:
+    """Return the URL part of each `srcset` candidate."""
+    urls = []
+    for candidate in value.split(","):
+        parts = candidate.split()
+        if parts:
+            urls.append(parts[0])
+    return urls
+
+
 class Parser:
     """Parses HTML content and extracts URLs and file links."""
 
     @staticmethod
-    def extract_page_urls(html: str, base_url: str) -> Set[str]:
-        """Extract all anchor links from HTML."""
+    def extract_links(html: str, base_url: str) -> Tuple[Set[str], Set[str]]:
+        """Extract page links and file links from HTML in a single scan.
+
+        Returns `(page_urls, file_urls)`, both resolved against the page's
+        `<base href>` when present.
+        """
         try:
-            soup = BeautifulSoup(html, "html.parser")
-            urls = set()
+            extractor = _LinkExtractor()
+            extractor.feed(html)
+            extractor.close()
+
+            base = base_url
+            if extractor.base_href:
+                base = urljoin(base_url, extractor.base_href.strip())
 
-            for link in soup.find_all("a", href=True):
-                href = link["href"]
+            page_urls = set()
+            for href in extractor.page_hrefs:
+                href = href.strip()
                 if href and not href.startswith("#"):
-                    absolute_url = urljoin(base_url, href)
+                    absolute_url = urljoin(base, href)
                     if validators.url(absolute_url):
-                        urls.add(absolute_url)
+                        page_urls.add(absolute_url)
+
+            file_urls = set()
+            for href in extractor.file_hrefs:
+                href = href.strip()
+                if href:
+                    file_urls.add(urljoin(base, href))
 
-            return urls
+            return page_urls, file_urls
         except Exception as e:
-            logger.error(f"Failed to extract page URLs: {e}")
-            return set()
+            logger.error(f"Failed to extract links: {e}")
+            return set(), set()
+
+    @staticmethod
+    def extract_page_urls(html: str, base_url: str) -> Set[str]:
+        """Extract all anchor links from HTML."""
+        return Parser.extract_links(html, base_url)[0]
 
     @staticmethod
     def extract_file_urls(html: str, base_url: str) -> Set[str]:
         """Extract file URLs from img, link, script, video, source tags."""
-        try:
-            soup = BeautifulSoup(html, "html.parser")
-            urls = set()
-            selectors = ["img", "link", "script", "video", "source"]
-            attributes = ["href", "src"]
-
-            for tag in soup.find_all(selectors):
-                for attr in attributes:
-                    if tag.has_attr(attr):
-                        href = tag[attr]
-                        if href:
-                            absolute_url = urljoin(base_url, href)
-                            urls.add(absolute_url)
-
-            return urls
-        except Exception as e:
-            logger.error(f"Failed to extract file URLs: {e}")
-            return set()
+        return Parser.extract_links(html, base_url)[1]
 
     @staticmethod
     def get_content_type(html: str) -> Optional[str]:
@@ -1,8 +1,13 @@
+import asyncio
+import heapq
+import itertools
 import logging
-import threading
+import time
 from collections import deque
-from typing import Dict, List, Set
-from urllib.parse import urlparse
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple, Union
+from urllib.parse import urlsplit
+
+from .seen import FingerprintSeenStore, SeenStore
 
 
 logger = logging.getLogger(__name__)
@@ -11,93 +16,392 @@ logger = logging.getLogger(__name__)
 def get_domain(url: str) -> str:
     """Extract domain from URL."""
     try:
-        parsed = urlparse(url)
+        parsed = urlsplit(url)
         return parsed.netloc
     except Exception:
         return ""
 
 
+def _wake_one(waiters: Deque[asyncio.Future]):
+    while waiters:
+        waiter = waiters.popleft()
+        if not waiter.done():
+            waiter.set_result(None)
+            return
+
+
+def _wake_all(waiters: Deque[asyncio.Future]):
+    while waiters:
+        waiter = waiters.popleft()
+        if not waiter.done():
+            waiter.set_result(None)
+
+
+def _set_if_pending(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+async def _wait(waiters: Deque[asyncio.Future], timeout: Optional[float] = None):
+    """Park the current task in `waiters` until woken or `timeout` elapses."""
+    loop = asyncio.get_running_loop()
+    waiter = loop.create_future()
+    waiters.append(waiter)
+    timer = loop.call_later(timeout, _set_if_pending, waiter) if timeout else None
+    try:
+        await waiter
+    except asyncio.CancelledError:
+        try:
+            waiters.remove(waiter)
+        except ValueError:
+            _wake_one(waiters)
+        raise
+    finally:
+        if timer:
+            timer.cancel()
+
+
 class URLQueue:
-    """Thread-safe queue for URLs with batch operations and domain rotation."""
-
-    def __init__(self):
-        self._queues: Dict[str, deque] = {}
-        self._domain_order: List[str] = []
-        self._visited: Set[str] = set()
-        self._lock = threading.RLock()
-
-    def add_batch(self, urls: List[str]) -> int:
-        """Add multiple URLs grouped by domain. Returns count of newly added URLs."""
-        added = 0
-        with self._lock:
-            for url in urls:
-                if url in self._visited:
-                    continue
-
-                domain = get_domain(url)
-                if not domain:
-                    continue
-
-                if domain not in self._queues:
-                    self._queues[domain] = deque()
-                    self._domain_order.append(domain)
-
-                if url not in self._queues[domain]:
-                    self._queues[domain].append(url)
-                    added += 1
+    """Asyncio-native URL frontier with batch operations and domain rotation.
+
+    Consumers await `next_batch` instead of polling. The queue reports itself
+    drained once it is empty and every handed-out URL has been marked done
+    with `task_done`, which lets workers exit without a timeout heuristic.
+
+    Enqueue, dedupe membership, domain rotation and size are all O(1): every
+    URL is recorded in the seen store when it is first enqueued, and only
+    domains with pending URLs sit in the rotation deque.
+
+    With a politeness `delay`, a domain that has just handed out a URL moves
+    to a heap keyed by the time it becomes eligible again, so the queue only
+    ever returns URLs whose host may be requested right now. Requests made
+    outside the queue, such as file downloads, book their slot on the same
+    per-host clock with `reserve_slot`.
+
+    `on_new_domain` is called with the first URL enqueued for each domain, so
+    per-host setup such as DNS resolution can start before the URL is handed
+    out.
+
+    With a `scorer`, each domain's URLs are kept in a heap instead of a FIFO
+    and handed out highest score first. Domains still take turns, so one
+    high-scoring host cannot starve the others. Enqueue and dequeue stay
+    O(log n) in the domain's backlog. `rescore` pushes fresh entries for a
+    referrer's waiting links when an adaptive scorer learns more about them;
+    superseded entries are skipped when they reach the top of the heap.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 0,
+        delay: float = 0.0,
+        seen: Optional[SeenStore] = None,
+        on_enqueue: Optional[Callable[[List[str], Optional[str], int], None]] = None,
+        on_new_domain: Optional[Callable[[str], None]] = None,
+        scorer: Optional[Callable[[str, Optional[str], int], float]] = None,
+    ):
+        self._queues: Dict[str, Union[Deque[str], List[Tuple[float, int, str]]]] = {}
+        self._ready_domains: Deque[str] = deque()
+        self._cooling: List[Tuple[float, str]] = []
+        self._next_ready: Dict[str, float] = {}
+        self._delay = delay
+        self._domain_delays: Dict[str, float] = {}
+        self._seen = seen if seen is not None else FingerprintSeenStore()
+        self._on_enqueue = on_enqueue
+        self._on_new_domain = on_new_domain
+        self._known_domains: Set[str] = set()
+        self._scorer = scorer
+        self._sequence = itertools.count()
+        self._context: Dict[str, Tuple[int, Optional[str]]] = {}
+        # Scored URLs only: current (score, sequence) and waiting links per referrer.
+        self._entries: Dict[str, Tuple[float, int]] = {}
+        self._children: Dict[str, Set[str]] = {}
+        self._stale: Dict[str, int] = {}
+        self._size = 0
+        self._maxsize = maxsize
+        self._getters: Deque[asyncio.Future] = deque()
+        self._in_flight = 0
+        self._closed = False
+        self._dropped = 0
+
+    def add_batch(
+        self, urls: List[str], referrer: Optional[str] = None, depth: int = 0
+    ) -> int:
+        """Add multiple URLs grouped by domain. Returns count of newly added URLs.
+
+        `referrer` and `depth` (link hops from a seed) are passed to the
+        scorer and `on_enqueue`, and handed back by `pop_context` once the
+        URL is dequeued.
+
+        When the queue is bounded and full, further URLs are dropped rather
+        than blocking: URL workers are both producers and consumers, so
+        waiting for space here could stall every worker at once.
+        """
+        return len(self.add_urls(urls, referrer, depth))
+
+    def add_urls(
+        self,
+        urls: List[str],
+        referrer: Optional[str] = None,
+        depth: int = 0,
+        restore: bool = False,
+    ) -> List[str]:
+        """Like `add_batch`, but returns the URLs that were newly added.
+
+        Each URL costs one seen-store `add`, which both tests and records it.
+        With `restore`, URLs are queued even if already seen and not passed
+        to `on_enqueue`, for frontiers reloaded from a journal alongside a
+        persistent seen store.
+        """
+        added: List[str] = []
+        for url in urls:
+            domain = get_domain(url)
+            if not domain:
+                continue
+
+            if self._maxsize and self._size >= self._maxsize:
+                if url not in self._seen:
+                    self._dropped += 1
+                continue
+
+            if not self._seen.add(url) and not restore:
+                continue
+
+            if domain not in self._known_domains:
+                self._known_domains.add(domain)
+                if self._on_new_domain:
+                    self._on_new_domain(url)
+
+            domain_queue = self._queues.get(domain)
+            if domain_queue is None:
+                domain_queue = self._queues[domain] = [] if self._scorer else deque()
+                self._schedule(domain, self._next_ready.get(domain, 0.0))
+
+            if isinstance(domain_queue, deque):
+                domain_queue.append(url)
+            else:
+                score = self._scorer(url, referrer, depth) if self._scorer else 0.0
+                sequence = next(self._sequence)
+                heapq.heappush(domain_queue, (-score, sequence, url))
+                self._entries[url] = (score, sequence)
+                if referrer is not None:
+                    self._children.setdefault(referrer, set()).add(url)
+            self._context[url] = (depth, referrer)
+            self._size += 1
+            added.append(url)
+            _wake_one(self._getters)
+
+        if added and self._on_enqueue and not restore:
+            self._on_enqueue(added, referrer, depth)
         return added
 
     def get_batch(self, size: int) -> List[str]:
-        """Get up to `size` URLs from the queue, rotating across domains."""
-        batch = []
-        with self._lock:
-            if not self._domain_order:
-                return batch
+        """Get up to `size` URLs without waiting, rotating across domains.
 
-            domains_checked = 0
-            max_domains = len(self._domain_order)
+        Every returned URL counts as in flight until `task_done` is called.
+        """
+        batch: List[str] = []
+        now = time.monotonic()
+        self._promote(now)
 
-            while len(batch) < size and domains_checked < max_domains:
-                domains_checked += 1
+        while len(batch) < size and self._ready_domains:
+            domain = self._ready_domains.popleft()
+            booked = self._next_ready.get(domain, 0.0)
+            if booked > now:
+                # A `reserve_slot` request took the host's turn.
+                self._schedule(domain, booked)
+                continue
+            domain_queue = self._queues[domain]
 
-                domain = self._domain_order.pop(0)
-                self._domain_order.append(domain)
+            if isinstance(domain_queue, deque):
+                url = domain_queue.popleft()
+            else:
+                url = self._pop_scored(domain, domain_queue)
+            self._size -= 1
 
-                domain_queue = self._queues.get(domain)
-                if not domain_queue or not domain_queue:
-                    continue
+            ready_at = now + self.get_domain_delay(domain)
+            if ready_at > now:
+                self._next_ready[domain] = ready_at
 
-                url = domain_queue.popleft()
-                if url in self._visited:
-                    continue
+            if domain_queue:
+                self._schedule(domain, ready_at)
+            else:
+                del self._queues[domain]
+                self._stale.pop(domain, None)
 
-                self._visited.add(url)
-                batch.append(url)
+            batch.append(url)
 
+        self._in_flight += len(batch)
         return batch
 
+    async def next_batch(self, size: int) -> List[str]:
+        """Wait until URLs are available and return up to `size` of them.
+
+        Returns an empty list once the queue is closed or drained.
+        """
+        while True:
+            if self._closed:
+                return []
+
+            batch = self.get_batch(size)
+            if batch:
+                return batch
+
+            if self._in_flight == 0 and self._size == 0:
+                _wake_all(self._getters)
+                return []
+
+            timeout = None
+            if self._cooling:
+                timeout = max(self._cooling[0][0] - time.monotonic(), 0.001)
+            await _wait(self._getters, timeout)
+
+    def set_domain_delay(self, domain: str, delay: float):
+        """Set a per-domain politeness delay, e.g. from robots.txt Crawl-delay.
+
+        The effective delay never drops below the queue-wide `delay`.
+        """
+        self._domain_delays[domain] = max(delay, self._delay)
+
+    def get_domain_delay(self, domain: str) -> float:
+        return self._domain_delays.get(domain, self._delay)
+
+    def reserve_slot(self, url: str) -> float:
+        """Book the URL's host for a request the queue does not hand out.
+
+        Returns how many seconds to wait before sending it. The host's
+        queued pages are held back until the delay after that slot.
+        """
+        domain = get_domain(url)
+        delay = self.get_domain_delay(domain)
+        if not delay:
+            return 0.0
+        now = time.monotonic()
+        slot = max(now, self._next_ready.get(domain, 0.0))
+        self._next_ready[domain] = slot + delay
+        return slot - now
+
+    def _schedule(self, domain: str, ready_at: float):
+        """Put a domain with pending URLs back into rotation or onto the cooling heap."""
+        if ready_at > time.monotonic():
+            heapq.heappush(self._cooling, (ready_at, domain))
+        else:
+            self._ready_domains.append(domain)
+
+    def _promote(self, now: float):
+        """Move domains whose politeness delay has elapsed into the rotation."""
+        cooling = self._cooling
+        while cooling and cooling[0][0] <= now:
+            _, domain = heapq.heappop(cooling)
+            self._ready_domains.append(domain)
+
+    def _pop_scored(self, domain: str, heap: List[Tuple[float, int, str]]) -> str:
+        url = heapq.heappop(heap)[2]
+        del self._entries[url]
+        referrer = self._context.get(url, (0, None))[1]
+        if referrer is not None:
+            siblings = self._children.get(referrer)
+            if siblings is not None:
+                siblings.discard(url)
+                if not siblings:
+                    del self._children[referrer]
+        self._drop_stale(domain, heap)
+        return url
+
+    def _drop_stale(self, domain: str, heap: List[Tuple[float, int, str]]):
+        """Pop superseded entries so the heap's top is always a live URL."""
+        while heap and self._entries.get(heap[0][2], (0.0, -1))[1] != heap[0][1]:
+            heapq.heappop(heap)
+            self._stale[domain] -= 1
+
+    def rescore(self, referrer: str):
+        """Score the URLs `referrer` linked to that are still waiting again.
+
+        For adaptive scorers, whose opinion of a link changes as pages near
+        it are crawled.
+        """
+        if not self._scorer:
+            return
+        children = self._children.get(referrer, ())
+        # In enqueue order, so equal scores keep their original order.
+        for url in sorted(children, key=lambda url: self._entries[url][1]):
+            depth = self._context[url][0]
+            score = self._scorer(url, referrer, depth)
+            if score == self._entries[url][0]:
+                continue
+            domain = get_domain(url)
+            heap = self._queues[domain]
+            assert isinstance(heap, list)
+            sequence = next(self._sequence)
+            heapq.heappush(heap, (-score, sequence, url))
+            self._entries[url] = (score, sequence)
+            self._stale[domain] = self._stale.get(domain, 0) + 1
+            self._drop_stale(domain, heap)
+
+    def pop_context(self, url: str) -> Tuple[int, Optional[str]]:
+        """Return and forget the `(depth, referrer)` a dequeued URL was added with."""
+        return self._context.pop(url, (0, None))
+
+    def hold(self):
+        """Keep the queue from reporting itself drained until a matching `task_done`.
+
+        Used while a producer outside the workers, such as sitemap discovery,
+        may still add URLs.
+        """
+        self._in_flight += 1
+
+    def task_done(self, count: int = 1):
+        """Mark `count` handed-out URLs as fully processed."""
+        self._in_flight -= count
+        if self._in_flight <= 0 and self.is_empty():
+            _wake_all(self._getters)
+
+    def close(self):
+        """Stop handing out URLs and release every waiting consumer."""
+        self._closed = True
+        _wake_all(self._getters)
+
+    def is_closed(self) -> bool:
+        return self._closed
+
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def dropped_count(self) -> int:
+        return self._dropped
+
     def mark_visited(self, urls: List[str]):
         """Mark URLs as visited without adding to queue."""
-        with self._lock:
-            self._visited.update(urls)
+        for url in urls:
+            self._seen.add(url)
 
     def is_empty(self) -> bool:
-        with self._lock:
-            return sum(len(q) for q in self._queues.values()) == 0
+        return self._size == 0
 
     def size(self) -> int:
-        with self._lock:
-            return sum(len(q) for q in self._queues.values())
+        return self._size
+
+    def domain_count(self) -> int:
+        """Number of domains with URLs waiting in the queue."""
+        return len(self._queues)
+
+    def domain_sizes(self, limit: int = 0) -> List[Tuple[str, int]]:
+        """`(domain, pending URLs)` pairs, largest first; at most `limit` if set."""
+        sizes = (
+            (domain, len(queue) - self._stale.get(domain, 0))
+            for domain, queue in self._queues.items()
+        )
+        if limit:
+            return heapq.nlargest(limit, sizes, key=lambda item: item[1])
+        return sorted(sizes, key=lambda item: item[1], reverse=True)
+
+    def ready_domain_count(self) -> int:
+        """Number of domains that may be requested right now."""
+        self._promote(time.monotonic())
+        return len(self._ready_domains)
 
     def visited_count(self) -> int:
-        with self._lock:
-            return len(self._visited)
+        """Number of distinct URLs ever queued or marked visited."""
+        return len(self._seen)
 
     def has_seen(self, url: str) -> bool:
-        with self._lock:
-            if url in self._visited:
-                return True
-            domain = get_domain(url)
-            if domain in self._queues and url in self._queues[domain]:
-                return True
-            return False
+        return url in self._seen
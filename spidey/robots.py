@@ -1,113 +1,295 @@
-import asyncio
-import time
-from typing import Dict, Set, Optional
-import aiohttp
 import logging
+import re
+import string
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
 
 logger = logging.getLogger(__name__)
 
 
-class RobotsTxt:
+MAX_ROBOTS_SIZE = 500 * 1024
+
+# Characters left as-is when percent-encoding rule patterns and URL paths.
+_SAFE_PATH_CHARS = "/*$?=&;:@%+,!~'()[]-._"
+_PERCENT_ESCAPE = re.compile(r"%[0-9a-fA-F]{2}")
+_UNRESERVED = frozenset(string.ascii_letters + string.digits + "-._~")
+
+_RULE = Tuple[bool, int]
+
+
+def _normalize_escape(match: "re.Match[str]") -> str:
+    char = chr(int(match.group(0)[1:], 16))
+    return char if char in _UNRESERVED else match.group(0).upper()
+
+
+def _normalize(path: str) -> str:
+    """Percent-encode a pattern or path so both sides compare octet for octet.
+
+    Escaped unreserved characters are decoded (`%7E` is `~`) and the
+    remaining escapes uppercased, as RFC 9309 asks.
+    """
+    path = quote(path, safe=_SAFE_PATH_CHARS)
+    return _PERCENT_ESCAPE.sub(_normalize_escape, path)
+
+
+class _TrieNode:
+    __slots__ = ("children", "rule")
+
     def __init__(self):
-        self._crawl_delays: Dict[str, float] = {}
-        self._disallowed_paths: Dict[str, Set[str]] = {}
-        self._cache: Dict[str, tuple[float, Dict]] = {}
-        self._lock = asyncio.Lock()
+        self.children: Dict[str, "_TrieNode"] = {}
+        self.rule: Optional[_RULE] = None
 
-    async def fetch(self, base_url: str, fetch_func) -> bool:
-        from urllib.parse import urlparse
 
-        parsed = urlparse(base_url)
-        domain = f"{parsed.scheme}://{parsed.netloc}/robots.txt"
+def _product_token(user_agent: str) -> str:
+    """`"MyBot/1.2 (+https://example.com)"` -> `"mybot"`."""
+    token = user_agent.strip().split("/", 1)[0].split(None, 1)
+    return token[0].lower() if token else "*"
 
-        async with self._lock:
-            if domain in self._cache:
-                cached_time, _ = self._cache[domain]
-                if time.time() - cached_time < 3600:
-                    return True
 
-        try:
-            html = await fetch_func(domain)
-            if not html:
-                return True
-
-            lines = html.split("\n")
-            current_user_agent = "*"
-            disallowed_paths: Set[str] = set()
-            crawl_delay: Optional[float] = None
-
-            for line in lines:
-                line = line.strip()
-                if not line or line.startswith("#"):
-                    continue
+class RobotsRules:
+    """Allow/Disallow rules of one user-agent group, compiled for matching.
 
-                if line.lower().startswith("user-agent:"):
-                    if current_user_agent != "*":
-                        if current_user_agent not in self._disallowed_paths:
-                            self._disallowed_paths[current_user_agent] = (
-                                disallowed_paths.copy()
-                            )
-                        if crawl_delay and current_user_agent not in self._crawl_delays:
-                            self._crawl_delays[current_user_agent] = crawl_delay
-                    current_user_agent = line.split(":", 1)[1].strip()
-                    disallowed_paths = set()
-                    crawl_delay = None
-                elif line.lower().startswith("disallow:"):
-                    path = line.split(":", 1)[1].strip()
-                    if path:
-                        disallowed_paths.add(path)
-                elif line.lower().startswith("crawl-delay:"):
-                    try:
-                        crawl_delay = float(line.split(":", 1)[1].strip())
-                    except ValueError:
-                        pass
-
-            if current_user_agent not in self._disallowed_paths:
-                self._disallowed_paths[current_user_agent] = disallowed_paths.copy()
-            if crawl_delay and current_user_agent not in self._crawl_delays:
-                self._crawl_delays[current_user_agent] = crawl_delay
-
-            async with self._lock:
-                self._cache[domain] = (time.time(), {})
+    Literal rules live in a character trie, so finding the longest matching
+    literal rule walks the path once regardless of how many rules there are.
+    Rules ending in `$` without `*` are exact matches in a dict. The rarer
+    wildcard rules are compiled to regexes, sorted by precedence and only
+    consulted while they could still beat the best literal match.
 
-            return True
+    Precedence follows RFC 9309: the longest matching pattern wins, and
+    Allow wins a tie.
+    """
 
-        except Exception as e:
-            logger.debug(f"Failed to fetch robots.txt for {domain}: {e}")
-            return True
+    __slots__ = ("crawl_delay", "_trie", "_exact", "_wildcards", "_rule_count")
 
-    def is_allowed(self, url: str, user_agent: str = "*") -> bool:
-        from urllib.parse import urlparse
+    def __init__(self, rules: List[Tuple[bool, str]], crawl_delay: Optional[float] = None):
+        self.crawl_delay = crawl_delay
+        self._trie = _TrieNode()
+        self._exact: Dict[str, _RULE] = {}
+        self._wildcards: List[Tuple[int, bool, "re.Pattern[str]"]] = []
+        self._rule_count = 0
 
-        parsed = urlparse(url)
-        path = parsed.path or "/"
+        for allow, pattern in rules:
+            if not pattern:
+                continue
+            pattern = _normalize(pattern)
+            rule = (allow, len(pattern))
+            self._rule_count += 1
+            if "*" in pattern:
+                self._wildcards.append((len(pattern), allow, self._compile(pattern)))
+            elif pattern.endswith("$"):
+                self._exact[pattern[:-1]] = self._prefer(
+                    self._exact.get(pattern[:-1]), rule
+                )
+            else:
+                node = self._trie
+                for char in pattern:
+                    child = node.children.get(char)
+                    if child is None:
+                        child = node.children[char] = _TrieNode()
+                    node = child
+                node.rule = self._prefer(node.rule, rule)
+
+        self._wildcards.sort(key=lambda item: (item[0], item[1]), reverse=True)
+
+    @staticmethod
+    def _prefer(current: Optional[_RULE], rule: _RULE) -> _RULE:
+        if current is None or (rule[1], rule[0]) > (current[1], current[0]):
+            return rule
+        return current
+
+    @staticmethod
+    def _compile(pattern: str) -> "re.Pattern[str]":
+        anchored = pattern.endswith("$")
+        if anchored:
+            pattern = pattern[:-1]
+        regex = ".*".join(re.escape(part) for part in pattern.split("*"))
+        return re.compile(regex + ("$" if anchored else ""), re.DOTALL)
+
+    def __len__(self) -> int:
+        return self._rule_count
+
+    def match(self, path: str) -> Optional[_RULE]:
+        """Return the winning `(allow, length)` rule for `path`, if any."""
+        path = _normalize(path)
+        node = self._trie
+        best = node.rule
+        for char in path:
+            child = node.children.get(char)
+            if child is None:
+                break
+            node = child
+            if node.rule is not None:
+                best = self._prefer(best, node.rule)
+
+        exact = self._exact.get(path)
+        if exact is not None:
+            best = self._prefer(best, exact)
 
-        for ua in [user_agent, "*"]:
-            if ua in self._disallowed_paths:
-                for disallowed in self._disallowed_paths[ua]:
-                    if path.startswith(disallowed):
-                        return False
+        for length, allow, regex in self._wildcards:
+            if best is not None and (length, allow) <= (best[1], best[0]):
+                break
+            if regex.match(path):
+                best = (allow, length)
+                break
 
-        return True
+        return best
+
+    def is_allowed(self, path: str) -> bool:
+        rule = self.match(path)
+        return rule is None or rule[0]
+
+
+_ALLOW_ALL = RobotsRules([])
+
+
+class RobotsTxt:
+    """A parsed robots.txt file (RFC 9309) with per-agent compiled rules."""
+
+    def __init__(
+        self,
+        groups: Optional[Dict[str, RobotsRules]] = None,
+        sitemaps: Optional[List[str]] = None,
+    ):
+        self._groups = groups or {}
+        self.sitemaps: List[str] = sitemaps or []
+        self._resolved: Dict[str, RobotsRules] = {}
+
+    @classmethod
+    def parse(cls, text: str) -> "RobotsTxt":
+        """Parse robots.txt content.
+
+        Consecutive `User-agent` lines share one group, and groups naming the
+        same agent are merged. `Sitemap` lines apply to the whole file.
+        """
+        text = text[:MAX_ROBOTS_SIZE].lstrip("\ufeff")
+        rules: Dict[str, List[Tuple[bool, str]]] = {}
+        delays: Dict[str, float] = {}
+        sitemaps: List[str] = []
+        agents: List[str] = []
+        in_rules = False
+
+        for line in text.splitlines():
+            line = line.split("#", 1)[0].strip()
+            if ":" not in line:
+                continue
+            key, value = line.split(":", 1)
+            key = key.strip().lower()
+            value = value.strip()
+
+            if key == "user-agent":
+                if in_rules:
+                    agents = []
+                    in_rules = False
+                agent = _product_token(value) if value != "*" else "*"
+                agents.append(agent)
+                rules.setdefault(agent, [])
+            elif key in ("allow", "disallow"):
+                in_rules = True
+                for agent in agents:
+                    rules[agent].append((key == "allow", value))
+            elif key == "crawl-delay":
+                in_rules = True
+                try:
+                    delay = float(value)
+                except ValueError:
+                    continue
+                for agent in agents:
+                    delays.setdefault(agent, delay)
+            elif key == "sitemap":
+                if value:
+                    sitemaps.append(value)
+
+        groups = {
+            agent: RobotsRules(agent_rules, delays.get(agent))
+            for agent, agent_rules in rules.items()
+        }
+        return cls(groups, sitemaps)
+
+    def rules_for(self, user_agent: str = "*") -> RobotsRules:
+        """Rules of the group matching the user agent's product token, else `*`."""
+        rules = self._resolved.get(user_agent)
+        if rules is None:
+            rules = self._groups.get(_product_token(user_agent))
+            if rules is None:
+                rules = self._groups.get("*", _ALLOW_ALL)
+            self._resolved[user_agent] = rules
+        return rules
+
+    def is_allowed(self, url: str, user_agent: str = "*") -> bool:
+        parsed = urlsplit(url)
+        path = parsed.path or "/"
+        if path == "/robots.txt":
+            return True
+        if parsed.query:
+            path = f"{path}?{parsed.query}"
+        return self.rules_for(user_agent).is_allowed(path)
 
     def get_crawl_delay(self, user_agent: str = "*") -> Optional[float]:
-        for ua in [user_agent, "*"]:
-            if ua in self._crawl_delays:
-                return self._crawl_delays[ua]
-        return None
+        return self.rules_for(user_agent).crawl_delay
 
 
 class RobotsManager:
-    def __init__(self):
-        self._robots: Dict[str, RobotsTxt] = {}
+    """Per-host cache of parsed robots.txt files with TTL and LRU eviction.
+
+    RFC 9309 asks crawlers not to reuse a robots.txt for more than 24 hours,
+    hence the default `ttl`. At most `max_hosts` hosts are kept.
+    """
+
+    def __init__(self, ttl: float = 86400.0, max_hosts: int = 10_000):
+        self._ttl = ttl
+        self._max_hosts = max_hosts
+        self._robots: "OrderedDict[str, Tuple[float, RobotsTxt]]" = OrderedDict()
+
+    @staticmethod
+    def _key(base_url: str) -> str:
+        parsed = urlsplit(base_url)
+        return f"{parsed.scheme}://{parsed.netloc}"
+
+    def get(self, base_url: str) -> Optional[RobotsTxt]:
+        """Cached robots.txt for the URL's host, or None if absent or expired."""
+        key = self._key(base_url)
+        cached = self._robots.get(key)
+        if cached is None:
+            return None
+        expires_at, robots = cached
+        if expires_at <= time.monotonic():
+            del self._robots[key]
+            return None
+        self._robots.move_to_end(key)
+        return robots
+
+    def set(self, base_url: str, robots: RobotsTxt):
+        key = self._key(base_url)
+        self._robots[key] = (time.monotonic() + self._ttl, robots)
+        self._robots.move_to_end(key)
+        while len(self._robots) > self._max_hosts:
+            self._robots.popitem(last=False)
 
     def get_robots(self, base_url: str) -> RobotsTxt:
-        from urllib.parse import urlparse
+        """Cached robots.txt for the host, or an allow-all file if not loaded."""
+        return self.get(base_url) or RobotsTxt()
 
-        parsed = urlparse(base_url)
-        domain = f"{parsed.scheme}://{parsed.netloc}"
+    async def load(
+        self,
+        base_url: str,
+        fetch_func: Callable[[str], Awaitable[Optional[str]]],
+    ) -> RobotsTxt:
+        """Fetch, parse and cache `/robots.txt` for the URL's host.
 
-        if domain not in self._robots:
-            self._robots[domain] = RobotsTxt()
+        A missing or unreadable file allows everything.
+        """
+        robots_url = f"{self._key(base_url)}/robots.txt"
+        robots = RobotsTxt()
+        try:
+            text = await fetch_func(robots_url)
+            if isinstance(text, str) and text:
+                robots = RobotsTxt.parse(text)
+        except Exception as e:
+            logger.debug(f"Failed to fetch robots.txt for {robots_url}: {e}")
+        self.set(base_url, robots)
+        return robots
 
-        return self._robots[domain]
+    def __len__(self) -> int:
+        return len(self._robots)
@@ -0,0 +1,116 @@
+import math
+import re
+from fnmatch import translate
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from .config import Config
+
+
+class URLScorer:
+    """Ranks URLs for the priority frontier. Higher scores are crawled first.
+
+    `score` runs when a URL is enqueued. `record` is called once a page's
+    links are known and before they are enqueued, so adaptive scorers can
+    learn from what it yielded. Scorers that set `adaptive` also have the
+    page's waiting siblings scored again after each `record`.
+    """
+
+    adaptive = False
+
+    def score(self, url: str, referrer: Optional[str], depth: int) -> float:
+        return 0.0
+
+    def record(self, url: str, referrer: Optional[str], files_found: int):
+        pass
+
+    def __call__(self, url: str, referrer: Optional[str], depth: int) -> float:
+        return self.score(url, referrer, depth)
+
+
+class DepthScorer(URLScorer):
+    """Breadth-first order: shallower pages first."""
+
+    def score(self, url: str, referrer: Optional[str], depth: int) -> float:
+        return -float(depth)
+
+
+class PathPatternScorer(URLScorer):
+    """Adds a boost for each shell-style pattern the URL path matches.
+
+    `{"/gallery/*": 5, "*/tag/*": -3}` pulls galleries forward and pushes
+    tag listings back.
+    """
+
+    def __init__(self, boosts: Dict[str, float]):
+        self._boosts: List[Tuple["re.Pattern[str]", float]] = [
+            (re.compile(translate(pattern), re.IGNORECASE), boost)
+            for pattern, boost in boosts.items()
+        ]
+
+    def score(self, url: str, referrer: Optional[str], depth: int) -> float:
+        path = urlsplit(url).path or "/"
+        return sum(boost for regex, boost in self._boosts if regex.match(path))
+
+
+class FileYieldScorer(URLScorer):
+    """Favours links from pages whose neighbourhood produced target files.
+
+    A URL scores by the files found on the page that linked to it plus the
+    average files found on that page's already-crawled children (the URL's
+    siblings), on a log scale so one prolific page does not drown out the
+    rest. Only one counter pair is kept per referring page.
+    """
+
+    adaptive = True
+
+    def __init__(self):
+        self._page_yield: Dict[str, int] = {}
+        self._sibling_yield: Dict[str, List[int]] = {}
+
+    def score(self, url: str, referrer: Optional[str], depth: int) -> float:
+        if referrer is None:
+            return 0.0
+        own = self._page_yield.get(referrer, 0)
+        total, pages = self._sibling_yield.get(referrer, (0, 0))
+        siblings = total / pages if pages else 0.0
+        return math.log1p(own) + math.log1p(siblings)
+
+    def record(self, url: str, referrer: Optional[str], files_found: int):
+        self._page_yield[url] = files_found
+        if referrer is not None:
+            counts = self._sibling_yield.setdefault(referrer, [0, 0])
+            counts[0] += files_found
+            counts[1] += 1
+
+
+class CompositeScorer(URLScorer):
+    """Weighted sum of several scorers."""
+
+    def __init__(self, scorers: List[Tuple[URLScorer, float]]):
+        self._scorers = scorers
+        self.adaptive = any(scorer.adaptive for scorer, _ in scorers)
+
+    def score(self, url: str, referrer: Optional[str], depth: int) -> float:
+        return sum(
+            weight * scorer.score(url, referrer, depth)
+            for scorer, weight in self._scorers
+        )
+
+    def record(self, url: str, referrer: Optional[str], files_found: int):
+        for scorer, _ in self._scorers:
+            scorer.record(url, referrer, files_found)
+
+
+def create_scorer(config: Config) -> Optional[URLScorer]:
+    """Build the scorer for `frontier="priority"`, or None for FIFO order."""
+    if config.frontier != "priority":
+        return None
+    scorers: List[Tuple[URLScorer, float]] = []
+    if config.score_depth_weight:
+        scorers.append((DepthScorer(), config.score_depth_weight))
+    if config.score_path_boosts:
+        scorers.append((PathPatternScorer(config.score_path_boosts), 1.0))
+    if config.score_file_yield_weight:
+        scorers.append((FileYieldScorer(), config.score_file_yield_weight))
+    return CompositeScorer(scorers)
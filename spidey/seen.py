@@ -0,0 +1,235 @@
+import hashlib
+import logging
+import math
+import os
+import sqlite3
+import sys
+from typing import List, Set
+
+from .config import Config
+
+
+logger = logging.getLogger(__name__)
+
+
+def url_fingerprint(url: str) -> int:
+    """Signed 64-bit fingerprint of a URL (fits an SQLite INTEGER)."""
+    digest = hashlib.blake2b(url.encode("utf-8", "surrogatepass"), digest_size=8)
+    return int.from_bytes(digest.digest(), "little", signed=True)
+
+
+class SeenStore:
+    """Interface for URL dedup state shared by `Spidey` and `URLQueue`."""
+
+    def add(self, url: str) -> bool:
+        """Record `url`. Returns True if it had not been seen before."""
+        raise NotImplementedError
+
+    def __contains__(self, url: str) -> bool:
+        raise NotImplementedError
+
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def memory_bytes(self) -> int:
+        """Approximate resident memory used by the store."""
+        raise NotImplementedError
+
+    def memory_per_url(self) -> float:
+        count = len(self)
+        return self.memory_bytes() / count if count else 0.0
+
+    def close(self):
+        pass
+
+
+class FingerprintSeenStore(SeenStore):
+    """Exact store keeping 64-bit fingerprints instead of full URL strings."""
+
+    def __init__(self):
+        self._fingerprints: Set[int] = set()
+
+    def add(self, url: str) -> bool:
+        fingerprint = url_fingerprint(url)
+        if fingerprint in self._fingerprints:
+            return False
+        self._fingerprints.add(fingerprint)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        return url_fingerprint(url) in self._fingerprints
+
+    def __len__(self) -> int:
+        return len(self._fingerprints)
+
+    def memory_bytes(self) -> int:
+        # Set table plus one boxed int per entry.
+        return sys.getsizeof(self._fingerprints) + 32 * len(self._fingerprints)
+
+
+class _BloomFilter:
+    __slots__ = ("capacity", "count", "num_bits", "num_hashes", "bits")
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = capacity
+        self.count = 0
+        self.num_bits = max(
+            8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+        )
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, h1: int, h2: int):
+        num_bits = self.num_bits
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % num_bits
+
+    def add(self, h1: int, h2: int):
+        bits = self.bits
+        for pos in self._positions(h1, h2):
+            bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, hashes) -> bool:
+        bits = self.bits
+        for pos in self._positions(*hashes):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+
+class BloomSeenStore(SeenStore):
+    """Scalable Bloom filter with a bounded overall false-positive rate.
+
+    A false positive makes the crawler treat an unseen URL as seen, so a
+    small fraction of pages may be skipped in exchange for a few bytes per URL.
+    """
+
+    GROWTH = 2
+    TIGHTENING = 0.5
+
+    def __init__(self, initial_capacity: int = 1_000_000, error_rate: float = 0.001):
+        self._initial_capacity = initial_capacity
+        self._error_rate = error_rate
+        self._filters: List[_BloomFilter] = []
+        self._count = 0
+        self._add_filter()
+
+    def _add_filter(self):
+        index = len(self._filters)
+        capacity = self._initial_capacity * (self.GROWTH**index)
+        error_rate = self._error_rate * (1 - self.TIGHTENING) * (
+            self.TIGHTENING**index
+        )
+        self._filters.append(_BloomFilter(capacity, error_rate))
+
+    @staticmethod
+    def _hashes(url: str):
+        digest = hashlib.blake2b(url.encode("utf-8", "surrogatepass"), digest_size=16)
+        value = digest.digest()
+        return int.from_bytes(value[:8], "little"), int.from_bytes(value[8:], "little") | 1
+
+    def add(self, url: str) -> bool:
+        hashes = self._hashes(url)
+        if any(hashes in bloom for bloom in self._filters):
+            return False
+        current = self._filters[-1]
+        if current.count >= current.capacity:
+            self._add_filter()
+            current = self._filters[-1]
+        current.add(*hashes)
+        self._count += 1
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        hashes = self._hashes(url)
+        return any(hashes in bloom for bloom in self._filters)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def memory_bytes(self) -> int:
+        return sum(len(bloom.bits) for bloom in self._filters)
+
+
+class DiskSeenStore(SeenStore):
+    """Fingerprint store that spills to SQLite once the in-memory buffer fills up.
+
+    Fingerprints left in `path` by an earlier run are kept only with
+    `resume=True`; otherwise the table is emptied, so a new crawl into the
+    same folder does not treat its seeds as already visited.
+    """
+
+    def __init__(
+        self, path: str, max_memory_entries: int = 1_000_000, resume: bool = False
+    ):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._path = path
+        self._max_memory_entries = max_memory_entries
+        self._buffer: Set[int] = set()
+        self._count = 0
+        self._db = sqlite3.connect(path)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=OFF")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS seen (fingerprint INTEGER PRIMARY KEY) WITHOUT ROWID"
+        )
+        if not resume:
+            with self._db:
+                self._db.execute("DELETE FROM seen")
+        (self._count,) = self._db.execute("SELECT COUNT(*) FROM seen").fetchone()
+
+    def _on_disk(self, fingerprint: int) -> bool:
+        row = self._db.execute(
+            "SELECT 1 FROM seen WHERE fingerprint = ?", (fingerprint,)
+        ).fetchone()
+        return row is not None
+
+    def _spill(self):
+        with self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO seen (fingerprint) VALUES (?)",
+                ((fingerprint,) for fingerprint in self._buffer),
+            )
+        logger.debug(f"Spilled {len(self._buffer)} fingerprints to {self._path}")
+        self._buffer.clear()
+
+    def add(self, url: str) -> bool:
+        fingerprint = url_fingerprint(url)
+        if fingerprint in self._buffer or self._on_disk(fingerprint):
+            return False
+        self._buffer.add(fingerprint)
+        self._count += 1
+        if len(self._buffer) >= self._max_memory_entries:
+            self._spill()
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        fingerprint = url_fingerprint(url)
+        return fingerprint in self._buffer or self._on_disk(fingerprint)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def memory_bytes(self) -> int:
+        return sys.getsizeof(self._buffer) + 32 * len(self._buffer)
+
+    def close(self):
+        if self._buffer:
+            self._spill()
+        self._db.close()
+
+
+def create_seen_store(config: Config, resume: bool = False) -> SeenStore:
+    """Build the seen store selected by `Config.seen_backend`.
+
+    `resume` keeps a disk store's fingerprints from the previous run.
+    """
+    if config.seen_backend == "bloom":
+        return BloomSeenStore(config.seen_capacity, config.seen_error_rate)
+    if config.seen_backend == "disk":
+        path = config.seen_path or os.path.join(config.folder, ".spidey", "seen.db")
+        return DiskSeenStore(path, config.seen_capacity, resume=resume)
+    return FingerprintSeenStore()
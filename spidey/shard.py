@@ -0,0 +1,539 @@
+import asyncio
+import dataclasses
+import hashlib
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+from collections import defaultdict, deque
+from multiprocessing.process import BaseProcess
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from .budget import PageBudget
+from .config import Config
+from .controller import (
+    REQUEST_STATS,
+    STAT_COUNTERS,
+    Controller,
+    CrawlerState,
+    CrawlStats,
+)
+from .exceptions import SpideyError
+from .fetcher import FetchCounters
+from .metrics import MetricsSnapshot
+from .queue import _wait, _wake_all, get_domain
+from .seen import FingerprintSeenStore
+
+
+logger = logging.getLogger(__name__)
+
+
+# How often a shard reports its status while nothing else wakes it, and the
+# least time between reports while it is busy.
+REPORT_INTERVAL = 0.1
+
+# Upper bound on how long the coordinator sleeps between checks of its own
+# state when no message, state change or process exit wakes it.
+SUPERVISE_INTERVAL = 1.0
+
+# A lease request is topped up to the unleased budget divided by this many
+# blocks per shard, so early leases are large and later ones shrink.
+LEASE_BLOCKS = 2
+
+
+def shard_for(url: str, shards: int) -> int:
+    """Stable shard index for the URL's host.
+
+    Uses a real hash rather than `hash()`, which is salted per process.
+    """
+    host = get_domain(url).lower().encode("utf-8", "surrogatepass")
+    digest = hashlib.blake2b(host, digest_size=8).digest()
+    return int.from_bytes(digest, "little") % shards
+
+
+def merge_stats(stats: Iterable[CrawlStats]) -> CrawlStats:
+    """Sum counters across shards; times span the earliest start to the latest end."""
+    merged = CrawlStats()
+    for shard_stats in stats:
+        for name in STAT_COUNTERS:
+            setattr(merged, name, getattr(merged, name) + getattr(shard_stats, name))
+        if shard_stats.start_time and (
+            merged.start_time is None or shard_stats.start_time < merged.start_time
+        ):
+            merged.start_time = shard_stats.start_time
+        if shard_stats.end_time and (
+            merged.end_time is None or shard_stats.end_time > merged.end_time
+        ):
+            merged.end_time = shard_stats.end_time
+    return merged
+
+
+def _shard_path(path: Optional[str], index: int) -> Optional[str]:
+    if not path:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard{index}{ext}"
+
+
+def shard_config(config: Config, index: int, shards: int) -> Config:
+    """Config for one shard process.
+
+    Per-process SQLite files (checkpoint, HTTP cache, disk seen store) get a
+    `.shardN` suffix. The output folder and its checksum index are shared,
+    and so is the page budget, which the coordinator leases out. Only the
+    coordinator serves metrics.
+    """
+    seen_path = config.seen_path
+    if config.seen_backend == "disk" and not seen_path:
+        seen_path = os.path.join(config.folder, ".spidey", "seen.db")
+    return dataclasses.replace(
+        config,
+        checkpoint_path=_shard_path(config.checkpoint_path, index),
+        http_cache_path=_shard_path(config.http_cache_path, index),
+        seen_path=_shard_path(seen_path, index),
+        metrics_port=None,
+    )
+
+
+class _Mailbox:
+    """Delivers messages from a `multiprocessing` queue to the event loop.
+
+    A daemon thread blocks on the queue and hands every message to the loop
+    as it arrives, so the receiver wakes as soon as there is something to
+    read instead of polling through the executor.
+    """
+
+    def __init__(self, source: "multiprocessing.Queue", name: str):
+        self._loop = asyncio.get_running_loop()
+        self._source = source
+        self._messages: List[Tuple] = []
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._thread = threading.Thread(target=self._pump, name=name, daemon=True)
+        self._thread.start()
+
+    def _pump(self):
+        while True:
+            message = self._source.get()
+            if message is None:
+                return
+            try:
+                self._loop.call_soon_threadsafe(self._deliver, message)
+            except RuntimeError:
+                # The loop has closed; nobody is left to read.
+                return
+
+    def _deliver(self, message: Tuple):
+        self._messages.append(message)
+        _wake_all(self._waiters)
+
+    def wake(self):
+        """Wake the receiver without a message. Safe to call from any thread."""
+        self._loop.call_soon_threadsafe(_wake_all, self._waiters)
+
+    async def receive(self, timeout: Optional[float]) -> List[Tuple]:
+        """Wait up to `timeout` for messages and return all that arrived."""
+        if not self._messages:
+            await _wait(self._waiters, timeout)
+        messages, self._messages = self._messages, []
+        return messages
+
+    def close(self):
+        """Stop the thread; the queue must stay open until this returns."""
+        self._source.put(None)
+        self._thread.join(SUPERVISE_INTERVAL)
+
+
+def _watch_exits(processes: Sequence[BaseProcess], on_exit: Callable[[], None]):
+    """Call `on_exit` every time one of `processes` ends."""
+    pending = [process.sentinel for process in processes]
+    while pending:
+        for sentinel in multiprocessing.connection.wait(pending):
+            pending.remove(sentinel)  # type: ignore[arg-type]
+        on_exit()
+
+
+class ShardLink:
+    """A shard process's end of the coordinator's queues.
+
+    Every shard has an inbox; URLs whose host belongs to another shard are
+    put straight into that shard's inbox, once per URL. Message counts are
+    reported with every status update so the coordinator can tell when no
+    URLs are left in transit.
+    """
+
+    def __init__(
+        self,
+        index: int,
+        shards: int,
+        inboxes: List["multiprocessing.Queue"],
+        status: "multiprocessing.Queue",
+    ):
+        self.index = index
+        self.shards = shards
+        self._inboxes = inboxes
+        self._status = status
+        self._routed = FingerprintSeenStore()
+        self._mailbox: Optional[_Mailbox] = None
+        self._sent = 0
+        self._received = 0
+
+    def owns(self, url: str) -> bool:
+        return shard_for(url, self.shards) == self.index
+
+    def _route(self, kind: str, items: List[Tuple]) -> List[Tuple]:
+        """Send foreign items to their shards and return the local ones."""
+        local = []
+        outgoing: Dict[int, List[Tuple]] = defaultdict(list)
+        for item in items:
+            shard = shard_for(item[0], self.shards)
+            if shard == self.index:
+                local.append(item)
+            elif self._routed.add(item[0]):
+                outgoing[shard].append(item)
+        for shard, batch in outgoing.items():
+            self._inboxes[shard].put((kind, batch))
+            self._sent += 1
+        return local
+
+    def route_pages(
+        self, urls: List[str], referrer: Optional[str], depth: int
+    ) -> List[str]:
+        """Send other shards' page URLs away; return the ones this shard owns."""
+        items = [(url, referrer, depth) for url in urls]
+        return [url for url, _, _ in self._route("pages", items)]
+
+    def route_files(self, urls: List[str], referrer: str) -> List[str]:
+        """Send other shards' file URLs away; return the ones this shard owns."""
+        items = [(url, referrer) for url in urls]
+        return [url for url, _ in self._route("files", items)]
+
+    async def receive(self, timeout: Optional[float]) -> List[Tuple[str, Any]]:
+        """Wait up to `timeout` for messages and return all that arrived."""
+        if self._mailbox is None:
+            self._mailbox = _Mailbox(
+                self._inboxes[self.index], f"spidey-shard-{self.index}-inbox"
+            )
+        messages = await self._mailbox.receive(timeout)
+        self._received += sum(1 for kind, _ in messages if kind in ("pages", "files"))
+        return messages
+
+    def report(
+        self, idle: bool, stats: CrawlStats, fetched: int, metrics: MetricsSnapshot
+    ):
+        self._status.put(
+            (
+                "report",
+                self.index,
+                idle,
+                self._sent,
+                self._received,
+                stats,
+                fetched,
+                metrics,
+            )
+        )
+
+    def request_pages(self, count: int):
+        """Ask the coordinator to lease up to `count` more pages of the budget."""
+        self._status.put(("lease", self.index, count))
+
+    def return_pages(self, count: int):
+        """Hand unused leased pages back to the coordinator."""
+        self._status.put(("return", self.index, count))
+
+    def claim_pages(self, count: int):
+        """Charge pages fetched by an earlier run to the shared budget."""
+        self._status.put(("claim", self.index, count))
+
+    def done(self, stats: CrawlStats, metrics: MetricsSnapshot):
+        self._status.put(("done", self.index, stats, metrics))
+
+    def close(self):
+        if self._mailbox is not None:
+            self._mailbox.close()
+        # Undelivered URLs must not keep this process alive once the crawl ends.
+        for inbox in self._inboxes:
+            inbox.cancel_join_thread()
+
+
+class ShardBudget(PageBudget):
+    """A shard's share of the crawl-wide page budget, leased from the coordinator.
+
+    The shard starts with nothing and asks for up to `lease_size` pages
+    whenever its workers run out; `grant` adds what the coordinator gives.
+    Spending a lease does not end the shard's crawl. Only `close`, sent
+    once the whole budget is fetched, does. An idle shard returns what it
+    has not used so busier shards can spend it.
+    """
+
+    def __init__(self, link: ShardLink, lease_size: int):
+        super().__init__(0)
+        self._link = link
+        self._lease_size = max(1, lease_size)
+        self._requested = False
+
+    def exhausted(self) -> bool:
+        return self._closed
+
+    def grant(self, count: int):
+        if self._closed:
+            return
+        self.limit += count
+        self._requested = False
+        _wake_all(self._waiters)
+
+    def restore(self, fetched: int):
+        super().restore(fetched)
+        self.limit += fetched
+        if fetched:
+            self._link.claim_pages(fetched)
+
+    def return_unused(self):
+        unused = self.limit - self.fetched - self.reserved
+        if unused > 0 and not self._requested:
+            self.limit -= unused
+            self._link.return_pages(unused)
+
+    def _request_more(self):
+        if not self._requested:
+            self._requested = True
+            self._link.request_pages(self._lease_size)
+
+
+def _run_shard(
+    index: int,
+    shards: int,
+    config: Config,
+    inboxes: List["multiprocessing.Queue"],
+    status: "multiprocessing.Queue",
+    resume: bool,
+):
+    """Process entry point: crawl one host partition."""
+    from .spidey import Spidey
+
+    link = ShardLink(index, shards, inboxes, status)
+    try:
+        Spidey(config, shard=link, resume=resume).crawl()
+    finally:
+        link.close()
+
+
+class ShardCoordinator:
+    """Runs a crawl as `config.shards` processes, each owning a set of hosts.
+
+    Hosts are hashed to shards, so every shard keeps its own frontier,
+    politeness state, robots.txt cache and connection pool with no locking
+    between processes; cross-shard links travel over `multiprocessing`
+    queues. Files are stored in the shared output folder and deduplicated
+    through its checksum index.
+
+    `max_pages` is shared: shards ask for leases of at least `num_workers`
+    pages and are granted a share of what is left unleased, return what
+    they leave unused when idle, and are told to stop once the pages
+    fetched across all shards reach the limit.
+
+    Messages, controller state changes and process exits each wake the
+    coordinator as they happen; shards likewise wake on every message.
+
+    The crawl ends once every shard reports itself idle with the same
+    message counts twice in a row and every message sent has been received.
+    Pause, resume and stop on the controller are forwarded to all shards,
+    and the controller's stats are kept as the sum over shards. Shards send
+    their metrics snapshots with every report, so the controller's registry
+    also covers their fetcher, storage and DNS metrics.
+    """
+
+    def __init__(self, config: Config, controller: Controller, resume: bool = False):
+        self._config = config
+        self._controller = controller
+        self._resume = resume
+        self._shards = config.shards
+        self._leased = 0
+        self._fetched: Dict[int, int] = {}
+        self._lease_waiters: Dict[int, int] = {}
+        self._budget_closed = False
+        self._inboxes: List["multiprocessing.Queue"] = []
+        self._reports: Dict[int, Tuple[bool, int, int]] = {}
+        self._previous: Dict[int, Optional[Tuple[bool, int, int]]] = {}
+        self._stats: Dict[int, CrawlStats] = {}
+        self._metrics: Dict[int, MetricsSnapshot] = {}
+        self._requests = FetchCounters()
+        self._finished: Dict[int, CrawlStats] = {}
+        self._relayed_state = CrawlerState.RUNNING
+        controller.track_requests(self._requests)
+        controller.metrics.add_remote(lambda: list(self._metrics.values()))
+
+    async def run(self) -> CrawlStats:
+        """Start the shard processes, wait for them and return the merged stats."""
+        context = multiprocessing.get_context("spawn")
+        self._inboxes = [context.Queue() for _ in range(self._shards)]
+        status = context.Queue()
+        processes = [
+            context.Process(
+                target=_run_shard,
+                args=(
+                    index,
+                    self._shards,
+                    shard_config(self._config, index, self._shards),
+                    self._inboxes,
+                    status,
+                    self._resume,
+                ),
+                name=f"spidey-shard-{index}",
+            )
+            for index in range(self._shards)
+        ]
+        for process in processes:
+            process.start()
+        logger.info(f"Started {self._shards} shard processes")
+
+        try:
+            await self._supervise(processes, status)
+        finally:
+            loop = asyncio.get_running_loop()
+            for process in processes:
+                await loop.run_in_executor(None, process.join, 10)
+                if process.is_alive():
+                    logger.warning(f"Terminating unresponsive {process.name}")
+                    process.terminate()
+            for inbox in self._inboxes:
+                inbox.cancel_join_thread()
+
+        failed = [p.name for p in processes if p.exitcode not in (0, None)]
+        if failed:
+            raise SpideyError(f"Shard processes failed: {', '.join(failed)}")
+        return merge_stats(self._finished.values())
+
+    async def _supervise(
+        self,
+        processes: Sequence[BaseProcess],
+        status: "multiprocessing.Queue",
+    ):
+        mailbox = _Mailbox(status, "spidey-shard-status")
+        threading.Thread(
+            target=_watch_exits,
+            args=(processes, mailbox.wake),
+            name="spidey-shard-exits",
+            daemon=True,
+        ).start()
+
+        def on_state_changed(event):
+            mailbox.wake()
+
+        self._controller.on("state_changed", on_state_changed)
+        try:
+            await self._supervise_loop(processes, mailbox)
+        finally:
+            self._controller.off("state_changed", on_state_changed)
+            await asyncio.get_running_loop().run_in_executor(None, mailbox.close)
+
+    async def _supervise_loop(
+        self, processes: Sequence[BaseProcess], mailbox: _Mailbox
+    ):
+        finishing = False
+        while len(self._finished) < self._shards:
+            self._relay_control()
+
+            messages = await mailbox.receive(SUPERVISE_INTERVAL)
+            for message in messages:
+                self._handle(message)
+            if messages:
+                merged = merge_stats(self._stats.values())
+                self._controller.update_stats(
+                    **{name: getattr(merged, name) for name in STAT_COUNTERS}
+                )
+                self._requests.set(
+                    **{
+                        name: getattr(merged, stat)
+                        for stat, name in REQUEST_STATS.items()
+                    }
+                )
+
+            for index, process in enumerate(processes):
+                if index not in self._finished and process.exitcode not in (0, None):
+                    logger.error(f"{process.name} exited with code {process.exitcode}")
+                    self._finished[index] = self._stats.get(index, CrawlStats())
+                    self._broadcast("stop")
+
+            if (
+                not finishing
+                and not self._controller.is_stopped()
+                and self._quiescent()
+            ):
+                logger.info("All shards idle, finishing crawl")
+                self._broadcast("finish")
+                finishing = True
+
+    def _handle(self, message: Tuple):
+        kind, index = message[0], message[1]
+        if kind == "report":
+            _, _, idle, sent, received, stats, fetched, metrics = message
+            self._previous[index] = self._reports.get(index)
+            self._reports[index] = (idle, sent, received)
+            self._stats[index] = stats
+            self._metrics[index] = metrics
+            self._fetched[index] = fetched
+            spent = sum(self._fetched.values()) >= self._config.max_pages
+            if spent and not self._budget_closed:
+                logger.info("Page budget spent across shards")
+                self._broadcast("budget_spent")
+                self._budget_closed = True
+        elif kind == "lease":
+            self._lease_waiters[index] = message[2]
+            self._grant_leases()
+        elif kind == "return":
+            self._leased -= message[2]
+            self._grant_leases()
+        elif kind == "claim":
+            self._leased += message[2]
+        elif kind == "done":
+            self._stats[index] = message[2]
+            self._metrics[index] = message[3]
+            self._finished[index] = message[2]
+
+    def _grant_leases(self):
+        """Serve waiting lease requests in shard order from the unleased budget.
+
+        Each grant is at least what was asked for and at most a
+        `LEASE_BLOCKS`-th of the unleased budget per shard, so a shard needs
+        few round trips early on while the tail stays evenly spread.
+        """
+        for index in sorted(self._lease_waiters):
+            available = self._config.max_pages - self._leased
+            if available <= 0:
+                return
+            block = available // (self._shards * LEASE_BLOCKS)
+            count = min(max(self._lease_waiters.pop(index), block), available)
+            self._leased += count
+            self._inboxes[index].put(("budget", count))
+
+    def _quiescent(self) -> bool:
+        """True when every shard is idle, stable, and no message is in transit."""
+        if len(self._reports) < self._shards:
+            return False
+        for index, report in self._reports.items():
+            if index in self._finished:
+                continue
+            if not report[0] or self._previous.get(index) != report:
+                return False
+        sent = sum(report[1] for report in self._reports.values())
+        received = sum(report[2] for report in self._reports.values())
+        return sent == received
+
+    def _relay_control(self):
+        state = self._controller.state
+        if self._controller.is_stopped():
+            if self._relayed_state != CrawlerState.STOPPED:
+                self._broadcast("stop")
+                self._relayed_state = CrawlerState.STOPPED
+        elif state != self._relayed_state and state in (
+            CrawlerState.PAUSED,
+            CrawlerState.RUNNING,
+        ):
+            self._broadcast("pause" if state == CrawlerState.PAUSED else "resume")
+            self._relayed_state = state
+
+    def _broadcast(self, kind: str):
+        for inbox in self._inboxes:
+            inbox.put((kind, None))
@@ -0,0 +1,112 @@
+import logging
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import List, Optional
+from xml.etree.ElementTree import Element, ParseError, XMLPullParser
+
+
+logger = logging.getLogger(__name__)
+
+
+# Per the sitemaps.org protocol a sitemap may hold 50,000 URLs / 50 MB uncompressed.
+MAX_SITEMAP_SIZE = 50 * 1024 * 1024
+GZIP_MAGIC = b"\x1f\x8b"
+
+
+@dataclass
+class SitemapEntry:
+    """One `<url>` or `<sitemap>` element."""
+
+    url: str
+    lastmod: Optional[datetime] = None
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """Parse a W3C datetime (`2024-05-01`, `2024-05-01T10:00:00+00:00`, ...)."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.endswith("Z"):
+        value = value[:-1] + "+00:00"
+    if len(value) in (4, 7):  # YYYY or YYYY-MM
+        value = (value + "-01-01")[:10]
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+class SitemapParser:
+    """Incremental parser for sitemaps and sitemap indexes, plain or gzipped.
+
+    Bytes are fed as they arrive; gzip is detected from the first bytes and
+    inflated on the fly, and each finished element is cleared so memory
+    stays flat however large the document is.
+    """
+
+    def __init__(self, max_size: int = MAX_SITEMAP_SIZE):
+        self.pages: List[SitemapEntry] = []
+        self.sitemaps: List[SitemapEntry] = []
+        self._max_size = max_size
+        self._size = 0
+        self._inflater: Optional["zlib._Decompress"] = None
+        self._sniffed = False
+        self._parser: "XMLPullParser[Element]" = XMLPullParser(events=("end",))
+        self._loc: Optional[str] = None
+        self._lastmod: Optional[str] = None
+
+    def feed(self, data: bytes):
+        """Parse the next chunk. Raises ValueError on malformed or oversized input."""
+        if not self._sniffed:
+            self._sniffed = True
+            if data[:2] == GZIP_MAGIC:
+                self._inflater = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        try:
+            if self._inflater is not None:
+                data = self._inflater.decompress(data)
+            self._size += len(data)
+            if self._size > self._max_size:
+                raise ValueError(f"sitemap exceeds {self._max_size} bytes")
+            self._parser.feed(data)
+        except (zlib.error, ParseError) as e:
+            raise ValueError(str(e)) from e
+        self._drain()
+
+    def close(self):
+        """Finish parsing. Entries read before a truncation or error are kept."""
+        try:
+            if self._inflater is not None:
+                self._parser.feed(self._inflater.flush())
+            self._parser.close()
+        except (zlib.error, ParseError) as e:
+            logger.debug(f"Truncated or invalid sitemap: {e}")
+        self._drain()
+
+    def _drain(self):
+        for _, element in self._parser.read_events():
+            name = _local_name(element.tag)
+            if name == "loc":
+                self._loc = (element.text or "").strip()
+            elif name == "lastmod":
+                self._lastmod = element.text
+            elif name in ("url", "sitemap"):
+                if self._loc:
+                    entry = SitemapEntry(self._loc, parse_lastmod(self._lastmod))
+                    (self.pages if name == "url" else self.sitemaps).append(entry)
+                self._loc = None
+                self._lastmod = None
+                element.clear()
+
+
+def newest_first(entries: List[SitemapEntry]) -> List[SitemapEntry]:
+    """Sort entries by `lastmod`, most recently changed first, undated last."""
+    oldest = datetime.min.replace(tzinfo=timezone.utc)
+    return sorted(entries, key=lambda entry: entry.lastmod or oldest, reverse=True)
@@ -1,19 +1,31 @@
 import asyncio
-import hashlib
 import logging
-import threading
-from typing import List, Optional, Set
+import mimetypes
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
 
 import tldextract
 import validators
 
+from .canonical import DEFAULT_DROP_QUERY_PARAMS, URLCanonicalizer
+from .checkpoint import URL_DONE, URL_FETCHED, CrawlJournal
 from .config import Config
-from .fetcher import Fetcher
-from .parser import Parser
-from .queue import URLQueue
+from .exceptions import SpideyError
+from .budget import PageBudget
+from .exporter import MetricsServer
+from .fetcher import BINARY_CONTENT_TYPES, Fetcher, NotHTML
+from .http_cache import HTTPCache, NotModified
+from .parse_pool import ParsePool
+from .queue import URLQueue, get_domain
+from .scoring import URLScorer, create_scorer
+from .seen import FingerprintSeenStore, create_seen_store
+from .shard import REPORT_INTERVAL, ShardBudget, ShardCoordinator, ShardLink
+from .sitemap import newest_first, parse_lastmod
 from .file_queue import FileQueue
-from .storage import Storage
+from .storage import create_storage
 from .controller import Controller, CrawlerState, CrawlStats
+from .metrics import MetricsRegistry
 
 
 logging.basicConfig(
@@ -29,19 +41,68 @@ class Spidey:
     Features:
     - Pause/Resume/Stop control
     - Real-time stats and events
-    - Thread-safe queues
+    - Awaitable, bounded queues
     - SHA256 deduplication
     """
 
-    def __init__(self, config: Config):
+    def __init__(
+        self,
+        config: Config,
+        scorer: Optional[URLScorer] = None,
+        shard: Optional[ShardLink] = None,
+        resume: bool = False,
+    ):
         self._config = config
-        self._url_queue = URLQueue()
-        self._file_queue = FileQueue()
-        self._storage = Storage(config.folder)
-        self._visited_pages: Set[str] = set()
-        self._visited_pages_lock = threading.Lock()
-        self._initial_domains: Set[str] = set()
+        self._shard = shard
+        self._resume = resume
         self._controller = Controller()
+        if config.shards > 1 and shard is None:
+            # The coordinator only relays control and merges what shards
+            # report; each shard process opens its own stores and queues.
+            return
+
+        self._scorer = scorer or create_scorer(config)
+        self._seen = create_seen_store(config, resume=resume)
+        # File links are far fewer than page links; exact fingerprints keep
+        # a false positive from ever silently dropping a file.
+        self._seen_files = FingerprintSeenStore()
+        self._http_cache: Optional[HTTPCache] = None
+        if config.http_cache_path:
+            self._http_cache = HTTPCache(config.http_cache_path)
+        self._journal: Optional[CrawlJournal] = None
+        if config.checkpoint_path:
+            self._journal = CrawlJournal(config.checkpoint_path, resume=resume)
+            self._journal.save_config(config)
+        self._canonicalizer = URLCanonicalizer(
+            drop_query_params=config.drop_query_params,
+            sort_query_params=config.sort_query_params,
+            strip_trailing_slash=config.strip_trailing_slash,
+        )
+        self._url_queue = URLQueue(
+            maxsize=config.max_queued_urls,
+            delay=config.min_delay_between_requests,
+            seen=self._seen,
+            on_enqueue=self._journal.urls_queued if self._journal else None,
+            on_new_domain=self._on_new_domain,
+            scorer=self._scorer,
+        )
+        self._file_queue = FileQueue(maxsize=config.max_queued_files)
+        self._storage = create_storage(config)
+        self._parse_pool = ParsePool(config)
+        self._fetcher: Optional[Fetcher] = None
+        self._budget = (
+            ShardBudget(shard, lease_size=config.num_workers)
+            if shard
+            else PageBudget(config.max_pages)
+        )
+        self._initial_domains: Set[str] = set()
+        metrics = self._controller.metrics
+        metrics.add_counters("storage", self._storage.counters)
+        metrics.add_histogram("storage_write_seconds", self._storage.write_latency)
+        metrics.add_histogram("parse_seconds", self._parse_pool.latency)
+        metrics.add_collector("index", self._storage.index.get_stats)
+        metrics.add_collector("writer", self._storage.writer.get_stats)
+        metrics.add_collector("queue", self._queue_depths, kind="gauge")
 
     @classmethod
     def from_args(
@@ -62,6 +123,54 @@ class Spidey:
         respect_robots_txt: bool = True,
         user_agent: Optional[str] = None,
         min_delay_between_requests: float = 1.0,
+        parse_workers: int = 0,
+        parse_executor: str = "process",
+        max_pending_parses: int = 0,
+        max_queued_urls: int = 0,
+        max_queued_files: int = 1000,
+        seen_backend: str = "exact",
+        seen_capacity: int = 1_000_000,
+        seen_error_rate: float = 0.001,
+        seen_path: Optional[str] = None,
+        canonicalize_urls: bool = True,
+        drop_query_params: Optional[List[str]] = None,
+        sort_query_params: bool = True,
+        strip_trailing_slash: bool = False,
+        max_file_size: Optional[int] = None,
+        checkpoint_path: Optional[str] = None,
+        http_cache_path: Optional[str] = None,
+        max_page_size: Optional[int] = None,
+        transport: str = "aiohttp",
+        dns_cache_ttl: float = 300.0,
+        dns_negative_ttl: float = 30.0,
+        pre_resolve_dns: bool = True,
+        keepalive_timeout: float = 15.0,
+        pool_size: Optional[int] = None,
+        pool_size_per_host: Optional[int] = None,
+        robots_cache_ttl: float = 86400.0,
+        robots_cache_size: int = 10_000,
+        use_sitemaps: bool = False,
+        sitemap_follow_links: bool = True,
+        sitemap_changed_since: Optional[str] = None,
+        max_sitemaps: int = 1000,
+        frontier: str = "fifo",
+        score_depth_weight: float = 1.0,
+        score_path_boosts: Optional[Dict[str, float]] = None,
+        score_file_yield_weight: float = 1.0,
+        storage_shard_depth: int = 0,
+        storage_io_workers: int = 4,
+        storage_buffer_size: int = 1024 * 1024,
+        storage_fsync: str = "none",
+        storage_fsync_batch: int = 100,
+        storage_backend: str = "files",
+        pack_max_size: int = 1024 * 1024 * 1024,
+        dedup_index_path: Optional[str] = None,
+        dedup_file_urls: bool = True,
+        file_probe: str = "none",
+        shards: int = 1,
+        metrics_port: Optional[int] = None,
+        metrics_host: str = "127.0.0.1",
+        scorer: Optional[URLScorer] = None,
     ):
         """Create Spidey instance from constructor arguments."""
         config = Config(
@@ -81,8 +190,77 @@ class Spidey:
             respect_robots_txt=respect_robots_txt,
             user_agent=user_agent,
             min_delay_between_requests=min_delay_between_requests,
+            parse_workers=parse_workers,
+            parse_executor=parse_executor,
+            max_pending_parses=max_pending_parses,
+            max_queued_urls=max_queued_urls,
+            max_queued_files=max_queued_files,
+            seen_backend=seen_backend,
+            seen_capacity=seen_capacity,
+            seen_error_rate=seen_error_rate,
+            seen_path=seen_path,
+            canonicalize_urls=canonicalize_urls,
+            drop_query_params=(
+                list(DEFAULT_DROP_QUERY_PARAMS)
+                if drop_query_params is None
+                else drop_query_params
+            ),
+            sort_query_params=sort_query_params,
+            strip_trailing_slash=strip_trailing_slash,
+            max_file_size=max_file_size,
+            checkpoint_path=checkpoint_path,
+            http_cache_path=http_cache_path,
+            max_page_size=max_page_size,
+            transport=transport,
+            dns_cache_ttl=dns_cache_ttl,
+            dns_negative_ttl=dns_negative_ttl,
+            pre_resolve_dns=pre_resolve_dns,
+            keepalive_timeout=keepalive_timeout,
+            pool_size=pool_size,
+            pool_size_per_host=pool_size_per_host,
+            robots_cache_ttl=robots_cache_ttl,
+            robots_cache_size=robots_cache_size,
+            use_sitemaps=use_sitemaps,
+            sitemap_follow_links=sitemap_follow_links,
+            sitemap_changed_since=sitemap_changed_since,
+            max_sitemaps=max_sitemaps,
+            frontier=frontier,
+            score_depth_weight=score_depth_weight,
+            score_path_boosts=score_path_boosts or {},
+            score_file_yield_weight=score_file_yield_weight,
+            storage_shard_depth=storage_shard_depth,
+            storage_io_workers=storage_io_workers,
+            storage_buffer_size=storage_buffer_size,
+            storage_fsync=storage_fsync,
+            storage_fsync_batch=storage_fsync_batch,
+            storage_backend=storage_backend,
+            pack_max_size=pack_max_size,
+            dedup_index_path=dedup_index_path,
+            dedup_file_urls=dedup_file_urls,
+            file_probe=file_probe,
+            shards=shards,
+            metrics_port=metrics_port,
+            metrics_host=metrics_host,
         )
-        return cls(config)
+        return cls(config, scorer=scorer)
+
+    @classmethod
+    def from_checkpoint(cls, path: str) -> "Spidey":
+        """Rebuild a crawler from a checkpoint written with `checkpoint_path`.
+
+        Call `crawl()` on the result to continue where the previous run stopped.
+        """
+        if not os.path.exists(path):
+            raise SpideyError(f"No checkpoint found at {path}")
+
+        journal = CrawlJournal(path, resume=True)
+        data = journal.load_config()
+        journal.close()
+        if data is None:
+            raise SpideyError(f"No checkpoint found at {path}")
+
+        data["checkpoint_path"] = path
+        return cls(Config(**data), resume=True)
 
     @property
     def state(self) -> CrawlerState:
@@ -94,6 +272,11 @@ class Spidey:
         """Current crawl statistics."""
         return self._controller.get_stats()
 
+    @property
+    def metrics(self) -> MetricsRegistry:
+        """Registry of all crawl counters and latency histograms."""
+        return self._controller.metrics
+
     def on(self, event_type: str, callback):
         """Register event listener."""
         self._controller.on(event_type, callback)
@@ -120,14 +303,44 @@ class Spidey:
     def crawl(self):
         """Start the crawling process."""
         self._controller.start()
-        asyncio.run(self._spider())
-        self._controller.complete()
+        if self._config.shards > 1 and self._shard is None:
+            asyncio.run(self._coordinate())
+        else:
+            asyncio.run(self._spider())
         logger.info("Crawl completed")
 
+    async def _coordinate(self):
+        """Run the crawl as `shards` worker processes and merge their stats."""
+        if self._config.checkpoint_path:
+            # Shards journal to their own files; this one only records the
+            # crawl's config so `from_checkpoint` can restart every shard.
+            journal = CrawlJournal(self._config.checkpoint_path, resume=self._resume)
+            journal.save_config(self._config)
+            journal.close()
+        metrics_server = await self._start_metrics_server()
+        try:
+            coordinator = ShardCoordinator(
+                self._config, self._controller, resume=self._resume
+            )
+            await coordinator.run()
+        finally:
+            if metrics_server:
+                await metrics_server.close()
+        self._controller.complete()
+        self._print_stats(None)
+
     async def _spider(self):
         """Main crawling orchestrator."""
-        async with Fetcher(self._config) as fetcher:
-            await self._init_domains()
+        async with Fetcher(
+            self._config,
+            http_cache=self._http_cache,
+            is_stopped=self._controller.is_stopped,
+            reserve_slot=self._url_queue.reserve_slot,
+        ) as fetcher, self._parse_pool:
+            self._fetcher = fetcher
+            self._register_fetcher_metrics(fetcher)
+            metrics_server = await self._start_metrics_server()
+            restored_files = await self._init_domains()
 
             url_workers = [
                 asyncio.create_task(self._url_worker(i, fetcher))
@@ -140,26 +353,250 @@ class Spidey:
             ]
 
             monitor_task = asyncio.create_task(self._monitor_progress())
+            stop_task = asyncio.create_task(self._watch_stop())
+            sitemap_task = None
+            if self._config.use_sitemaps:
+                self._url_queue.hold()
+                sitemap_task = asyncio.create_task(self._discover_sitemaps(fetcher))
+            inbox_task = None
+            if self._shard:
+                self._url_queue.hold()
+                inbox_task = asyncio.create_task(self._shard_inbox())
+
+            if restored_files:
+                for file_url, _ in restored_files:
+                    self._seen_files.add(file_url)
+                await self._file_queue.put_batch(restored_files)
 
             await asyncio.gather(*url_workers, return_exceptions=True)
+            if sitemap_task:
+                sitemap_task.cancel()
+                await asyncio.gather(sitemap_task, return_exceptions=True)
+            if inbox_task:
+                # Other shards may still route files here after the page budget is spent.
+                await inbox_task
 
-            self._controller.set_state(CrawlerState.STOPPED)
+            await self._file_queue.join()
+            self._file_queue.close()
 
             await asyncio.gather(*file_workers, return_exceptions=True)
+            await self._storage.close()
             monitor_task.cancel()
-
+            stop_task.cancel()
+
+            self._update_seen_stats()
+            self._seen.close()
+            if self._journal:
+                self._journal.close()
+            if self._http_cache:
+                self._http_cache.close()
+            self._controller.complete()
+            if metrics_server:
+                await metrics_server.close()
             self._print_stats(fetcher)
+            if self._shard:
+                self._shard.done(
+                    self._controller.get_stats(), self._controller.metrics.snapshot()
+                )
+            self._fetcher = None
+
+    def _on_new_domain(self, url: str):
+        """Called by the URL queue the first time a host is enqueued."""
+        if self._fetcher:
+            self._fetcher.prefetch(url)
 
-    async def _init_domains(self):
-        """Extract initial domains from starting URLs."""
-        self._url_queue.add_batch(self._config.urls)
+    async def _init_domains(self) -> List[Tuple[str, str]]:
+        """Extract initial domains from starting URLs and seed the queues.
+
+        Returns pending file downloads restored from the checkpoint journal.
+        """
         for url in self._config.urls:
             domain = self._get_url_domain(url)
             self._initial_domains.add(domain)
 
+        if self._resume and self._journal and self._journal.has_state():
+            return self._restore_from_journal()
+
+        seeds, variants = self._canonicalize(self._seed_urls())
+        self._add_pages(seeds, variants=variants)
+        return []
+
+    def _seed_urls(self) -> List[str]:
+        """Seed URLs this process crawls; with shards, only hosts it owns."""
+        if self._shard:
+            return [url for url in self._config.urls if self._shard.owns(url)]
+        return list(self._config.urls)
+
+    def _add_pages(
+        self,
+        urls: List[str],
+        referrer: Optional[str] = None,
+        depth: int = 0,
+        variants: Optional[Set[str]] = None,
+    ) -> int:
+        """Queue page URLs, routing hosts owned by other shards to them.
+
+        `variants` are canonical URLs reached through a differing link; those
+        the seen store rejects count as avoided duplicate fetches.
+        """
+        if self._shard:
+            urls = self._shard.route_pages(urls, referrer, depth)
+        added = self._url_queue.add_urls(urls, referrer=referrer, depth=depth)
+        if variants:
+            avoided = len(variants.intersection(urls).difference(added))
+            if avoided:
+                self._controller.increment_stats(duplicates_avoided=avoided)
+        return len(added)
+
+    def _shard_idle(self) -> bool:
+        # One in-flight slot is the inbox's own hold on the URL queue.
+        pages_idle = self._url_queue.in_flight() <= 1 and (
+            self._url_queue.is_empty() or self._url_queue.is_closed()
+        )
+        return pages_idle and self._file_queue.unfinished() == 0
+
+    async def _shard_inbox(self):
+        """Feed URLs routed from other shards into the local queues.
+
+        Wakes on every message, and at least every `REPORT_INTERVAL` to
+        report status to the coordinator. While busy, reports are sent at most
+        that often; a change to or from idle is reported at once. Holds the
+        URL queue open until the coordinator says the whole crawl is finished.
+        """
+        shard, budget = self._shard, self._budget
+        assert shard is not None and isinstance(budget, ShardBudget)
+        reported_at = 0.0
+        was_idle = False
+        try:
+            while True:
+                for kind, payload in await shard.receive(REPORT_INTERVAL):
+                    if kind == "pages":
+                        for url, referrer, depth in payload:
+                            self._url_queue.add_batch(
+                                [url], referrer=referrer, depth=depth
+                            )
+                    elif kind == "files":
+                        for url, referrer in payload:
+                            await self._queue_file(url, referrer)
+                    elif kind == "budget":
+                        budget.grant(payload)
+                    elif kind == "budget_spent":
+                        budget.close()
+                        self._url_queue.close()
+                    elif kind == "pause":
+                        self._controller.pause()
+                    elif kind == "resume":
+                        self._controller.resume()
+                    elif kind == "stop":
+                        self._controller.stop()
+                        return
+                    elif kind == "finish":
+                        return
+                idle = self._shard_idle()
+                now = time.monotonic()
+                if idle == was_idle and now - reported_at < REPORT_INTERVAL:
+                    continue
+                if idle:
+                    budget.return_unused()
+                shard.report(
+                    idle,
+                    self._controller.get_stats(),
+                    budget.fetched,
+                    self._controller.metrics.snapshot(),
+                )
+                reported_at, was_idle = now, idle
+        finally:
+            self._url_queue.task_done()
+
+    def _restore_from_journal(self) -> List[Tuple[str, str]]:
+        """Reload frontier, seen-set and stored checksums without refetching."""
+        journal = self._journal
+        assert journal is not None
+
+        done = list(journal.iter_urls(URL_DONE, URL_FETCHED))
+        self._url_queue.mark_visited(done)
+        # Failed and robots-blocked URLs are visited but not charged to the budget.
+        fetched = journal.count_urls(URL_FETCHED)
+        self._budget.restore(fetched)
+
+        queued = list(journal.iter_queued())
+        # A resumed disk seen store already holds these URLs.
+        for url, referrer, depth in queued:
+            self._url_queue.add_urls([url], referrer, depth, restore=True)
+
+        self._storage.mark_stored(journal.iter_checksums())
+        files = list(journal.iter_file_tasks())
+
+        logger.info(
+            f"Resumed from {journal.path}: {len(done)} pages done ({fetched} fetched), "
+            f"{len(queued)} queued, {len(files)} files pending"
+        )
+        return files
+
+    async def _discover_sitemaps(self, fetcher: Fetcher):
+        """Seed the frontier from the seed hosts' sitemaps, newest pages first.
+
+        Sitemap indexes are followed breadth-first up to `max_sitemaps`
+        documents. With `sitemap_changed_since`, entries whose `<lastmod>` is
+        older are skipped, so a recrawl only touches pages that changed.
+        Runs alongside the workers while holding the URL queue open.
+        """
+        try:
+            since = parse_lastmod(self._config.sitemap_changed_since)
+            pending: List[str] = []
+            for url in self._seed_urls():
+                pending.extend(await fetcher.get_sitemaps(url))
+
+            fetched: Set[str] = set()
+            while pending and len(fetched) < self._config.max_sitemaps:
+                if self._controller.is_stopped():
+                    break
+                await self._controller.wait_if_paused()
+
+                sitemap_url = pending.pop(0)
+                if sitemap_url in fetched:
+                    continue
+                fetched.add(sitemap_url)
+
+                sitemap = await fetcher.fetch_sitemap(sitemap_url)
+                if sitemap is None:
+                    continue
+
+                entries = [
+                    entry
+                    for entry in newest_first(sitemap.sitemaps + sitemap.pages)
+                    if not (since and entry.lastmod and entry.lastmod < since)
+                ]
+                child_sitemaps = {entry.url for entry in sitemap.sitemaps}
+                pending.extend(e.url for e in entries if e.url in child_sitemaps)
+
+                page_urls, file_urls = self._split_links(
+                    e.url for e in entries if e.url not in child_sitemaps
+                )
+                page_urls, variants = self._canonicalize(page_urls)
+                added = self._add_pages(page_urls, variants=variants)
+                self._controller.increment_stats(urls_discovered=added)
+                await self._enqueue_files(file_urls, sitemap_url)
+
+                logger.info(
+                    f"Sitemap {sitemap_url}: {added} new URLs, "
+                    f"{len(file_urls)} files, {len(child_sitemaps)} child sitemaps"
+                )
+        except Exception as e:
+            logger.error(f"Sitemap discovery failed: {e}")
+        finally:
+            self._url_queue.task_done()
+
+    async def _watch_stop(self):
+        """Release queue waiters as soon as the crawler is stopped."""
+        await self._controller.wait_until_stopped()
+        self._budget.close()
+        self._url_queue.close()
+        self._file_queue.close()
+
     async def _monitor_progress(self):
         """Monitor and report progress."""
-        while self._controller.state != CrawlerState.STOPPED:
+        while not self._controller.is_stopped():
             await self._controller.wait_if_paused()
             await asyncio.sleep(5)
 
@@ -175,6 +612,7 @@ class Spidey:
                 "files_skipped": storage_stats["files_skipped"],
             }
             self._controller.update_stats(**stats)
+            self._update_seen_stats()
 
             page_count = self._controller.get_stats().pages_visited
 
@@ -186,53 +624,98 @@ class Spidey:
 
             self._controller.emit_event("progress", stats)
 
-            if url_count == 0 and page_count >= self._config.max_pages // 2:
-                self._controller.stop()
-                break
+            if self._journal:
+                self._journal.flush()
+
+    def _update_seen_stats(self):
+        self._controller.update_stats(
+            seen_urls=len(self._seen), seen_memory_bytes=self._seen.memory_bytes()
+        )
 
     async def _url_worker(self, worker_id: int, fetcher: Fetcher):
         """Worker that fetches URLs and extracts new URLs/files."""
-        while self._controller.state != CrawlerState.STOPPED:
+        while not self._controller.is_stopped():
             await self._controller.wait_if_paused()
 
-            batch = self._url_queue.get_batch(5)
+            batch = await self._url_queue.next_batch(5)
             if not batch:
-                await asyncio.sleep(0.5)
-                continue
+                break
 
             tasks = [self._process_url(url, fetcher) for url in batch]
-            await asyncio.gather(*tasks, return_exceptions=True)
+            try:
+                await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                self._url_queue.task_done(len(batch))
 
             if self._config.sleep_time > 0:
                 await asyncio.sleep(self._config.sleep_time)
 
     async def _process_url(self, url: str, fetcher: Fetcher):
-        """Fetch and process a single URL."""
+        """Fetch and process a single URL.
+
+        A page-budget slot is reserved before the request, so pages already
+        handed out cannot push the crawl past `max_pages`.
+        """
+        if self._controller.is_stopped() or self._url_queue.is_closed():
+            return
+        if not await self._budget.reserve():
+            self._url_queue.close()
+            return
+
+        fetched = False
         try:
-            if self._controller.is_stopped():
-                return
-
-            with self._visited_pages_lock:
-                if url in self._visited_pages:
-                    return
-                self._visited_pages.add(url)
-
+            depth, referrer = self._url_queue.pop_context(url)
             html = await fetcher.fetch(url)
+            if html is None and self._controller.is_stopped():
+                # Abandoned by stop, not fetched: keep it queued for a resume.
+                return
+            if self._journal:
+                is_page = bool(html) and not isinstance(html, NotHTML)
+                self._journal.urls_done([url], fetched=is_page)
+
+            crawl_delay = fetcher.get_crawl_delay(url)
+            if crawl_delay:
+                self._url_queue.set_domain_delay(get_domain(url), crawl_delay)
+
+            if isinstance(html, NotHTML):
+                # A link without a file extension that turned out to be a file.
+                if self._is_wanted_type(html.content_type):
+                    await self._queue_file(url, referrer or url)
+                return
             if not html:
                 return
+            fetched = True
 
-            new_page_urls = Parser.extract_page_urls(html, url)
-            filtered_urls = [u for u in new_page_urls if self._is_allowed(u)]
-            self._url_queue.add_batch(filtered_urls)
+            if isinstance(html, NotModified):
+                new_page_urls = html.entry.page_links
+                file_urls = list(html.entry.file_links)
+                self._controller.increment_stats(
+                    not_modified=1, bytes_saved=html.entry.size
+                )
+            else:
+                new_page_urls, file_urls = await self._parse_pool.extract_links(
+                    html.body, url, html.encoding
+                )
+                new_page_urls, file_urls = list(new_page_urls), list(file_urls)
+                if self._http_cache:
+                    self._http_cache.store_links(url, new_page_urls, file_urls)
+            filtered_urls, linked_files = self._split_links(new_page_urls)
+            file_urls.extend(linked_files)
+            if self._config.use_sitemaps and not self._config.sitemap_follow_links:
+                filtered_urls = []
+            if self._scorer:
+                # Before the links are enqueued, so their scores see this page's yield.
+                self._scorer.record(url, referrer, len(file_urls))
+                if self._scorer.adaptive and referrer is not None:
+                    self._url_queue.rescore(referrer)
+            page_urls, variants = self._canonicalize(filtered_urls)
+            self._add_pages(page_urls, referrer=url, depth=depth + 1, variants=variants)
 
             self._controller.increment_stats(
                 urls_discovered=len(filtered_urls), pages_visited=1
             )
 
-            file_urls = Parser.extract_file_urls(html, url)
-            for file_url in file_urls:
-                if self._is_allowed_file(file_url):
-                    self._file_queue.put(file_url, url)
+            await self._enqueue_files(file_urls, url)
 
             self._controller.emit_event(
                 "page_crawled",
@@ -245,20 +728,29 @@ class Spidey:
 
         except Exception as e:
             logger.error(f"Error processing {url}: {e}")
-            self._controller.increment_stats(requests_failed=1)
+
+        finally:
+            self._budget.release(fetched)
+            if self._budget.exhausted():
+                self._url_queue.close()
 
     async def _file_worker(self, worker_id: int, fetcher: Fetcher):
         """Worker that downloads files."""
-        while self._controller.state != CrawlerState.STOPPED:
+        while not self._controller.is_stopped():
             await self._controller.wait_if_paused()
 
-            task = self._file_queue.get()
+            task = await self._file_queue.get()
             if task is None:
-                await asyncio.sleep(0.5)
-                continue
+                break
 
             url, referrer = task
-            await self._download_file(url, referrer, fetcher)
+            try:
+                await self._download_file(url, referrer, fetcher)
+            finally:
+                self._file_queue.task_done()
+
+            if self._journal:
+                self._journal.file_done(url, referrer)
 
     async def _download_file(self, url: str, referrer: str, fetcher: Fetcher):
         """Download a file and save it."""
@@ -266,33 +758,129 @@ class Spidey:
             if self._controller.is_stopped():
                 return
 
-            content = await fetcher.fetch_bytes(url, referrer)
-            if not content:
-                return
+            self._drop_stale_validators(url)
+            if self._config.file_probe == "head":
+                probe = await fetcher.probe(
+                    url, referrer, max_size=self._config.max_file_size
+                )
+                if probe is None:
+                    return
+                if isinstance(probe, NotModified):
+                    self._controller.increment_stats(
+                        not_modified=1, bytes_saved=probe.entry.size
+                    )
+                    return
 
-            checksum = hashlib.sha256(content).hexdigest()
+            download = await fetcher.download(
+                url,
+                self._storage.writer,
+                referrer,
+                max_size=self._config.max_file_size,
+            )
+            if not download:
+                return
 
-            if self._file_queue.is_processed(checksum):
+            if isinstance(download, NotModified):
+                self._controller.increment_stats(
+                    not_modified=1, bytes_saved=download.entry.size
+                )
                 return
 
-            saved_path = await self._storage.save_file(url, content)
+            checksum = download.checksum
+            saved_path = await self._storage.save_download(download)
 
             if saved_path:
+                if self._journal:
+                    self._journal.checksum_stored(checksum)
                 self._controller.increment_stats(
-                    files_saved=1, bytes_downloaded=len(content)
+                    files_saved=1, bytes_downloaded=download.size
                 )
                 self._controller.emit_event(
                     "file_saved",
-                    {"url": url, "checksum": checksum, "size": len(content)},
+                    {"url": url, "checksum": checksum, "size": download.size},
                 )
             else:
                 self._controller.increment_stats(files_skipped=1)
 
-            self._file_queue.mark_processed(checksum)
-
         except Exception as e:
             logger.error(f"Error downloading {url}: {e}")
 
+    def _drop_stale_validators(self, url: str):
+        """Forget cached validators of a file whose stored copy is gone.
+
+        A 304 or a fresh cache entry only says the server's copy is unchanged;
+        it stands in for a download only while that content is still stored.
+        """
+        if self._http_cache is None:
+            return
+        entry = self._http_cache.get(url)
+        if entry is None:
+            return
+        if entry.checksum and self._storage.has_object(
+            entry.checksum, url, entry.content_type
+        ):
+            return
+        logger.debug(f"Stored copy of {url} is missing, downloading again")
+        self._http_cache.forget(url)
+
+    def _canonicalize(
+        self, urls: Iterable[str], count_avoided: bool = True
+    ) -> Tuple[List[str], Set[str]]:
+        """Canonicalize URLs, collapsing variants that map to the same page.
+
+        Returns the canonical URLs and the subset reached through a differing
+        variant. A variant whose canonical form is already in `urls` counts as
+        an avoided duplicate fetch here; `_add_pages` counts those already
+        seen, so no seen-store lookup is needed.
+        """
+        if not self._config.canonicalize_urls:
+            return list(urls), set()
+
+        canonical_urls: Dict[str, None] = {}
+        variants: Set[str] = set()
+        avoided = 0
+        for url in urls:
+            canonical = self._canonicalizer.canonicalize(url)
+            if canonical != url:
+                if canonical in canonical_urls:
+                    avoided += 1
+                    continue
+                variants.add(canonical)
+            canonical_urls[canonical] = None
+
+        if avoided and count_avoided:
+            self._controller.increment_stats(duplicates_avoided=avoided)
+        return list(canonical_urls), variants
+
+    def _split_links(self, urls: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """Split allowed URLs into pages to crawl and files to download."""
+        page_urls, file_urls = [], []
+        for url in urls:
+            if not self._is_allowed(url):
+                continue
+            if self._is_allowed_file(url):
+                file_urls.append(url)
+            else:
+                page_urls.append(url)
+        return page_urls, file_urls
+
+    async def _enqueue_files(self, file_urls: List[str], referrer: str):
+        """Queue file links, skipping URLs already queued by another page."""
+        canonical_files, _ = self._canonicalize(file_urls, count_avoided=False)
+        file_urls = [url for url in canonical_files if self._is_allowed_file(url)]
+        if self._shard:
+            file_urls = self._shard.route_files(file_urls, referrer)
+        for file_url in file_urls:
+            await self._queue_file(file_url, referrer)
+
+    async def _queue_file(self, file_url: str, referrer: str):
+        if self._config.dedup_file_urls and not self._seen_files.add(file_url):
+            self._controller.increment_stats(file_urls_seen=1, file_urls_deduplicated=1)
+            return
+        self._controller.increment_stats(file_urls_seen=1)
+        if await self._file_queue.put(file_url, referrer) and self._journal:
+            self._journal.file_added(file_url, referrer)
+
     def _is_allowed(self, url: str) -> bool:
         """Check if URL is allowed based on domain restrictions."""
         if not validators.url(url):
@@ -317,6 +905,17 @@ class Spidey:
         ext = self._get_file_extension(url)
         return ext in self._config.allowed_extensions
 
+    def _is_wanted_type(self, content_type: str) -> bool:
+        """Whether a non-HTML page response should be downloaded as a file.
+
+        True if the type maps to an allowed extension, or is a generic binary
+        type that says nothing about what the file is.
+        """
+        if content_type in BINARY_CONTENT_TYPES:
+            return True
+        extensions = mimetypes.guess_all_extensions(content_type)
+        return not self._config.allowed_extensions.isdisjoint(extensions)
+
     def _get_url_domain(self, url: str) -> str:
         """Extract domain from URL."""
         extracted = tldextract.extract(url)
@@ -330,9 +929,8 @@ class Spidey:
         ext = path.rsplit(".", 1)[-1] if "." in path else ""
         return f".{ext.lower()}" if ext else ""
 
-    def _print_stats(self, fetcher: Fetcher):
-        """Print final statistics."""
-        fetcher_stats = fetcher.get_stats()
+    def _print_stats(self, fetcher: Optional[Fetcher]):
+        """Print final statistics. Without a fetcher (sharded runs) only the merged totals."""
         final_stats = self._controller.get_stats()
 
         logger.info("=" * 50)
@@ -340,13 +938,21 @@ class Spidey:
         logger.info("=" * 50)
         logger.info(f"Pages visited: {final_stats.pages_visited}")
         logger.info(f"URLs discovered: {final_stats.urls_discovered}")
-        logger.info(f"URLs in queue: {self._url_queue.size()}")
+        if fetcher is not None:
+            logger.info(f"URLs in queue: {self._url_queue.size()}")
         logger.info(f"Files saved: {final_stats.files_saved}")
         logger.info(f"Files skipped (duplicates): {final_stats.files_skipped}")
-        logger.info(f"Total requests: {fetcher_stats['total_requests']}")
-        logger.info(f"Successful requests: {fetcher_stats['successful_requests']}")
-        logger.info(f"Failed requests: {fetcher_stats['failed_requests']}")
-        logger.info(f"Retries: {fetcher_stats['retries']}")
+        logger.info(f"Duplicate fetches avoided: {final_stats.duplicates_avoided}")
+        logger.info(
+            f"File links deduplicated: {final_stats.file_urls_deduplicated}/"
+            f"{final_stats.file_urls_seen} ({final_stats.file_dedup_rate:.1f}%)"
+        )
+        logger.info(
+            f"Seen URLs: {final_stats.seen_urls} "
+            f"({final_stats.memory_per_url:.1f} bytes/URL)"
+        )
+        if fetcher is not None:
+            self._print_fetcher_stats(fetcher)
         logger.info(f"Duration: {final_stats.duration:.2f}s")
         logger.info("=" * 50)
 
@@ -360,3 +966,73 @@ class Spidey:
                 }
             },
         )
+
+    def _queue_depths(self) -> Dict[str, int]:
+        return {
+            "urls": self._url_queue.size(),
+            "files": self._file_queue.size(),
+            "domains": self._url_queue.domain_count(),
+        }
+
+    async def _start_metrics_server(self) -> Optional[MetricsServer]:
+        """Serve live metrics and controls if `metrics_port` is set."""
+        if self._config.metrics_port is None:
+            return None
+        server = MetricsServer(
+            self._controller,
+            host=self._config.metrics_host,
+            port=self._config.metrics_port,
+            domain_sizes=(
+                self._url_queue.domain_sizes if self._config.shards == 1 else None
+            ),
+        )
+        await server.start()
+        return server
+
+    def _register_fetcher_metrics(self, fetcher: Fetcher):
+        metrics = self._controller.metrics
+        metrics.add_counters("fetcher", fetcher.counters)
+        self._controller.track_requests(fetcher.counters)
+        metrics.add_histogram("fetch_seconds", fetcher.fetch_latency)
+        dns_latency = fetcher.get_dns_latency()
+        if dns_latency is not None:
+            metrics.add_histogram("dns_seconds", dns_latency)
+        metrics.add_collector("dns", fetcher.get_dns_stats)
+        limiter = fetcher.rate_limiter
+        metrics.add_histogram("rate_limit_wait_seconds", limiter.wait_times)
+        metrics.add_histogram("rate_limit_queue_depth", limiter.queue_depths)
+        metrics.add_collector(
+            "rate_limit", lambda: {"waiting": limiter.queue_depth()}, kind="gauge"
+        )
+
+    def _print_fetcher_stats(self, fetcher: Fetcher):
+        fetcher_stats = fetcher.get_stats()
+        logger.info(f"Total requests: {fetcher_stats['total_requests']}")
+        logger.info(f"Successful requests: {fetcher_stats['successful_requests']}")
+        logger.info(f"Failed requests: {fetcher_stats['failed_requests']}")
+        logger.info(f"Retries: {fetcher_stats['retries']}")
+        logger.info(
+            f"Not modified (cache hits): {fetcher_stats['not_modified']}, "
+            f"bytes saved: {fetcher_stats['bytes_saved']}"
+        )
+        connection_stats = fetcher.get_connection_stats()
+        if connection_stats:
+            created = sum(host["created"] for host in connection_stats.values())
+            reused = sum(host["reused"] for host in connection_stats.values())
+            total = created + reused
+            logger.info(
+                f"Connections: {created} opened, {reused} reused "
+                f"({reused / total if total else 0:.0%} reuse) "
+                f"across {len(connection_stats)} hosts"
+            )
+        dns_stats = fetcher.get_dns_stats()
+        if dns_stats:
+            logger.info(
+                f"DNS cache: {dns_stats['hit_rate']:.0%} hit rate, "
+                f"{dns_stats['failures']} failed lookups"
+            )
+        index_stats = self._storage.index.get_stats()
+        logger.info(
+            f"Checksum index: {index_stats['indexed']} objects, "
+            f"{index_stats['hit_rate']:.0%} duplicate rate"
+        )
@@ -1,26 +1,75 @@
-import hashlib
 import logging
 import os
 from pathlib import Path
-from typing import Optional, Set
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Optional
 from urllib.parse import urlsplit
 
 import aiofiles
 
+from .config import Config
+from .dedup import INDEX_FILENAME, ChecksumIndex
+from .metrics import Counters, Histogram, Timer
+from .writer import StorageWriter
+
+if TYPE_CHECKING:
+    from .fetcher import DownloadedFile
 
 logger = logging.getLogger(__name__)
 
 
+class StorageCounters(Counters):
+    __slots__ = ("files_saved", "files_skipped", "bytes_written")
+
+    files_saved: int
+    files_skipped: int
+    bytes_written: int
+
+
 class Storage:
-    """Handles file storage with deduplication via SHA256 checksums."""
+    """Handles file storage with deduplication via SHA256 checksums.
 
-    def __init__(self, folder: str):
-        self._folder = Path(folder)
-        self._processed_checksums: Set[str] = set()
-        self._stats = {"files_saved": 0, "files_skipped": 0, "bytes_written": 0}
+    Files land in `<folder>/<ext>/<checksum><ext>`. With `shard_depth` > 0 the
+    checksum's leading hex pairs add that many directory levels, e.g.
+    `png/ab/cd/<checksum>.png` for depth 2, keeping directories small. All
+    writes go through a `StorageWriter` pool.
+
+    Stored checksums are recorded in a persistent `ChecksumIndex` (by default
+    `<folder>/.index.db`), so content already on disk is skipped across runs
+    and across crawler processes sharing the folder.
+    """
 
-    def _compute_checksum(self, data: bytes) -> str:
-        return hashlib.sha256(data).hexdigest()
+    def __init__(
+        self,
+        folder: str,
+        shard_depth: int = 0,
+        io_workers: int = 4,
+        buffer_size: int = 1024 * 1024,
+        fsync: str = "none",
+        fsync_batch: int = 100,
+        index_path: Optional[str] = None,
+    ):
+        self._folder = Path(folder)
+        self.temp_dir = self._folder / ".tmp"
+        self._shard_depth = shard_depth
+        self.writer = StorageWriter(
+            self.temp_dir,
+            io_workers=io_workers,
+            buffer_size=buffer_size,
+            fsync=fsync,
+            fsync_batch=fsync_batch,
+        )
+        self.index = ChecksumIndex(
+            index_path or str(self._folder / INDEX_FILENAME), scan_folder=folder
+        )
+        self.counters = StorageCounters()
+        self.write_latency = Histogram()
+
+    def path_for(self, checksum: str, ext: str) -> Path:
+        """Final location of a file with this checksum and extension."""
+        directory = self._folder / ext.lstrip(".")
+        for level in range(self._shard_depth):
+            directory = directory / checksum[level * 2 : level * 2 + 2]
+        return directory / f"{checksum}{ext}"
 
     def _get_extension(
         self,
@@ -54,51 +103,72 @@ class Storage:
 
         return ext
 
-    def is_duplicate(self, checksum: str) -> bool:
-        """Check if checksum was already processed (in-memory only)."""
-        return checksum in self._processed_checksums
+    def mark_stored(self, checksums: Iterable[str]):
+        """Register checksums already present in the output folder."""
+        self.index.mark(checksums)
 
-    async def save_file(
-        self, url: str, content: bytes, content_type: Optional[str] = None
+    def is_duplicate(self, checksum: str) -> bool:
+        """Check if content with this checksum is already stored."""
+        return checksum in self.index
+
+    def has_object(
+        self, checksum: str, url: str, content_type: Optional[str] = None
+    ) -> bool:
+        """True if the content is indexed or its file is still on disk."""
+        if checksum in self.index:
+            return True
+        return self.path_for(checksum, self._get_extension(url, None, content_type)).exists()
+
+    async def save_download(self, download: "DownloadedFile") -> Optional[str]:
+        """Write a downloaded body into place as `<checksum><ext>`.
+
+        The extension falls back to the response `Content-Type` when the URL
+        has none. The file appears atomically via rename, so readers never
+        see a partial write. Duplicates are discarded. Returns path if saved,
+        None if duplicate/skipped.
+        """
+        return await self._save(
+            download.url,
+            download.checksum,
+            download.size,
+            download.content_type,
+            content=download.content,
+            temp_path=download.temp_path,
+        )
+
+    async def _save(
+        self,
+        url: str,
+        checksum: str,
+        size: int,
+        content_type: Optional[str],
+        content: Optional[bytes] = None,
+        temp_path: Optional[Path] = None,
     ) -> Optional[str]:
-        """Save file with checksum filename. Returns path if saved, None if duplicate/skipped."""
-        checksum = self._compute_checksum(content)
-
-        if checksum in self._processed_checksums:
-            self._stats["files_skipped"] += 1
+        filepath = self.path_for(checksum, self._get_extension(url, None, content_type))
+        # Claimed before the write so a concurrent copy is seen as a duplicate.
+        if not self.index.claim(checksum, str(filepath), size, url, content_type):
+            await self.writer.discard(temp_path)
+            self.counters.files_skipped += 1
             logger.debug(f"Skipping duplicate: {checksum[:16]}...")
             return None
 
-        ext = self._get_extension(url, content, content_type)
-        filename = f"{checksum}{ext}"
-        ext_folder = ext.lstrip(".")
-
-        save_dir = self._folder / ext_folder
-        save_dir.mkdir(parents=True, exist_ok=True)
-
-        filepath = save_dir / filename
-
         try:
-            async with aiofiles.open(filepath, "wb") as f:
-                await f.write(content)
-
-            self._processed_checksums.add(checksum)
-            self._stats["files_saved"] += 1
-            self._stats["bytes_written"] += len(content)
-
-            logger.info(f"Saved: {filename} ({len(content)} bytes)")
-            return str(filepath)
-
-        except FileExistsError:
-            self._processed_checksums.add(checksum)
-            self._stats["files_skipped"] += 1
-            logger.debug(f"File already exists: {filename}")
-            return None
-
+            with Timer(self.write_latency):
+                await self.writer.commit(filepath, content=content, temp_path=temp_path)
         except Exception as e:
-            logger.warning(f"Failed to save {filename}: {e}")
+            self.index.release(checksum)
+            await self.writer.discard(temp_path)
+            logger.warning(f"Failed to save {filepath.name}: {e}")
             return None
 
+        self.index.confirm(checksum)
+        self.counters.files_saved += 1
+        self.counters.bytes_written += size
+
+        logger.debug(f"Saved: {filepath.name} ({size} bytes)")
+        return str(filepath)
+
     async def save_html(self, url: str, html: str, checksum: str) -> Optional[str]:
         """Save HTML file with checksum filename."""
         filename = f"{checksum}.html"
@@ -124,5 +194,33 @@ class Storage:
             logger.warning(f"Failed to save HTML {filename}: {e}")
             return None
 
-    def get_stats(self) -> dict:
-        return self._stats.copy()
+    async def close(self):
+        """Flush pending fsyncs, stop the I/O pool and close the index."""
+        await self.writer.close()
+        self.index.close()
+
+    def get_stats(self) -> Dict[str, object]:
+        stats: Dict[str, object] = dict(self.counters.snapshot())
+        stats["index"] = self.index.get_stats()
+        return stats
+
+
+def create_storage(config: Config) -> Storage:
+    """Build the storage backend selected by `Config.storage_backend`."""
+    options: Dict[str, Any] = dict(
+        io_workers=config.storage_io_workers,
+        buffer_size=config.storage_buffer_size,
+        fsync=config.storage_fsync,
+        fsync_batch=config.storage_fsync_batch,
+        index_path=config.dedup_index_path,
+    )
+    if config.storage_backend in ("pack", "warc"):
+        from .pack_storage import PackStorage
+
+        return PackStorage(
+            config.folder,
+            format=config.storage_backend,
+            max_pack_size=config.pack_max_size,
+            **options,
+        )
+    return Storage(config.folder, shard_depth=config.storage_shard_depth, **options)
@@ -0,0 +1,361 @@
+import ipaddress
+import logging
+import socket
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from typing import AsyncIterator, Dict, List, Mapping, Optional
+
+import aiohttp
+from aiohttp import ClientTimeout
+
+from .config import Config
+from .dns import CachingResolver
+from .exceptions import SpideyError
+from .metrics import Histogram
+
+
+logger = logging.getLogger(__name__)
+
+
+class TransportError(SpideyError):
+    """Retryable network or HTTP error raised by a transport."""
+
+
+class TransportResponse:
+    """Transport-neutral view of an HTTP response used by the fetcher."""
+
+    status: int
+    reason: str
+    http_version: str
+    headers: Mapping[str, str]
+    request_headers: Mapping[str, str]
+    content_type: str
+    content_length: Optional[int]
+    # Declared in the Content-Type header; None when absent.
+    charset: Optional[str]
+
+    async def read(self) -> bytes:
+        raise NotImplementedError
+
+    async def text(self, errors: str = "strict") -> str:
+        raise NotImplementedError
+
+    def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        raise NotImplementedError
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise TransportError(f"HTTP {self.status}")
+
+
+class Transport:
+    """Pluggable HTTP client used by `Fetcher`."""
+
+    name = "base"
+
+    def __init__(self, config: Config, headers: Dict[str, str]):
+        self._config = config
+        self._headers = headers
+
+    async def open(self):
+        pass
+
+    async def close(self):
+        pass
+
+    def request(self, method: str, url: str, headers: Mapping[str, str]):
+        """Async context manager yielding a `TransportResponse`."""
+        raise NotImplementedError
+
+    def get(self, url: str, headers: Mapping[str, str]):
+        return self.request("GET", url, headers)
+
+    async def prefetch(self, host: str, port: int):
+        """Warm up whatever the transport can before the first request to a host."""
+
+    def get_connection_stats(self) -> Dict[str, Dict[str, float]]:
+        """Per-host counts of new and reused connections."""
+        return {}
+
+    def get_dns_stats(self) -> Dict[str, float]:
+        return {}
+
+    def get_dns_latency(self) -> Optional[Histogram]:
+        return None
+
+    def _pool_size(self) -> int:
+        return self._config.pool_size or self._config.max_concurrent_requests
+
+    def _pool_size_per_host(self) -> int:
+        if self._config.pool_size_per_host is not None:
+            return self._config.pool_size_per_host
+        return min(5, self._config.num_workers)
+
+    @classmethod
+    def content_encodings(cls) -> List[str]:
+        """Content codings this transport can decode, for Accept-Encoding."""
+        return ["gzip", "deflate"]
+
+
+def _aiohttp_supports(flag: str) -> bool:
+    try:
+        from aiohttp import compression_utils
+    except ImportError:
+        return False
+    return bool(getattr(compression_utils, flag, False))
+
+
+def _is_ip_address(host: str) -> bool:
+    try:
+        ipaddress.ip_address(host)
+    except ValueError:
+        return False
+    return True
+
+
+def _importable(*modules: str) -> bool:
+    import importlib.util
+
+    return any(importlib.util.find_spec(module) for module in modules)
+
+
+class _AiohttpResponse(TransportResponse):
+    def __init__(self, response: aiohttp.ClientResponse):
+        self._response = response
+        self.status = response.status
+        self.reason = response.reason or ""
+        version = response.version
+        self.http_version = f"HTTP/{version.major}.{version.minor}" if version else "HTTP/1.1"
+        self.headers = response.headers
+        self.request_headers = response.request_info.headers
+        self.content_type = response.content_type
+        self.content_length = response.content_length
+        self.charset = response.charset
+
+    async def read(self) -> bytes:
+        return await self._response.read()
+
+    async def text(self, errors: str = "strict") -> str:
+        return await self._response.text(errors=errors)
+
+    def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        return self._response.content.iter_chunked(size)
+
+
+class AiohttpTransport(Transport):
+    """HTTP/1.1 transport backed by `aiohttp` with a pooled TCP connector.
+
+    DNS goes through a `CachingResolver` unless `dns_cache_ttl` is 0, and a
+    trace hook counts new versus reused connections per host.
+    """
+
+    name = "aiohttp"
+
+    def __init__(self, config: Config, headers: Dict[str, str]):
+        super().__init__(config, headers)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._resolver: Optional[CachingResolver] = None
+        self._connections: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"created": 0, "reused": 0}
+        )
+
+    async def open(self):
+        config = self._config
+        if config.dns_cache_ttl > 0:
+            self._resolver = CachingResolver(
+                ttl=config.dns_cache_ttl, negative_ttl=config.dns_negative_ttl
+            )
+        connector = aiohttp.TCPConnector(
+            limit=self._pool_size(),
+            limit_per_host=self._pool_size_per_host(),
+            keepalive_timeout=config.keepalive_timeout,
+            resolver=self._resolver,
+            use_dns_cache=False,
+        )
+        timeout = ClientTimeout(total=config.request_timeout)
+        self._session = aiohttp.ClientSession(
+            connector=connector,
+            timeout=timeout,
+            headers=self._headers,
+            trace_configs=[self._trace_config()],
+        )
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        connections = self._connections
+
+        async def on_request_start(session, context: SimpleNamespace, params):
+            context.host = params.url.host
+
+        async def on_connection_create_end(session, context: SimpleNamespace, params):
+            connections[getattr(context, "host", "")]["created"] += 1
+
+        async def on_connection_reuseconn(session, context: SimpleNamespace, params):
+            connections[getattr(context, "host", "")]["reused"] += 1
+
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+
+    async def close(self):
+        if self._session:
+            await self._session.close()
+
+    async def prefetch(self, host: str, port: int):
+        if self._resolver is None or _is_ip_address(host):
+            return
+        try:
+            await self._resolver.resolve(host, port, socket.AF_UNSPEC)
+        except OSError:
+            pass
+
+    def get_connection_stats(self) -> Dict[str, Dict[str, float]]:
+        stats: Dict[str, Dict[str, float]] = {}
+        for host, counts in self._connections.items():
+            total = counts["created"] + counts["reused"]
+            stats[host] = {
+                "created": counts["created"],
+                "reused": counts["reused"],
+                "reuse_ratio": counts["reused"] / total if total else 0.0,
+            }
+        return stats
+
+    def get_dns_stats(self) -> Dict[str, float]:
+        return self._resolver.get_stats() if self._resolver else {}
+
+    def get_dns_latency(self) -> Optional[Histogram]:
+        return self._resolver.latency if self._resolver else None
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, headers: Mapping[str, str]):
+        session = self._session
+        assert session is not None, (
+            "Session not initialized. Use async with Fetcher(config):"
+        )
+        try:
+            async with session.request(
+                method, url, headers=headers, allow_redirects=True
+            ) as response:
+                yield _AiohttpResponse(response)
+        except aiohttp.ClientError as e:
+            raise TransportError(str(e) or type(e).__name__) from e
+
+    @classmethod
+    def content_encodings(cls) -> List[str]:
+        encodings = ["gzip", "deflate"]
+        if _aiohttp_supports("HAS_BROTLI"):
+            encodings.append("br")
+        if _aiohttp_supports("HAS_ZSTD"):
+            encodings.append("zstd")
+        return encodings
+
+
+class _HTTPXResponse(TransportResponse):
+    def __init__(self, response):
+        self._response = response
+        self.status = response.status_code
+        self.reason = response.reason_phrase
+        self.http_version = response.http_version
+        self.headers = response.headers
+        self.request_headers = response.request.headers
+        content_type = response.headers.get("Content-Type", "")
+        self.content_type = (
+            content_type.split(";", 1)[0].strip().lower() or "application/octet-stream"
+        )
+        length = response.headers.get("Content-Length")
+        self.content_length = int(length) if length and length.isdigit() else None
+        self.charset = response.charset_encoding
+
+    async def read(self) -> bytes:
+        return await self._response.aread()
+
+    async def text(self, errors: str = "strict") -> str:
+        body = await self._response.aread()
+        encoding = self._response.charset_encoding or "utf-8"
+        try:
+            return body.decode(encoding, errors=errors)
+        except LookupError:
+            return body.decode("utf-8", errors=errors)
+
+    def iter_chunked(self, size: int) -> AsyncIterator[bytes]:
+        return self._response.aiter_bytes(size)
+
+
+class HTTP2Transport(Transport):
+    """Transport that multiplexes requests over one HTTP/2 connection per host.
+
+    Requires the optional `httpx[http2]` dependency. Hosts without HTTP/2
+    support transparently fall back to HTTP/1.1.
+    """
+
+    name = "http2"
+
+    def __init__(self, config: Config, headers: Dict[str, str]):
+        super().__init__(config, headers)
+        self._client = None
+
+    async def open(self):
+        try:
+            import httpx
+        except ImportError as e:
+            raise SpideyError(
+                "transport='http2' requires the optional dependency: pip install 'httpx[http2]'"
+            ) from e
+
+        limits = httpx.Limits(
+            max_connections=self._pool_size(),
+            keepalive_expiry=self._config.keepalive_timeout,
+        )
+        self._client = httpx.AsyncClient(
+            http2=True,
+            headers=self._headers,
+            limits=limits,
+            timeout=self._config.request_timeout,
+            follow_redirects=True,
+        )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, headers: Mapping[str, str]):
+        import httpx
+
+        client = self._client
+        assert client is not None, (
+            "Session not initialized. Use async with Fetcher(config):"
+        )
+        try:
+            async with client.stream(method, url, headers=dict(headers)) as response:
+                yield _HTTPXResponse(response)
+        except httpx.HTTPError as e:
+            raise TransportError(str(e) or type(e).__name__) from e
+
+    @classmethod
+    def content_encodings(cls) -> List[str]:
+        encodings = ["gzip", "deflate"]
+        if _importable("brotli", "brotlicffi"):
+            encodings.append("br")
+        if _importable("zstandard"):
+            encodings.append("zstd")
+        return encodings
+
+
+TRANSPORTS = {
+    AiohttpTransport.name: AiohttpTransport,
+    HTTP2Transport.name: HTTP2Transport,
+}
+
+
+def create_transport(config: Config, headers: Dict[str, str]) -> Transport:
+    """Build the transport selected by `Config.transport`.
+
+    `Accept-Encoding` is filled in from the codings the transport can decode.
+    """
+    transport_cls = TRANSPORTS[config.transport]
+    headers = dict(headers)
+    headers["Accept-Encoding"] = ", ".join(transport_cls.content_encodings())
+    return transport_cls(config, headers)
@@ -0,0 +1,207 @@
+import asyncio
+import logging
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Callable, List, Optional, Set, TypeVar
+
+
+logger = logging.getLogger(__name__)
+
+
+FSYNC_POLICIES = ("none", "batch", "always")
+
+T = TypeVar("T")
+
+
+def _fsync_path(path: Path, directory: bool = False):
+    flags = os.O_RDONLY | (getattr(os, "O_DIRECTORY", 0) if directory else 0)
+    try:
+        fd = os.open(path, flags)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+class StorageWriter:
+    """Writes files through a dedicated, bounded thread pool.
+
+    Every filesystem call for one file (mkdir, write, optional fsync, rename)
+    is bundled into a single job on the pool, so a small file costs one
+    thread handoff instead of one per syscall, and storage I/O never queues
+    behind other users of the default executor. Directories already created
+    are remembered so `mkdir` runs once per directory.
+
+    `fsync` selects durability: `"none"` leaves flushing to the OS,
+    `"always"` fsyncs each file and its directory before returning, and
+    `"batch"` fsyncs files and directories in groups of `fsync_batch`.
+    """
+
+    def __init__(
+        self,
+        temp_dir: Path,
+        io_workers: int = 4,
+        buffer_size: int = 1024 * 1024,
+        fsync: str = "none",
+        fsync_batch: int = 100,
+    ):
+        self.temp_dir = Path(temp_dir)
+        self.buffer_size = buffer_size
+        self._fsync = fsync
+        self._fsync_batch = fsync_batch
+        self._executor = ThreadPoolExecutor(
+            max_workers=io_workers, thread_name_prefix="spidey-io"
+        )
+        self._known_dirs: Set[Path] = set()
+        self._unsynced: List[Path] = []
+        self._stats = {"files_written": 0, "fsyncs": 0}
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """Run a blocking call on the storage pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _ensure_dir(self, directory: Path):
+        # Runs on pool threads. A race only repeats an idempotent mkdir.
+        if directory not in self._known_dirs:
+            directory.mkdir(parents=True, exist_ok=True)
+            self._known_dirs.add(directory)
+
+    def spool(self) -> "SpooledFile":
+        return SpooledFile(self)
+
+    def _commit(
+        self, final_path: Path, content: Optional[bytes], temp_path: Optional[Path]
+    ):
+        self._ensure_dir(final_path.parent)
+        if content is not None:
+            self._ensure_dir(self.temp_dir)
+            temp_path = self.temp_dir / f"{uuid.uuid4().hex}.part"
+            with open(temp_path, "wb") as f:
+                f.write(content)
+                if self._fsync == "always":
+                    f.flush()
+                    os.fsync(f.fileno())
+        elif temp_path is not None and self._fsync == "always":
+            _fsync_path(temp_path)
+        assert temp_path is not None
+        try:
+            os.replace(temp_path, final_path)
+        except BaseException:
+            _unlink(temp_path)
+            raise
+        if self._fsync == "always":
+            _fsync_path(final_path.parent, directory=True)
+
+    async def commit(
+        self,
+        final_path: Path,
+        content: Optional[bytes] = None,
+        temp_path: Optional[Path] = None,
+    ):
+        """Atomically place `content`, or an already-written `temp_path`, at `final_path`."""
+        await self.run(self._commit, final_path, content, temp_path)
+        self._stats["files_written"] += 1
+        if self._fsync == "batch":
+            self._unsynced.append(final_path)
+            if len(self._unsynced) >= self._fsync_batch:
+                await self.flush()
+
+    def _sync(self, paths: List[Path]):
+        for path in paths:
+            _fsync_path(path)
+        for directory in {path.parent for path in paths}:
+            _fsync_path(directory, directory=True)
+
+    async def flush(self):
+        """Fsync files committed since the last batch (`fsync="batch"` only)."""
+        if not self._unsynced:
+            return
+        paths, self._unsynced = self._unsynced, []
+        await self.run(self._sync, paths)
+        self._stats["fsyncs"] += 1
+
+    async def discard(self, temp_path: Optional[Path]):
+        if temp_path is not None:
+            await self.run(_unlink, temp_path)
+
+    async def close(self):
+        await self.flush()
+        self._executor.shutdown(wait=True)
+
+    def get_stats(self) -> dict:
+        stats = self._stats.copy()
+        stats["known_dirs"] = len(self._known_dirs)
+        return stats
+
+
+class SpooledFile:
+    """Response body buffered in memory and spilled to a temp file when large.
+
+    Chunks are coalesced into `buffer_size` writes on the storage pool; a
+    body that never exceeds the buffer is handed to `StorageWriter.commit`
+    as bytes and written in one job.
+    """
+
+    def __init__(self, writer: StorageWriter):
+        self._writer = writer
+        self._buffer = bytearray()
+        self._file: Optional[BinaryIO] = None
+        self.temp_path: Optional[Path] = None
+
+    async def write(self, chunk: bytes):
+        self._buffer += chunk
+        if len(self._buffer) >= self._writer.buffer_size:
+            await self._spill()
+
+    def _open(self) -> BinaryIO:
+        self._writer._ensure_dir(self._writer.temp_dir)
+        self.temp_path = self._writer.temp_dir / f"{uuid.uuid4().hex}.part"
+        return open(self.temp_path, "wb")
+
+    def _write(self, data: bytes):
+        if self._file is None:
+            self._file = self._open()
+        self._file.write(data)
+
+    async def _spill(self):
+        data, self._buffer = bytes(self._buffer), bytearray()
+        await self._writer.run(self._write, data)
+
+    async def finish(self) -> Optional[bytes]:
+        """Flush and close. Returns the body if it stayed in memory, else None."""
+        if self._file is None:
+            content, self._buffer = bytes(self._buffer), bytearray()
+            return content
+        if self._buffer:
+            await self._spill()
+        await self._writer.run(self._file.close)
+        self._file = None
+        return None
+
+    def discard(self):
+        """Drop the body and remove any temp file.
+
+        Synchronous so it also runs cleanly while the download is being
+        cancelled.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.temp_path is not None:
+            _unlink(self.temp_path)
+            self.temp_path = None
+        self._buffer = bytearray()
+
+
+def _unlink(path: Path):
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
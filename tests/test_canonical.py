@@ -0,0 +1,62 @@
+from spidey.canonical import URLCanonicalizer
+
+
+def test_scheme_host_and_default_ports_are_normalized():
+    canonical = URLCanonicalizer()
+    assert (
+        canonical.canonicalize("HTTP://Example.COM:80/a#top") == "http://example.com/a"
+    )
+    assert canonical.canonicalize("https://example.com:443") == "https://example.com/"
+    assert (
+        canonical.canonicalize("https://example.com:8443/a")
+        == "https://example.com:8443/a"
+    )
+    assert (
+        canonical.canonicalize("http://example.com:443/") == "http://example.com:443/"
+    )
+
+
+def test_percent_escapes_are_decoded_or_uppercased():
+    canonical = URLCanonicalizer()
+    assert (
+        canonical.canonicalize("https://example.com/%7euser/a%2fb%2Dc?q=%e2%82%ac")
+        == "https://example.com/~user/a%2Fb-c?q=%E2%82%AC"
+    )
+
+
+def test_tracking_params_are_dropped_and_the_rest_sorted():
+    canonical = URLCanonicalizer()
+    assert (
+        canonical.canonicalize("https://example.com/?b=2&utm_source=x&a=1&FBCLID=y&")
+        == "https://example.com/?a=1&b=2"
+    )
+    unsorted = URLCanonicalizer(drop_query_params=["ref"], sort_query_params=False)
+    assert (
+        unsorted.canonicalize("https://example.com/?b=2&ref=x&a=1&utm_source=y")
+        == "https://example.com/?b=2&a=1&utm_source=y"
+    )
+
+
+def test_session_path_params_are_stripped():
+    canonical = URLCanonicalizer()
+    assert (
+        canonical.canonicalize("https://example.com/cart;JSESSIONID=abc123/items?x=1")
+        == "https://example.com/cart/items?x=1"
+    )
+    assert (
+        canonical.canonicalize("https://example.com/page;version=2")
+        == "https://example.com/page;version=2"
+    )
+
+
+def test_trailing_slashes_are_kept_unless_stripping_is_enabled():
+    assert (
+        URLCanonicalizer().canonicalize("https://example.com/docs/")
+        == "https://example.com/docs/"
+    )
+    stripping = URLCanonicalizer(strip_trailing_slash=True)
+    assert (
+        stripping.canonicalize("https://example.com/docs//")
+        == "https://example.com/docs"
+    )
+    assert stripping.canonicalize("https://example.com/") == "https://example.com/"
@@ -0,0 +1,67 @@
+import sqlite3
+
+from spidey.checkpoint import URL_DONE, URL_FETCHED, CrawlJournal
+from spidey.queue import URLQueue
+
+
+def test_queued_urls_keep_referrer_and_depth(tmp_path):
+    path = str(tmp_path / "journal.db")
+    journal = CrawlJournal(path)
+    queue = URLQueue(on_enqueue=journal.urls_queued)
+    queue.add_batch(["https://example.com/"])
+    queue.add_batch(["https://example.com/a"], referrer="https://example.com/", depth=1)
+    journal.urls_done(["https://example.com/"])
+    journal.close()
+
+    reopened = CrawlJournal(path, resume=True)
+    assert list(reopened.iter_queued()) == [
+        ("https://example.com/a", "https://example.com/", 1)
+    ]
+    assert list(reopened.iter_urls(URL_DONE)) == ["https://example.com/"]
+
+    restored = URLQueue()
+    for url, referrer, depth in reopened.iter_queued():
+        restored.add_urls([url], referrer, depth, restore=True)
+    assert restored.get_batch(1) == ["https://example.com/a"]
+    assert restored.pop_context("https://example.com/a") == (1, "https://example.com/")
+
+
+def test_journal_without_context_columns_is_upgraded(tmp_path):
+    path = str(tmp_path / "journal.db")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE frontier "
+        "(url TEXT PRIMARY KEY, status INTEGER NOT NULL) WITHOUT ROWID"
+    )
+    db.execute("INSERT INTO frontier VALUES ('https://example.com/old', 0)")
+    db.commit()
+    db.close()
+
+    journal = CrawlJournal(path, resume=True)
+    assert list(journal.iter_queued()) == [("https://example.com/old", None, 0)]
+    journal.close()
+
+
+def test_new_crawl_on_an_existing_journal_starts_over(tmp_path):
+    path = str(tmp_path / "journal.db")
+    journal = CrawlJournal(path)
+    journal.urls_queued(["https://example.com/a"])
+    journal.urls_done(["https://example.com/"])
+    journal.close()
+
+    fresh = CrawlJournal(path)
+    assert not fresh.has_state()
+    fresh.close()
+
+
+def test_only_fetched_pages_count_against_the_budget(tmp_path):
+    path = str(tmp_path / "journal.db")
+    journal = CrawlJournal(path)
+    journal.urls_done(["https://example.com/"], fetched=True)
+    journal.urls_done(["https://example.com/404", "https://example.com/private"])
+    journal.close()
+
+    reopened = CrawlJournal(path, resume=True)
+    assert reopened.count_urls(URL_FETCHED) == 1
+    assert len(list(reopened.iter_urls(URL_DONE, URL_FETCHED))) == 3
+    reopened.close()
@@ -0,0 +1,57 @@
+import asyncio
+import hashlib
+import time
+
+from spidey import dedup
+from spidey.dedup import ChecksumIndex
+from spidey.fetcher import DownloadedFile
+from spidey.storage import Storage
+
+CHECKSUM = "ab" * 32
+
+
+def test_unconfirmed_claim_from_a_crashed_writer_is_reclaimed(tmp_path, monkeypatch):
+    path = str(tmp_path / "index.db")
+    index = ChecksumIndex(path)
+    assert index.claim(
+        CHECKSUM, str(tmp_path / "x.png"), 1, "https://example.com/x.png", None
+    )
+    index.close()
+
+    reopened = ChecksumIndex(path)
+    assert CHECKSUM in reopened
+    reopened.close()
+
+    monkeypatch.setattr(dedup.time, "time", lambda: time.time_ns() / 1e9 + 3600)
+    later = ChecksumIndex(path)
+    assert CHECKSUM not in later
+    assert later.claim(
+        CHECKSUM, str(tmp_path / "x.png"), 1, "https://example.com/x.png", None
+    )
+    later.close()
+
+
+def test_deleted_files_are_stored_again(tmp_path):
+    folder = tmp_path / "out"
+    body = b"png bytes"
+    download = DownloadedFile(
+        url="https://example.com/a.png",
+        checksum=hashlib.sha256(body).hexdigest(),
+        size=len(body),
+        content=body,
+        content_type="image/png",
+    )
+
+    async def crawl() -> tuple:
+        storage = Storage(str(folder))
+        saved = await storage.save_download(download)
+        kept = storage.has_object(download.checksum, download.url, "image/png")
+        await storage.close()
+        return saved, kept
+
+    saved, kept = asyncio.run(crawl())
+    assert saved is not None and kept
+    for png in (folder / "png").iterdir():
+        png.unlink()
+
+    assert asyncio.run(crawl()) == (saved, True)
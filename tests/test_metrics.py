@@ -0,0 +1,54 @@
+from spidey.controller import Controller
+from spidey.exporter import render_openmetrics
+from spidey.fetcher import FetchCounters
+from spidey.metrics import Histogram, MetricsRegistry, MetricsSnapshot, merge_snapshots
+
+
+def shard_snapshot(requests: int, hit_rate: float, latency: float) -> MetricsSnapshot:
+    histogram = Histogram()
+    histogram.observe(latency)
+    return MetricsSnapshot(
+        0.0,
+        {"fetcher.total_requests": requests, "dns.hit_rate": hit_rate},
+        {"fetch_seconds": histogram},
+        kinds={"fetcher.total_requests": "counter", "dns.hit_rate": "unknown"},
+    )
+
+
+def test_merge_sums_values_and_histograms_and_averages_ratios():
+    merged = merge_snapshots([shard_snapshot(3, 1.0, 0.2), shard_snapshot(4, 0.5, 2.0)])
+    assert merged.values == {"fetcher.total_requests": 7, "dns.hit_rate": 0.75}
+    assert merged.histograms["fetch_seconds"].count == 2
+    assert merged.kinds["fetcher.total_requests"] == "counter"
+
+
+def test_local_metrics_take_precedence_over_remote():
+    registry = MetricsRegistry()
+    registry.add_collector("dns", lambda: {"hit_rate": 0.1})
+    registry.add_remote(lambda: [shard_snapshot(3, 1.0, 0.2)])
+    snapshot = registry.snapshot()
+    assert snapshot.values["dns.hit_rate"] == 0.1
+    assert snapshot.values["fetcher.total_requests"] == 3
+    assert snapshot.histograms["fetch_seconds"].count == 1
+
+
+def test_request_stats_come_from_tracked_counters():
+    controller = Controller()
+    counters = FetchCounters()
+    controller.track_requests(counters)
+    counters.add(total_requests=3, successful_requests=2, failed_requests=1)
+    stats = controller.get_stats()
+    assert (stats.requests_total, stats.requests_failed) == (3, 1)
+    assert "crawl.requests_total" not in controller.metrics.snapshot().values
+
+
+def test_counter_samples_get_a_single_total_suffix():
+    snapshot = MetricsSnapshot(
+        0.0,
+        {"fetcher.retries": 2, "jobs_total": 5},
+        kinds={"fetcher.retries": "counter", "jobs_total": "counter"},
+    )
+    text = render_openmetrics(snapshot)
+    assert "# TYPE spidey_jobs counter\nspidey_jobs_total 5\n" in text
+    assert "spidey_fetcher_retries_total 2\n" in text
+    assert "_total_total" not in text
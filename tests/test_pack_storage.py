@@ -0,0 +1,76 @@
+import asyncio
+import hashlib
+
+from spidey.fetcher import DownloadedFile
+from spidey.pack_storage import PackStorage
+
+
+def download(url: str, body: bytes, **fields) -> DownloadedFile:
+    return DownloadedFile(
+        url=url,
+        checksum=hashlib.sha256(body).hexdigest(),
+        size=len(body),
+        content=body,
+        **fields,
+    )
+
+
+def test_read_by_every_url_with_the_same_content(tmp_path):
+    async def run():
+        store = PackStorage(str(tmp_path), format="pack")
+        assert await store.save_download(
+            download("https://a.example/logo.png", b"logo")
+        )
+        assert (
+            await store.save_download(download("https://b.example/logo.png", b"logo"))
+            is None
+        )
+        assert store.read(url="https://a.example/logo.png") == b"logo"
+        assert store.read(url="https://b.example/logo.png") == b"logo"
+        await store.close()
+
+    asyncio.run(run())
+    reopened = PackStorage(str(tmp_path), format="pack")
+    assert reopened.read(url="https://b.example/logo.png") == b"logo"
+    assert reopened.read(url="https://c.example/logo.png") is None
+
+
+def test_read_while_appending(tmp_path):
+    async def run():
+        store = PackStorage(str(tmp_path), format="pack", max_pack_size=4096)
+        bodies = {f"https://example.com/{i}": bytes([i]) * 1000 for i in range(50)}
+
+        async def reader():
+            for _ in range(200):
+                for url, body in bodies.items():
+                    found = store.read(url=url)
+                    assert found is None or found == body
+                await asyncio.sleep(0)
+
+        saves = asyncio.gather(
+            *(store.save_download(download(u, b)) for u, b in bodies.items())
+        )
+        await asyncio.gather(saves, reader())
+        for url, body in bodies.items():
+            assert store.read(url=url) == body
+        await store.close()
+
+    asyncio.run(run())
+
+
+def test_warc_request_keeps_a_single_host_header(tmp_path):
+    async def run():
+        store = PackStorage(str(tmp_path), format="warc")
+        await store.save_download(
+            download(
+                "https://example.com/a.png",
+                b"png",
+                request_headers={"host": "example.com", "user-agent": "spidey"},
+            )
+        )
+        await store.close()
+
+    asyncio.run(run())
+    warc = next((tmp_path / "packs").glob("*.warc")).read_bytes()
+    request = warc.split(b"WARC-Type: response")[0].lower()
+    assert request.count(b"\r\nhost:") == 1
@@ -0,0 +1,22 @@
+import asyncio
+
+from spidey.config import Config
+from spidey.parse_pool import ParsePool
+
+
+def test_workers_decode_page_bytes_with_the_declared_charset():
+    config = Config(
+        urls=["https://example.com/"],
+        extensions=[".png"],
+        parse_workers=1,
+        parse_executor="thread",
+    )
+    body = "<a href='/café'>x</a><img src='/a.png'>".encode("latin-1")
+
+    async def run():
+        async with ParsePool(config) as pool:
+            return await pool.extract_links(body, "https://example.com/", "latin-1")
+
+    page_urls, file_urls = asyncio.run(run())
+    assert page_urls == ["https://example.com/café"]
+    assert file_urls == ["https://example.com/a.png"]
@@ -0,0 +1,20 @@
+from spidey.queue import URLQueue
+
+SITE = "https://example.com"
+
+
+def test_reserved_slots_share_the_page_politeness_clock():
+    queue = URLQueue(delay=10.0)
+    queue.add_batch([f"{SITE}/a", "https://other.org/a"])
+
+    assert queue.reserve_slot(f"{SITE}/file.png") == 0.0
+    assert queue.get_batch(2) == ["https://other.org/a"]
+    assert 9.0 < queue.reserve_slot(f"{SITE}/file2.png") <= 10.0
+    assert queue.reserve_slot("https://third.net/x.png") == 0.0
+
+
+def test_reserve_slot_without_a_delay_never_waits():
+    queue = URLQueue()
+    queue.add_batch([f"{SITE}/a"])
+    assert queue.reserve_slot(f"{SITE}/file.png") == 0.0
+    assert queue.get_batch(1) == [f"{SITE}/a"]
@@ -0,0 +1,165 @@
+import asyncio
+import heapq
+import itertools
+from typing import Callable, List, Tuple
+
+import pytest
+
+from spidey.fetcher import RateLimiter
+
+
+class FakeHandle:
+    def __init__(self):
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def cancelled(self) -> bool:
+        return self._cancelled
+
+
+class FakeClock:
+    """Manually advanced clock; timers fire only from `advance`."""
+
+    def __init__(self):
+        self.time = 0.0
+        self._timers: List[Tuple[float, int, FakeHandle, Callable[[], None]]] = []
+        self._order = itertools.count()
+
+    def now(self) -> float:
+        return self.time
+
+    def call_later(self, delay: float, callback: Callable[[], None]) -> FakeHandle:
+        handle = FakeHandle()
+        heapq.heappush(
+            self._timers, (self.time + delay, next(self._order), handle, callback)
+        )
+        return handle
+
+    async def advance(self, seconds: float):
+        end = self.time + seconds
+        while self._timers and self._timers[0][0] <= end:
+            when, _, handle, callback = heapq.heappop(self._timers)
+            self.time = max(self.time, when)
+            if not handle.cancelled():
+                callback()
+            await settle()
+        self.time = end
+        await settle()
+
+
+async def settle():
+    """Let woken waiters run."""
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def start(
+    limiter: RateLimiter, key: str, granted: List[str], label: str
+) -> asyncio.Task:
+    async def acquire():
+        await limiter.acquire(key)
+        granted.append(label)
+
+    return asyncio.ensure_future(acquire())
+
+
+def test_burst_then_one_token_per_interval():
+    async def run():
+        clock = FakeClock()
+        limiter = RateLimiter(rate=2, burst=2, clock=clock)
+        granted: List[str] = []
+        tasks = [start(limiter, "", granted, str(i)) for i in range(5)]
+        await settle()
+        assert granted == ["0", "1"]
+        assert limiter.queue_depth() == 3
+
+        await clock.advance(0.4)
+        assert granted == ["0", "1"]
+        await clock.advance(0.1)
+        assert granted == ["0", "1", "2"]
+        await clock.advance(1.0)
+        assert granted == ["0", "1", "2", "3", "4"]
+        assert limiter.queue_depth() == 0
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+def test_waiters_for_one_key_are_served_fifo():
+    async def run():
+        clock = FakeClock()
+        limiter = RateLimiter(rate=1, clock=clock)
+        granted: List[str] = []
+        await limiter.acquire("a")
+        tasks = []
+        for label in "bcde":
+            tasks.append(start(limiter, "a", granted, label))
+            await settle()
+
+        await clock.advance(4.0)
+        assert granted == ["b", "c", "d", "e"]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+def test_keys_are_served_round_robin():
+    async def run():
+        clock = FakeClock()
+        limiter = RateLimiter(rate=1, clock=clock)
+        granted: List[str] = []
+        await limiter.acquire()
+        tasks = [start(limiter, "busy", granted, f"busy{i}") for i in range(3)]
+        await settle()
+        tasks.append(start(limiter, "quiet", granted, "quiet0"))
+        await settle()
+
+        await clock.advance(4.0)
+        assert granted == ["busy0", "quiet0", "busy1", "busy2"]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+def test_per_key_buckets_do_not_block_other_keys():
+    async def run():
+        clock = FakeClock()
+        limiter = RateLimiter(rate=100, burst=10, per_key_rate=1, clock=clock)
+        granted: List[str] = []
+        await limiter.acquire("a")
+        tasks = [start(limiter, "a", granted, "a1"), start(limiter, "b", granted, "b0")]
+        await settle()
+        assert granted == ["b0"]
+
+        await clock.advance(1.0)
+        assert granted == ["b0", "a1"]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(run())
+
+
+def test_cancelled_waiter_gives_up_its_place():
+    async def run():
+        clock = FakeClock()
+        limiter = RateLimiter(rate=1, clock=clock)
+        granted: List[str] = []
+        await limiter.acquire()
+        first = start(limiter, "", granted, "first")
+        second = start(limiter, "", granted, "second")
+        await settle()
+        assert limiter.queue_depth() == 2
+
+        first.cancel()
+        await settle()
+        assert limiter.queue_depth() == 1
+        with pytest.raises(asyncio.CancelledError):
+            await first
+
+        await clock.advance(1.0)
+        assert granted == ["second"]
+        assert limiter.queue_depth() == 0
+        await second
+
+    asyncio.run(run())
@@ -0,0 +1,23 @@
+from spidey.robots import RobotsRules
+
+
+def test_escaped_unreserved_characters_match_their_literals():
+    rules = RobotsRules([(False, "/%7Efoo"), (False, "/~bar")])
+    assert not rules.is_allowed("/~foo/page")
+    assert not rules.is_allowed("/%7ebar")
+    assert rules.is_allowed("/%7Ebaz")
+
+
+def test_reserved_escapes_compare_case_insensitively_but_stay_escaped():
+    rules = RobotsRules([(True, "/a%2fb"), (False, "/a")])
+    assert rules.is_allowed("/a%2Fb")
+    assert not rules.is_allowed("/a/b")
+
+
+def test_longest_literal_wins_and_allow_wins_ties():
+    rules = RobotsRules(
+        [(False, "/"), (True, "/public"), (False, "/page"), (True, "/page")]
+    )
+    assert not rules.is_allowed("/private")
+    assert rules.is_allowed("/public/index.html")
+    assert rules.is_allowed("/page")
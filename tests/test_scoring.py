@@ -0,0 +1,36 @@
+from spidey.queue import URLQueue
+from spidey.scoring import FileYieldScorer
+
+SITE = "https://example.com"
+
+
+def test_links_from_a_yielding_page_come_first():
+    scorer = FileYieldScorer()
+    queue = URLQueue(scorer=scorer)
+    scorer.record(f"{SITE}/empty", None, 0)
+    queue.add_batch([f"{SITE}/empty/a"], referrer=f"{SITE}/empty", depth=1)
+    scorer.record(f"{SITE}/gallery", None, 4)
+    queue.add_batch([f"{SITE}/gallery/a"], referrer=f"{SITE}/gallery", depth=1)
+
+    assert queue.get_batch(2) == [f"{SITE}/gallery/a", f"{SITE}/empty/a"]
+
+
+def test_rescore_promotes_siblings_of_a_yielding_page():
+    scorer = FileYieldScorer()
+    queue = URLQueue(scorer=scorer)
+    queue.add_batch([f"{SITE}/a/{i}" for i in range(3)], referrer=f"{SITE}/a")
+    queue.add_batch([f"{SITE}/b/{i}" for i in range(3)], referrer=f"{SITE}/b")
+    assert queue.get_batch(1) == [f"{SITE}/a/0"]
+
+    scorer.record(f"{SITE}/b/x", f"{SITE}/b", 5)
+    queue.rescore(f"{SITE}/b")
+    assert queue.domain_sizes() == [("example.com", 5)]
+    assert queue.get_batch(5) == [
+        f"{SITE}/b/0",
+        f"{SITE}/b/1",
+        f"{SITE}/b/2",
+        f"{SITE}/a/1",
+        f"{SITE}/a/2",
+    ]
+    assert queue.is_empty()
+    assert queue.domain_count() == 0
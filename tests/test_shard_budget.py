@@ -0,0 +1,66 @@
+import asyncio
+from typing import List, Tuple
+
+from spidey.shard import ShardBudget
+
+
+class FakeLink:
+    def __init__(self):
+        self.messages: List[Tuple[str, int]] = []
+
+    def request_pages(self, count: int):
+        self.messages.append(("lease", count))
+
+    def return_pages(self, count: int):
+        self.messages.append(("return", count))
+
+    def claim_pages(self, count: int):
+        self.messages.append(("claim", count))
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_workers_wait_for_a_lease_and_ask_once():
+    async def run():
+        link = FakeLink()
+        budget = ShardBudget(link, lease_size=4)
+        workers = [asyncio.ensure_future(budget.reserve()) for _ in range(3)]
+        await settle()
+        assert link.messages == [("lease", 4)]
+        assert not any(worker.done() for worker in workers)
+
+        budget.grant(2)
+        await settle()
+        assert sum(worker.done() for worker in workers) == 2
+        assert link.messages == [("lease", 4), ("lease", 4)]
+
+        budget.close()
+        assert await asyncio.gather(*workers) == [True, True, False]
+
+    asyncio.run(run())
+
+
+def test_spent_lease_does_not_exhaust_the_shard():
+    async def run():
+        link = FakeLink()
+        budget = ShardBudget(link, lease_size=1)
+        budget.grant(1)
+        assert await budget.reserve()
+        budget.release(True)
+        assert budget.fetched == 1
+        assert not budget.exhausted()
+
+    asyncio.run(run())
+
+
+def test_idle_shard_returns_unused_pages():
+    link = FakeLink()
+    budget = ShardBudget(link, lease_size=5)
+    budget.restore(3)
+    budget.grant(5)
+    budget.return_unused()
+    assert link.messages == [("claim", 3), ("return", 5)]
+    assert budget.limit == budget.fetched == 3